@@ -0,0 +1,293 @@
+"""
+Day-by-day attraction scheduler over the knowledge graph.
+
+Packs a city's attractions into the active (non-rest) days of a trip so the
+total Rating is as high as possible, subject to a daily-hours limit and an
+optional entrance-fee budget for the whole trip. Two stages:
+
+1. Selection: a 0/1 knapsack DP over (total half-hours, fee buckets),
+   vectorised one attraction at a time with NumPy. The DP table is the memo;
+   a keep-bit table lets the chosen set be read back in one backward pass.
+   Fees are rounded *up* into at most FEE_BUCKETS buckets, so the budget is
+   never exceeded.
+2. Packing: the chosen set is assigned to days by a depth-first
+   branch-and-bound over attractions sorted longest-first, memoising failed
+   (attraction, remaining-capacity multiset) states and skipping days with
+   identical remaining capacity. If the set cannot be packed, the total
+   capacity is tightened by half an hour and stage 1 is rerun.
+
+When the first packing succeeds the schedule is optimal for the rounded
+hours and fees. Each day's attractions are ordered by BestTime.
+
+    python attraction_scheduler.py Delhi --days 4 --hours 8 --rest-days 1
+    python attraction_scheduler.py --bench
+"""
+
+import sys
+import json
+import math
+import time
+import numpy as np
+
+# Scheduling granularity for HoursNeeded (half an hour)
+SLOT_HOURS = 0.5
+# Upper bound on fee-budget resolution in the selection DP
+FEE_BUCKETS = 200
+# Search nodes allowed per packing attempt before tightening capacity
+MAX_PACK_NODES = 500
+# Used when an attraction has no HoursNeeded / Rating
+DEFAULT_HOURS = 1.0
+DEFAULT_RATING = 3.0
+
+BEST_TIME_ORDER = {"Morning": 0, "All": 1, "Anytime": 1, "Afternoon": 2, "Evening": 3, "Night": 4}
+
+def _slots(hours):
+    return max(1, int(math.ceil(round(hours / SLOT_HOURS, 6))))
+
+def select_attractions(slots, fees, ratings, capacity_slots, fee_budget=None):
+    """
+    Indexes of the rating-maximising subset with sum(slots) <= capacity_slots
+    and sum(fees) <= fee_budget (None = no fee limit).
+    """
+    n = len(slots)
+    if fee_budget is None:
+        bucket, fee_cap = 1, 0
+        fee_units = [0] * n
+    else:
+        bucket = max(1.0, fee_budget / FEE_BUCKETS)
+        fee_cap = int(fee_budget // bucket)
+        fee_units = [int(math.ceil(f / bucket)) for f in fees]
+
+    # Attractions with the same (slots, fee) cost are interchangeable except for
+    # rating, so only the best few of each cost that could ever fit are kept
+    groups = {}
+    for i in range(n):
+        if slots[i] <= capacity_slots and fee_units[i] <= fee_cap:
+            groups.setdefault((slots[i], fee_units[i]), []).append(i)
+    items = []
+    for (h, f), members in groups.items():
+        limit = capacity_slots // h
+        if f:
+            limit = min(limit, fee_cap // f)
+        members.sort(key=lambda i: -ratings[i])
+        items.extend(members[:limit])
+
+    best = np.zeros((capacity_slots + 1, fee_cap + 1))
+    keep = np.zeros((len(items), capacity_slots + 1, fee_cap + 1), dtype=bool)
+    for k, i in enumerate(items):
+        h, f = slots[i], fee_units[i]
+        taken = best[:capacity_slots + 1 - h, :fee_cap + 1 - f] + ratings[i]
+        current = best[h:, f:]
+        better = keep[k, h:, f:]
+        np.greater(taken, current, out=better)
+        np.copyto(current, taken, where=better)
+
+    chosen = []
+    h_left, f_left = capacity_slots, fee_cap
+    for k in range(len(items) - 1, -1, -1):
+        if keep[k, h_left, f_left]:
+            i = items[k]
+            chosen.append(i)
+            h_left -= slots[i]
+            f_left -= fee_units[i]
+    return chosen[::-1]
+
+def pack_days(slots, chosen, n_days, day_slots):
+    """
+    Assign every index in `chosen` to one of `n_days` days of `day_slots`
+    capacity. Returns a list of index lists per day, or None if no packing
+    was found within MAX_PACK_NODES search nodes.
+    """
+    order = sorted(chosen, key=lambda i: -slots[i])
+    remaining = [day_slots] * n_days
+    assignment = [[] for _ in range(n_days)]
+    # still_needed[k] = slots of order[k:]
+    still_needed = [0] * (len(order) + 1)
+    for k in range(len(order) - 1, -1, -1):
+        still_needed[k] = still_needed[k + 1] + slots[order[k]]
+    smallest = slots[order[-1]] if order else 0
+    failed = set()
+    nodes = [0]
+
+    def place(k):
+        if k == len(order):
+            return True
+        state = (k, tuple(sorted(remaining)))
+        if state in failed or nodes[0] >= MAX_PACK_NODES:
+            return False
+        nodes[0] += 1
+        # Bound: capacity smaller than the smallest attraction is wasted for good
+        if sum(cap for cap in remaining if cap >= smallest) < still_needed[k]:
+            failed.add(state)
+            return False
+        need = slots[order[k]]
+        tried = set()
+        # Tightest day first (best-fit decreasing), so the first descent is usually a packing
+        for d in sorted(range(n_days), key=remaining.__getitem__):
+            cap = remaining[d]
+            # Days with equal remaining capacity are interchangeable
+            if cap < need or cap in tried:
+                continue
+            tried.add(cap)
+            remaining[d] -= need
+            assignment[d].append(order[k])
+            if place(k + 1):
+                return True
+            remaining[d] += need
+            assignment[d].pop()
+        failed.add(state)
+        return False
+
+    return assignment if place(0) else None
+
+def rest_day_positions(num_days, rest_days):
+    """0-based day numbers of `rest_days` rest days spread evenly through the trip"""
+    return {int((j + 1) * num_days / (rest_days + 1)) for j in range(rest_days)}
+
+def schedule_attractions(attractions, num_days, daily_hours=8, rest_days=0, fee_budget=None):
+    """
+    Day-by-day plan for `attractions` (knowledge-graph rows) over `num_days`,
+    keeping `rest_days` days free and at most `daily_hours` of visits per day.
+    """
+    start = time.perf_counter()
+    rest_days = max(0, min(int(rest_days), num_days - 1))
+    active_days = num_days - rest_days
+    day_slots = int(daily_hours / SLOT_HOURS + 1e-9)
+
+    slots, fees, ratings = [], [], []
+    for row in attractions:
+        hours = row.get("HoursNeeded")
+        rating = row.get("Rating")
+        slots.append(_slots(hours if hours else DEFAULT_HOURS))
+        fees.append(row.get("EntranceFee") or 0)
+        ratings.append(rating if rating is not None else DEFAULT_RATING)
+
+    # Attractions longer than a day can never be scheduled
+    candidates = [i for i in range(len(attractions)) if slots[i] <= day_slots]
+    capacity = active_days * day_slots
+    attempts = 0
+    while True:
+        attempts += 1
+        picked = select_attractions(
+            [slots[i] for i in candidates], [fees[i] for i in candidates],
+            [ratings[i] for i in candidates], capacity, fee_budget)
+        chosen = [candidates[j] for j in picked]
+        packing = pack_days(slots, chosen, active_days, day_slots)
+        if packing is not None:
+            break
+        # Ask for a strictly smaller set next time
+        capacity = sum(slots[i] for i in chosen) - 1
+
+    rest = rest_day_positions(num_days, rest_days)
+    packing = sorted(packing, key=lambda day: -sum(slots[i] for i in day))
+    days = []
+    for d in range(num_days):
+        if d in rest:
+            days.append({"day": d + 1, "rest_day": True, "attractions": [], "hours": 0.0, "entrance_fees": 0})
+            continue
+        day = sorted(packing.pop(0), key=lambda i: (BEST_TIME_ORDER.get(attractions[i].get("BestTime"), 1), -ratings[i]))
+        days.append({
+            "day": d + 1,
+            "rest_day": False,
+            "attractions": [
+                {
+                    "destination": attractions[i].get("Destination"),
+                    "hours": slots[i] * SLOT_HOURS,
+                    "entrance_fee": fees[i],
+                    "rating": ratings[i],
+                    "best_time": attractions[i].get("BestTime"),
+                }
+                for i in day
+            ],
+            "hours": sum(slots[i] for i in day) * SLOT_HOURS,
+            "entrance_fees": sum(fees[i] for i in day),
+        })
+
+    scheduled = {i for i in chosen}
+    return {
+        "days": days,
+        "total_rating": round(sum(ratings[i] for i in chosen), 2),
+        "total_entrance_fees": sum(fees[i] for i in chosen),
+        "scheduled": len(chosen),
+        "unscheduled": [attractions[i].get("Destination") for i in range(len(attractions)) if i not in scheduled],
+        "solver": {
+            "attempts": attempts,
+            "proven_optimal": attempts == 1,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        },
+    }
+
+def schedule_city(city, num_days, daily_hours=8, rest_days=0, fee_budget=None, kg=None):
+    """Schedule every knowledge-graph attraction in `city` (falls back to a State match)"""
+    if kg is None:
+        from knowledge_graph import get_knowledge_graph
+        kg = get_knowledge_graph()
+    attractions = kg.find("City", city) or kg.find("State", city)
+    plan = schedule_attractions(attractions, num_days, daily_hours, rest_days, fee_budget)
+    plan["city"] = city
+    return plan
+
+def synthetic_attractions(n, seed=42):
+    """Attractions drawn from the knowledge graph's hours / fee / rating distribution"""
+    rng = np.random.default_rng(seed)
+    hours = rng.choice([0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0], n, p=[0.02, 0.33, 0.19, 0.29, 0.02, 0.11, 0.02, 0.02])
+    fees = rng.choice([0, 20, 40, 100, 300, 1000], n, p=[0.55, 0.15, 0.1, 0.1, 0.07, 0.03])
+    return [
+        {
+            "Destination": f"Attraction {i}",
+            "HoursNeeded": float(hours[i]),
+            "EntranceFee": int(fees[i]),
+            "Rating": round(float(rng.uniform(3.5, 5.0)), 1),
+            "BestTime": str(rng.choice(["Morning", "All", "Afternoon", "Evening"])),
+        }
+        for i in range(n)
+    ]
+
+def run_benchmark(sizes=(25, 50, 100, 200, 400, 800), num_days=7, daily_hours=8, rest_days=1,
+                  fee_budget=3000, repeats=5):
+    print("\n" + "="*60)
+    print(f"🗓️  Attraction scheduler scaling ({num_days} days, {daily_hours}h/day, "
+          f"{rest_days} rest, ₹{fee_budget} fees)")
+    print("="*60)
+    print(f"{'attractions':>12} {'median ms':>10} {'max ms':>8} {'scheduled':>10} {'optimal':>8}")
+    results = []
+    for n in sizes:
+        attractions = synthetic_attractions(n)
+        timings = []
+        for _ in range(repeats):
+            plan = schedule_attractions(attractions, num_days, daily_hours, rest_days, fee_budget)
+            timings.append(plan["solver"]["elapsed_ms"])
+        timings.sort()
+        row = {
+            "attractions": n,
+            "median_ms": timings[len(timings) // 2],
+            "max_ms": timings[-1],
+            "scheduled": plan["scheduled"],
+            "proven_optimal": plan["solver"]["proven_optimal"],
+        }
+        results.append(row)
+        print(f"{n:>12} {row['median_ms']:>10.2f} {row['max_ms']:>8.2f} {row['scheduled']:>10} {str(row['proven_optimal']):>8}")
+    return results
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        run_benchmark()
+        sys.exit(0)
+
+    args = [a for a in sys.argv[1:]]
+    if not args or args[0].startswith("--"):
+        print("Usage: python attraction_scheduler.py <city> [--days N] [--hours H] [--rest-days R] [--fee-budget INR]")
+        print("       python attraction_scheduler.py --bench")
+        sys.exit(1)
+
+    def option(name, cast, default):
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    plan = schedule_city(
+        args[0],
+        num_days=option("--days", int, 3),
+        daily_hours=option("--hours", float, 8),
+        rest_days=option("--rest-days", int, 0),
+        fee_budget=option("--fee-budget", float, None),
+    )
+    print(json.dumps(plan, indent=2, ensure_ascii=False))
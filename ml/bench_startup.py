@@ -0,0 +1,86 @@
+"""
+Cold-start benchmark for predict.py.
+Spawns a fresh interpreter per call, exactly as /api/trips and
+/api/discovery do, and reports wall-clock latency per action against the
+cold predict_budget target.
+
+    python bench_startup.py [--runs N] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+from latency_stats import percentile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PREDICT = os.path.join(BASE_DIR, "predict.py")
+
+TARGET_MS = 150.0
+
+SCENARIOS = [
+    ("missing_arguments", []),
+    ("predict_budget", ["predict_budget", json.dumps({"destination": "Varanasi", "numDays": 3, "numPeople": 2})]),
+    ("recommend_destination", ["recommend_destination", json.dumps({"budget": 30000, "numDays": 4})]),
+]
+
+def run_once(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, PREDICT, *args], capture_output=True, check=True, cwd=BASE_DIR)
+    return (time.perf_counter() - start) * 1000
+
+def profile(args):
+    """One extra run with --profile-startup for the per-stage breakdown"""
+    proc = subprocess.run([sys.executable, PREDICT, *args, "--profile-startup"],
+                          capture_output=True, text=True, cwd=BASE_DIR)
+    for line in proc.stderr.splitlines():
+        if line.startswith('{"startup_profile"'):
+            return json.loads(line)
+    return None
+
+def bench(runs=20):
+    results = {}
+    for name, args in SCENARIOS:
+        run_once(args)  # warm the page cache, not the interpreter
+        samples = [run_once(args) for _ in range(runs)]
+        results[name] = {
+            "runs": runs,
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p90_ms": round(percentile(samples, 90), 2),
+            "max_ms": round(max(samples), 2),
+            "profile": profile(args),
+        }
+    results["target"] = {
+        "predict_budget_p50_ms": TARGET_MS,
+        "met": results["predict_budget"]["p50_ms"] < TARGET_MS,
+    }
+    return results
+
+def main():
+    runs = 20
+    if "--runs" in sys.argv:
+        runs = int(sys.argv[sys.argv.index("--runs") + 1])
+    results = bench(runs)
+
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+    else:
+        print("=" * 60)
+        print("PREDICT.PY COLD START")
+        print("=" * 60)
+        for name, _ in SCENARIOS:
+            r = results[name]
+            print(f"{name:<24} p50 {r['p50_ms']:>8.1f} ms   p90 {r['p90_ms']:>8.1f} ms   max {r['max_ms']:>8.1f} ms")
+            if r["profile"]:
+                for stage in r["profile"]["startup_profile"]:
+                    print(f"    {stage['stage']:<36} {stage['ms']:>8.2f} ms")
+        status = "✅" if results["target"]["met"] else "❌"
+        print(f"{status} cold predict_budget p50 target: < {TARGET_MS:.0f} ms")
+
+    if not results["target"]["met"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Benchmark suite for the ml/ hot paths.
+
+Measures, against the models currently in models/:
+
+- cold predict_budget / recommend_destination latency (fresh interpreter
+  per call, as the API spawns them) and warm in-process latency, p50/p99;
+- batch throughput of predict_batch_budget / predict_batch_destination;
+- optimize_itineraries per-call cost (default and search mode);
+- knowledge-graph load time;
+- end-to-end training time per model (data generation + pipeline fit,
+  nothing is written to models/).
+
+Results are JSON: every metric has a value, a unit and whether lower or
+higher is better. The result cache is disabled for the warm and batch
+runs so they time the models, not the cache.
+
+    python benchmarks.py [--quick] [--skip-training] [--only cold,warm,...] [--out results.json]
+    python benchmarks.py --compare baseline.json current.json [--threshold 0.10]
+
+Compare mode prints every shared metric and exits 1 when any of them got
+worse by more than the threshold (default 10%).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import subprocess
+
+from bench_startup import PREDICT, BASE_DIR, run_once
+from latency_stats import percentile
+
+DEFAULT_THRESHOLD = 0.10
+GROUPS = ("cold", "warm", "batch", "itinerary", "knowledge_graph", "training")
+
+SEASONS = ["Summer", "Winter", "Monsoon", "Spring"]
+PACES = ["Fast", "Slow"]
+FOCUSES = ["Nature", "Culture", "Food", "Thrills"]
+DESTINATIONS = ["Varanasi", "Hampta Pass", "Sikkim", "Goa", "Delhi"]
+
+def budget_payloads(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"destination": rng.choice(DESTINATIONS), "numDays": rng.randint(2, 13),
+         "numPeople": rng.randint(1, 6), "comfortLevel": rng.choice(["Budget", "Standard", "Luxury"])}
+        for _ in range(n)
+    ]
+
+def destination_payloads(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"budget": rng.uniform(5000, 100000), "numDays": rng.randint(2, 13), "season": rng.choice(SEASONS),
+         "pace": rng.choice(PACES), "focus": rng.choice(FOCUSES)}
+        for _ in range(n)
+    ]
+
+def metric(value, unit, better="lower"):
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+def latency_metrics(prefix, samples_ms):
+    return {
+        f"{prefix}.p50_ms": metric(percentile(samples_ms, 50), "ms"),
+        f"{prefix}.p99_ms": metric(percentile(samples_ms, 99), "ms"),
+    }
+
+def bench_cold(runs):
+    results = {}
+    for action, payload in (("predict_budget", budget_payloads(1)[0]),
+                            ("recommend_destination", destination_payloads(1)[0])):
+        args = [action, json.dumps(payload)]
+        run_once(args)  # page cache only
+        results.update(latency_metrics(f"cold.{action}", [run_once(args) for _ in range(runs)]))
+    return results
+
+def _timed_calls(func, payloads):
+    samples = []
+    for payload in payloads:
+        start = time.perf_counter()
+        func(payload)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def bench_warm(calls):
+    import predict
+    results = {}
+    predict.predict_budget(budget_payloads(1)[0])
+    predict.predict_destination(destination_payloads(1)[0])
+    results.update(latency_metrics("warm.predict_budget",
+                                   _timed_calls(predict.predict_budget, budget_payloads(calls, seed=1))))
+    results.update(latency_metrics("warm.recommend_destination",
+                                   _timed_calls(predict.predict_destination, destination_payloads(calls, seed=1))))
+    return results
+
+def bench_batch(rows):
+    import predict
+    results = {}
+    for name, func, payloads in (
+        ("predict_batch_budget", predict.predict_batch_budget, budget_payloads(rows, seed=2)),
+        ("predict_batch_destination", predict.predict_batch_destination, destination_payloads(rows, seed=2)),
+    ):
+        func(payloads[:100])
+        start = time.perf_counter()
+        func(payloads)
+        elapsed = time.perf_counter() - start
+        results[f"batch.{name}.rows_per_s"] = metric(rows / elapsed, "rows/s", better="higher")
+    return results
+
+def bench_itinerary(calls):
+    from itinerary_optimizer import optimize_itineraries
+    results = {}
+    prefs = {"daily_budget": 5000}
+    for mode, kwargs in (("default", {}), ("search", {"search": True})):
+        optimize_itineraries("Varanasi", 5, 30000, prefs, **kwargs)
+        start = time.perf_counter()
+        for i in range(calls):
+            optimize_itineraries("Varanasi", 2 + i % 12, 30000, prefs, **kwargs)
+        results[f"itinerary.optimize_itineraries.{mode}.mean_ms"] = metric(
+            (time.perf_counter() - start) * 1000 / calls, "ms")
+    return results
+
+def bench_knowledge_graph(runs):
+    from knowledge_graph import KG_PATH, KnowledgeGraph
+    KnowledgeGraph.from_csv(KG_PATH)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        KnowledgeGraph.from_csv(KG_PATH)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"knowledge_graph.load.p50_ms": metric(percentile(samples, 50), "ms")}
+
+def bench_training(quick):
+    from train_orchestrator import DATA_CONFIGS, PIPELINE_BUILDERS, generate_dataset
+    results = {}
+    for model, builder in PIPELINE_BUILDERS.items():
+        config = dict(DATA_CONFIGS[model])
+        if quick:
+            config["num_samples"] //= 5
+        start = time.perf_counter()
+        X, y = generate_dataset(model, config)
+        builder().fit(X, y)
+        results[f"training.{model}.s"] = metric(time.perf_counter() - start, "s")
+    return results
+
+def run_suite(groups=GROUPS, quick=False):
+    # Time the models, not the result cache
+    os.environ["SAFAR_PREDICT_CACHE"] = "0"
+    sizes = {
+        "cold_runs": 5 if quick else 20,
+        "warm_calls": 200 if quick else 1000,
+        "batch_rows": 2000 if quick else 20000,
+        "itinerary_calls": 50 if quick else 300,
+        "kg_runs": 5 if quick else 30,
+    }
+    runners = {
+        "cold": lambda: bench_cold(sizes["cold_runs"]),
+        "warm": lambda: bench_warm(sizes["warm_calls"]),
+        "batch": lambda: bench_batch(sizes["batch_rows"]),
+        "itinerary": lambda: bench_itinerary(sizes["itinerary_calls"]),
+        "knowledge_graph": lambda: bench_knowledge_graph(sizes["kg_runs"]),
+        "training": lambda: bench_training(quick),
+    }
+    metrics = {}
+    for group in groups:
+        print(f"⏱️  {group}...", file=sys.stderr)
+        metrics.update(runners[group]())
+    return {"meta": _meta(quick, sizes), "metrics": metrics}
+
+def _meta(quick, sizes):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=BASE_DIR).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "sizes": sizes,
+    }
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Rows of (metric, baseline, current, relative change, regressed) for metrics in both runs"""
+    rows = []
+    for name, base in baseline["metrics"].items():
+        if name not in current["metrics"]:
+            continue
+        cur = current["metrics"][name]
+        if not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = change if base["better"] == "lower" else -change
+        rows.append((name, base, cur, change, worse > threshold))
+    return rows
+
+def print_results(results):
+    print("=" * 72)
+    print("ML BENCHMARKS")
+    print("=" * 72)
+    for name, m in results["metrics"].items():
+        print(f"{name:<52} {m['value']:>12,.2f} {m['unit']}")
+
+def print_comparison(rows, threshold):
+    print("=" * 84)
+    print(f"BENCHMARK COMPARISON (regression threshold {threshold:.0%})")
+    print("=" * 84)
+    for name, base, cur, change, regressed in rows:
+        flag = "❌ REGRESSION" if regressed else ""
+        print(f"{name:<52} {base['value']:>10,.2f} -> {cur['value']:>10,.2f} {change:>+8.1%} {flag}")
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    threshold = float(option("--threshold", DEFAULT_THRESHOLD))
+    if "--compare" in args:
+        i = args.index("--compare")
+        with open(args[i + 1]) as f:
+            baseline = json.load(f)
+        with open(args[i + 2]) as f:
+            current = json.load(f)
+        rows = compare(baseline, current, threshold)
+        print_comparison(rows, threshold)
+        sys.exit(1 if any(r[4] for r in rows) else 0)
+
+    groups = [g for g in GROUPS if g != "training" or "--skip-training" not in args]
+    if option("--only"):
+        groups = [g for g in option("--only").split(",") if g in GROUPS]
+    results = run_suite(groups, quick="--quick" in args)
+
+    out_path = option("--out")
+    if out_path:
+        with open(out_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📊 Wrote {out_path}", file=sys.stderr)
+    print_results(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Typed columnar copies of the clean_data CSVs.
+
+data_cleaning.py writes `<name>.npz` next to every `<name>.csv` it
+produces. Each column is stored as a typed NumPy array, so loading needs no
+text parsing or type inference:
+
+- numeric columns keep their dtype (NaN for missing floats);
+- low-cardinality text columns are dictionary-encoded as int32 codes plus
+  a categories array (code -1 = missing);
+- other text columns are one NUL-separated UTF-8 buffer (uint8) plus a
+  missing mask, which is far smaller than fixed-width unicode and splits
+  back into strings in a single C call.
+
+The .npz records the size and mtime of the CSV it was built from. Loaders
+use it only while that still matches and fall back to the CSV otherwise, so
+a hand-edited CSV is never shadowed by a stale binary copy.
+
+    python columnar_store.py --bench [--rows 1000000]
+"""
+
+import os
+import sys
+import json
+import numpy as np
+
+# Text columns with at most this share of distinct values are dictionary-encoded
+CATEGORY_MAX_RATIO = 0.5
+CHUNK_ROWS = 50000
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".npz"
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def convert_csv(csv_path, chunk_rows=CHUNK_ROWS):
+    """Write the .npz sibling of `csv_path`, reading the CSV in chunks; returns its path"""
+    import pandas as pd
+
+    columns, kinds = None, {}
+    numeric_parts, text_parts = {}, {}
+    for df in pd.read_csv(csv_path, chunksize=chunk_rows, keep_default_na=True):
+        if columns is None:
+            columns = list(df.columns)
+            for col in columns:
+                kinds[col] = "numeric" if pd.api.types.is_numeric_dtype(df[col]) else "text"
+                (numeric_parts if kinds[col] == "numeric" else text_parts)[col] = []
+        for col in columns:
+            if kinds[col] == "numeric":
+                numeric_parts[col].append(df[col].to_numpy())
+            else:
+                values = df[col].astype(object)
+                text_parts[col].append(values.where(values.notna(), None).tolist())
+    if columns is None:
+        raise ValueError(f"{csv_path} has no rows")
+
+    arrays = {}
+    n_rows = 0
+    for col in columns:
+        if kinds[col] == "numeric":
+            parts = numeric_parts.pop(col)
+            arrays[f"{col}.values"] = np.concatenate(parts).astype(np.result_type(*parts))
+            n_rows = len(arrays[f"{col}.values"])
+            continue
+        values = [v for part in text_parts.pop(col) for v in part]
+        n_rows = len(values)
+        lookup = {}
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, v in enumerate(values):
+            codes[i] = -1 if v is None else lookup.setdefault(str(v), len(lookup))
+        if len(lookup) <= CATEGORY_MAX_RATIO * max(1, len(values)):
+            kinds[col] = "category"
+            arrays[f"{col}.codes"] = codes
+            arrays[f"{col}.categories"] = np.array(list(lookup), dtype=str)
+        else:
+            kinds[col] = "string"
+            blob = "\x00".join("" if v is None else str(v) for v in values).encode("utf-8")
+            arrays[f"{col}.utf8"] = np.frombuffer(blob, dtype=np.uint8)
+            arrays[f"{col}.missing"] = codes == -1
+
+    meta = {"columns": columns, "kinds": kinds, "rows": n_rows, "source": _source_stamp(csv_path)}
+    out_path = columnar_path(csv_path)
+    tmp_path = out_path + ".tmp.npz"
+    np.savez(tmp_path, __meta__=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+def _strings(data, col):
+    return data[f"{col}.utf8"].tobytes().decode("utf-8").split("\x00")
+
+def _open_fresh(csv_path):
+    """Opened .npz for `csv_path` and its meta, or (None, None) when missing or stale"""
+    path = columnar_path(csv_path)
+    if not os.path.exists(path):
+        return None, None
+    data = np.load(path, allow_pickle=False)
+    meta = json.loads(str(data["__meta__"]))
+    try:
+        fresh = not os.path.exists(csv_path) or meta["source"] == _source_stamp(csv_path)
+    except OSError:
+        fresh = False
+    if not fresh:
+        data.close()
+        return None, None
+    return data, meta
+
+def read_table(csv_path):
+    """DataFrame for a clean_data CSV, from its columnar copy when fresh (categoricals stay categorical)"""
+    import pandas as pd
+    data, meta = _open_fresh(csv_path)
+    if data is None:
+        return pd.read_csv(csv_path)
+    with data:
+        frame = {}
+        for col in meta["columns"]:
+            kind = meta["kinds"][col]
+            if kind == "category":
+                frame[col] = pd.Categorical.from_codes(data[f"{col}.codes"], data[f"{col}.categories"])
+            elif kind == "string":
+                values = np.array(_strings(data, col), dtype=object)
+                values[data[f"{col}.missing"]] = np.nan
+                frame[col] = values
+            else:
+                frame[col] = data[f"{col}.values"]
+        return pd.DataFrame(frame, columns=meta["columns"])
+
+def read_records(csv_path, casts=None):
+    """
+    List of row dicts shaped like csv.DictReader output (missing text is ""),
+    with numeric columns as Python numbers (NaN becomes None), or None when
+    there is no fresh columnar copy. `casts` maps columns to a type to
+    apply to their non-missing values.
+    """
+    casts = casts or {}
+    data, meta = _open_fresh(csv_path)
+    if data is None:
+        return None
+    with data:
+        values = []
+        for col in meta["columns"]:
+            kind = meta["kinds"][col]
+            if kind == "category":
+                categories = data[f"{col}.categories"].tolist() + [""]
+                values.append([categories[c] for c in data[f"{col}.codes"].tolist()])
+            elif kind == "string":
+                values.append(_strings(data, col))
+            else:
+                arr = data[f"{col}.values"]
+                cast = casts.get(col)
+                missing = np.isnan(arr) if arr.dtype.kind == "f" else np.zeros(len(arr), dtype=bool)
+                if cast is int and arr.dtype.kind == "f":
+                    # Missing cells are set back to None below, so the other
+                    # values stay ints exactly as on the CSV path
+                    arr = np.where(missing, 0, arr).astype(np.int64)
+                elif cast is float:
+                    arr = arr.astype(np.float64)
+                column = arr.tolist()
+                if cast is not None and cast not in (int, float):
+                    column = [cast(v) for v in column]
+                for i in np.flatnonzero(missing).tolist():
+                    column[i] = None
+                values.append(column)
+        columns = meta["columns"]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+def _measure(csv_path, how):
+    """Run one load in a fresh interpreter; returns (seconds, MB of RSS the loaded object holds)"""
+    import subprocess
+    code = (
+        "import sys, time, resource; sys.path.insert(0, %r)\n"
+        "import pandas, numpy, csv\n"
+        "import columnar_store as cs, knowledge_graph as kg\n"
+        "def rss(): return int(open('/proc/self/statm').read().split()[1]) * resource.getpagesize() / 1e6\n"
+        "base = rss()\n"
+        "t = time.perf_counter()\n"
+        "if %r == 'csv_frame': obj = pandas.read_csv(%r)\n"
+        "elif %r == 'npz_frame': obj = cs.read_table(%r)\n"
+        "elif %r == 'csv_graph': obj = kg.KnowledgeGraph([kg._parse_row(r) for r in csv.DictReader(open(%r, newline='', encoding='utf-8'))])\n"
+        "else: obj = kg.KnowledgeGraph.from_csv(%r)\n"
+        "elapsed = time.perf_counter() - t\n"
+        "print(elapsed, rss() - base)\n"
+    ) % (os.path.dirname(os.path.abspath(__file__)), how, csv_path, how, csv_path, how, csv_path, csv_path)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+    return float(out[0]), float(out[1])
+
+def run_benchmark(n_rows=1000000):
+    """Load-time / memory comparison for the knowledge graph at its current size and at n_rows"""
+    import tempfile
+    import pandas as pd
+    from knowledge_graph import KG_PATH
+
+    print("\n" + "="*72)
+    print("📦 CSV vs columnar .npz loads for the knowledge graph")
+    print("="*72)
+    base = pd.read_csv(KG_PATH)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, df in (("current", base), (f"{n_rows:,}", None)):
+            if df is None:
+                reps = -(-n_rows // len(base))
+                df = pd.concat([base] * reps, ignore_index=True).head(n_rows)
+                df["Destination"] = df["Destination"] + " #" + (df.index // len(base)).astype(str)
+            csv_path = os.path.join(tmp, f"kg_{len(df)}.csv")
+            df.to_csv(csv_path, index=False)
+            convert_csv(csv_path)
+            row = {
+                "rows": len(df),
+                "csv_bytes": os.path.getsize(csv_path),
+                "npz_bytes": os.path.getsize(columnar_path(csv_path)),
+            }
+            for how in ("csv_frame", "npz_frame", "csv_graph", "npz_graph"):
+                row[how + "_s"], row[how + "_mb"] = _measure(csv_path, how)
+            results.append(row)
+            print(f"\n{label} rows ({row['csv_bytes'] / 1e6:.1f} MB csv, {row['npz_bytes'] / 1e6:.1f} MB npz)")
+            print(f"  DataFrame:      csv {row['csv_frame_s'] * 1000:8.1f} ms {row['csv_frame_mb']:7.1f} MB"
+                  f"   npz {row['npz_frame_s'] * 1000:8.1f} ms {row['npz_frame_mb']:7.1f} MB")
+            print(f"  KnowledgeGraph: csv {row['csv_graph_s'] * 1000:8.1f} ms {row['csv_graph_mb']:7.1f} MB"
+                  f"   npz {row['npz_graph_s'] * 1000:8.1f} ms {row['npz_graph_mb']:7.1f} MB")
+    return results
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        n_rows = int(sys.argv[sys.argv.index("--rows") + 1]) if "--rows" in sys.argv else 1000000
+        run_benchmark(n_rows)
+    else:
+        print("Usage: python columnar_store.py --bench [--rows N]")
+        sys.exit(1)
@@ -0,0 +1,265 @@
+"""
+Compiled, pandas-free inference for the RandomForest pipelines.
+
+train_models.py exports each fitted `Pipeline(ColumnTransformer -> forest)`
+(or -> GradientBoostingRegressor, for the lite tier) into flat NumPy arrays: category -> column maps, scaler constants and the
+per-tree feature/threshold/child/value arrays of every estimator,
+concatenated into one node table. CompiledPipeline evaluates all trees for
+a whole batch at once with plain NumPy, so predict.py can serve without
+importing pandas or sklearn.
+
+On disk a compiled model is a `<name>.forest/` directory holding meta.json
+and one uncompressed .npy per array. Loading memory-maps the arrays
+read-only, so every inference process on a host shares one physical copy
+of the trees through the page cache instead of unpickling a private one.
+"""
+
+import os
+import json
+import numpy as np
+
+# 3 added meta["ensemble"] (forest or boosted); 2 predates it and is
+# always a forest, so it still loads
+COMPILED_FORMAT_VERSION = 3
+READABLE_FORMAT_VERSIONS = (2, 3)
+ARRAY_NAMES = ("split_feature", "split_threshold", "children", "value", "roots")
+
+class CompiledPipeline:
+    """Flat-array evaluator for an exported preprocessing + forest pipeline"""
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.columns = meta["columns"]
+        self.n_outputs = meta["n_outputs"]
+        self.classes_ = np.array(meta["classes"]) if meta.get("classes") is not None else None
+        self.max_depth = meta["max_depth"]
+        # Traversal tables where leaves loop back onto themselves, so every row
+        # takes exactly max_depth branch-free steps:
+        #   node = children[2 * node + (x[split_feature[node]] > split_threshold[node])]
+        # They are stored in this form so nothing is derived (and copied) at load.
+        self.arrays = arrays
+        self.split_feature = arrays["split_feature"]
+        self.split_threshold = arrays["split_threshold"]
+        self.children = arrays["children"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        # Encoders resolved once into (kind, output column, lookup) tuples
+        self._encoders = []
+        for enc in meta["encoders"]:
+            if enc["type"] == "onehot":
+                lookup = {cat: enc["offset"] + i for i, cat in enumerate(enc["categories"])}
+                self._encoders.append(("onehot", enc["column"], lookup))
+            else:
+                self._encoders.append(("numeric", enc["column"], (enc["offset"], enc["mean"], enc["scale"])))
+
+    def transform(self, rows):
+        """Encode a list of feature dicts into the forest's float32 input matrix"""
+        X = np.zeros((len(rows), self.n_outputs), dtype=np.float64)
+        for kind, column, spec in self._encoders:
+            if kind == "onehot":
+                for r, row in enumerate(rows):
+                    out = spec.get(row.get(column))
+                    # Unknown categories encode to all zeros (handle_unknown='ignore')
+                    if out is not None:
+                        X[r, out] = 1.0
+            else:
+                offset, mean, scale = spec
+                vals = np.array([float(row.get(column)) for row in rows], dtype=np.float64)
+                X[:, offset] = (vals - mean) / scale
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return X.astype(np.float32)
+
+    def leaf_indices(self, X):
+        """Leaf node (global index) reached by every row in every tree, shape (n, n_trees)"""
+        n_rows, n_features = X.shape
+        nodes = np.broadcast_to(self.roots.astype(np.int64), (n_rows, len(self.roots))).copy()
+        X_flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        for _ in range(self.max_depth):
+            x = X_flat[row_offsets + self.split_feature[nodes]]
+            nodes = self.children[2 * nodes + (x > self.split_threshold[nodes])]
+        return nodes
+
+    def predict_proba(self, rows):
+        if self.kind != "classifier":
+            raise TypeError("predict_proba is only available for classifiers")
+        leaves = self.leaf_indices(self.transform(rows))
+        return self.value[leaves].mean(axis=1)
+
+    def predict(self, rows):
+        if self.kind == "classifier":
+            return self.classes_[self.predict_proba(rows).argmax(axis=1)]
+        leaves = self.leaf_indices(self.transform(rows))
+        return self.value[leaves].mean(axis=1)
+
+    def predict_quantiles(self, rows, quantiles):
+        """
+        (mean, quantiles) of the per-tree predictions of a regression forest:
+        one traversal collects every tree's leaf value, the mean is predict()'s
+        output and the quantiles (shape (n, len(quantiles)), numpy's linear
+        interpolation) describe the spread across trees.
+        """
+        if self.kind != "regressor" or self.meta.get("ensemble", "forest") != "forest":
+            raise TypeError("Quantiles need a regression forest")
+        per_tree = self.value[self.leaf_indices(self.transform(rows))]
+        return per_tree.mean(axis=1), np.quantile(per_tree, quantiles, axis=1).T
+
+    def save(self, path):
+        """Write `path` as a .forest directory; meta.json goes last so readers never see a partial model"""
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(self.arrays[name]))
+        tmp_meta = os.path.join(path, "meta.json.tmp")
+        with open(tmp_meta, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_meta, os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Open a .forest directory, memory-mapping its arrays unless mmap_mode is None"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") not in READABLE_FORMAT_VERSIONS:
+            raise ValueError(f"Unsupported compiled model format in {path}")
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ARRAY_NAMES
+        }
+        return cls(meta, arrays)
+
+def _compile_encoders(preprocessor):
+    """Flatten a fitted ColumnTransformer into per-column encoder specs"""
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler, FunctionTransformer
+
+    names_in = list(preprocessor.feature_names_in_)
+    encoders = []
+    offset = 0
+    for name, trans, cols in preprocessor.transformers_:
+        if trans == "drop" or len(cols) == 0:
+            continue
+        cols = [names_in[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+        if isinstance(trans, OneHotEncoder):
+            if trans.drop is not None:
+                raise ValueError("OneHotEncoder(drop=...) is not supported")
+            for col, cats in zip(cols, trans.categories_):
+                cats = [c.item() if hasattr(c, "item") else c for c in cats]
+                encoders.append({"type": "onehot", "column": col, "offset": offset, "categories": cats})
+                offset += len(cats)
+        elif isinstance(trans, StandardScaler):
+            means = trans.mean_ if trans.with_mean else np.zeros(len(cols))
+            scales = trans.scale_ if trans.with_std else np.ones(len(cols))
+            for col, mean, scale in zip(cols, means, scales):
+                encoders.append({"type": "numeric", "column": col, "offset": offset,
+                                 "mean": float(mean), "scale": float(scale)})
+                offset += 1
+        elif trans == "passthrough" or (isinstance(trans, FunctionTransformer) and trans.func is None):
+            for col in cols:
+                encoders.append({"type": "numeric", "column": col, "offset": offset,
+                                 "mean": 0.0, "scale": 1.0})
+                offset += 1
+        else:
+            raise ValueError(f"Cannot compile transformer {name!r} ({type(trans).__name__})")
+    return encoders, offset
+
+def _boosting_terms(model):
+    """
+    (scale, shift) that turn a squared-error GradientBoostingRegressor's leaf
+    values into forest-style ones: the mean over n trees of
+    n * learning_rate * leaf + init equals init + learning_rate * sum(leaf),
+    the boosted prediction, so the evaluators need no boosting case.
+    """
+    if getattr(model, "loss", "squared_error") != "squared_error" or not hasattr(model.init_, "constant_"):
+        raise ValueError("Only squared-error boosting with a constant init can be compiled")
+    n_trees = model.estimators_.shape[0]
+    return n_trees * model.learning_rate, float(np.ravel(model.init_.constant_)[0])
+
+def compile_pipeline(pipeline):
+    """Export a fitted Pipeline(preprocessor, forest or boosted regressor) into a CompiledPipeline"""
+    preprocessor = pipeline.steps[0][1]
+    forest = pipeline.steps[-1][1]
+    is_classifier = hasattr(forest, "classes_")
+    encoders, n_outputs = _compile_encoders(preprocessor)
+    estimators = forest.estimators_
+    scale, shift = 1.0, 0.0
+    ensemble = "forest"
+    if isinstance(estimators, np.ndarray):
+        ensemble = "boosting"
+        if is_classifier:
+            raise ValueError("Boosted classifiers cannot be compiled")
+        scale, shift = _boosting_terms(forest)
+        estimators = estimators[:, 0]
+
+    split_feature, split_threshold, children, value, roots = [], [], [], [], []
+    base = 0
+    max_depth = 0
+    for est in estimators:
+        tree = est.tree_
+        node_ids = np.arange(tree.node_count) + base
+        is_leaf = tree.children_left < 0
+        roots.append(base)
+        split_feature.append(np.where(is_leaf, 0, tree.feature))
+        split_threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        # Children rebased onto the concatenated node table, interleaved
+        # [left, right] per node; leaves point back at themselves
+        children.append(np.stack([
+            np.where(is_leaf, node_ids, tree.children_left + base),
+            np.where(is_leaf, node_ids, tree.children_right + base),
+        ], axis=1).ravel())
+        if is_classifier:
+            vals = tree.value[:, 0, :]
+            # Leaf class fractions, as DecisionTreeClassifier.predict_proba normalises them
+            vals = vals / np.maximum(vals.sum(axis=1, keepdims=True), np.finfo(np.float64).tiny)
+        else:
+            vals = tree.value[:, 0, 0] * scale + shift
+        value.append(vals)
+        max_depth = max(max_depth, tree.max_depth)
+        base += tree.node_count
+
+    meta = {
+        "format_version": COMPILED_FORMAT_VERSION,
+        "kind": "classifier" if is_classifier else "regressor",
+        "ensemble": ensemble,
+        "columns": list(preprocessor.feature_names_in_),
+        "n_outputs": n_outputs,
+        "encoders": encoders,
+        "classes": [c.item() if hasattr(c, "item") else c for c in forest.classes_] if is_classifier else None,
+        "max_depth": int(max_depth),
+        "n_nodes": int(base),
+    }
+    return CompiledPipeline(meta, {
+        "split_feature": np.concatenate(split_feature).astype(np.int32),
+        "split_threshold": np.concatenate(split_threshold).astype(np.float64),
+        "children": np.concatenate(children).astype(np.int32),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32),
+    })
+
+def check_parity(pipeline, compiled, X, tol=1e-9):
+    """
+    Compare compiled outputs with the sklearn pipeline on DataFrame `X`.
+    Returns the max difference (absolute for probabilities, relative to the
+    largest prediction for regressors); raises if it exceeds `tol`.
+    """
+    rows = X.to_dict("records")
+    if compiled.kind == "classifier":
+        expected = pipeline.predict_proba(X)
+        got = compiled.predict_proba(rows)
+    else:
+        expected = pipeline.predict(X)
+        got = compiled.predict(rows)
+    max_diff = float(np.max(np.abs(expected - got))) if len(rows) else 0.0
+    if compiled.kind == "regressor":
+        max_diff /= max(1.0, float(np.max(np.abs(expected))))
+    if max_diff > tol:
+        raise AssertionError(f"Compiled model diverges from pipeline (max diff {max_diff:.3g} > {tol})")
+    return max_diff
+
+def export_compiled(pipeline, X_check, path, tol=1e-9):
+    """
+    Compile a fitted pipeline, verify it against the pipeline on `X_check`
+    and write it to the `path` .forest directory. Returns the parity diff.
+    """
+    compiled = compile_pipeline(pipeline)
+    max_diff = check_parity(pipeline, compiled, X_check, tol)
+    compiled.save(path)
+    return max_diff
@@ -1,41 +1,48 @@
 import os
+import sys
+import json
+import hashlib
+import inspect
 import pandas as pd
 import numpy as np
+from columnar_store import convert_csv
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "clean_data")
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.path.join(BASE_DIR, "data")
+OUTPUT_DIR = os.path.join(BASE_DIR, "clean_data")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "build_manifest.json")
+
+# Rows per chunk when streaming raw CSVs, so memory stays flat as they grow
+CHUNK_ROWS = 50000
+
+PLACES_DTYPES = {
+    "Zone": "string", "State": "string", "City": "string", "Name": "string",
+    "Type": "string", "Establishment Year": "string",
+    "time needed to visit in hrs": "float64", "Google review rating": "float64",
+    "Entrance Fee in INR": "Int64", "Airport with 50km Radius": "string",
+    "Weekly Off": "string", "Significance": "string", "DSLR Allowed": "string",
+    "Number of google review in lakhs": "float64", "Best Time to visit": "string",
+}
+TRAVEL_DTYPES = {
+    "Trip ID": "Int64", "Destination": "string", "Duration (days)": "float64",
+    "Accommodation type": "string", "Accommodation cost": "string",
+    "Transportation type": "string", "Transportation cost": "string",
+}
+TOURISM_DTYPES = {
+    "Location": "string", "Country": "category", "Category": "category",
+    "Visitors": "Int64", "Rating": "float64", "Revenue": "float64",
+    "Accommodation_Available": "category",
+}
 
 def clean_indian_places():
     """
-    Cleans the 'Top Indian Places to Visit.csv' to build the baseline 
+    Cleans the 'Top Indian Places to Visit.csv' to build the baseline
     Geographic Knowledge Graph (Destinations -> Regions -> Attributes).
     """
     path = os.path.join(DATA_DIR, "Top Indian Places to Visit.csv")
     if not os.path.exists(path):
         return
-        
-    df = pd.read_csv(path)
-    
-    # Clean basic columns
-    df = df.rename(columns={
-        "Name": "Destination",
-        "Type": "Category",
-        "time needed to visit in hrs": "HoursNeeded",
-        "Google review rating": "Rating",
-        "Entrance Fee in INR": "EntranceFee",
-        "Airport with 50km Radius": "HasAirport",
-        "Best Time to visit": "BestTime"
-    })
-    
-    # Drop unnecessary columns
-    keep_cols = ["Zone", "State", "City", "Destination", "Category", "HoursNeeded", 
-                 "Rating", "EntranceFee", "HasAirport", "Significance", "BestTime"]
-    df = df[[c for c in keep_cols if c in df.columns]]
-    
-    # Basic cleaning
-    df["Category"] = df["Category"].fillna("Unknown").str.strip()
-    df["Significance"] = df["Significance"].fillna("Unknown").str.strip()
-    
+
     # We map categories to our MVP 'Focus' traits (Nature, Culture, Food, Thrills)
     # This acts as our heuristic bridge
     def map_focus(cat):
@@ -47,14 +54,41 @@ def clean_indian_places():
         if any(x in cat for x in ["trek", "adventure", "amusement"]):
             return "Thrills"
         return "Culture" # Default fallback
-        
-    df["FocusTrait"] = df["Category"].apply(map_focus)
-    
-    # Save clean dataset
+
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     out_path = os.path.join(OUTPUT_DIR, "destinations_knowledge_graph.csv")
-    df.to_csv(out_path, index=False)
-    print(f"✅ Saved cleaned knowledge graph to {out_path} ({len(df)} records)")
+    tmp_path = out_path + ".tmp"
+    records = 0
+    for i, df in enumerate(pd.read_csv(path, dtype=PLACES_DTYPES, chunksize=CHUNK_ROWS)):
+        # Clean basic columns
+        df = df.rename(columns={
+            "Name": "Destination",
+            "Type": "Category",
+            "time needed to visit in hrs": "HoursNeeded",
+            "Google review rating": "Rating",
+            "Entrance Fee in INR": "EntranceFee",
+            "Airport with 50km Radius": "HasAirport",
+            "Best Time to visit": "BestTime"
+        })
+
+        # Drop unnecessary columns
+        keep_cols = ["Zone", "State", "City", "Destination", "Category", "HoursNeeded",
+                     "Rating", "EntranceFee", "HasAirport", "Significance", "BestTime"]
+        df = df[[c for c in keep_cols if c in df.columns]]
+
+        # Basic cleaning
+        df["Category"] = df["Category"].fillna("Unknown").str.strip()
+        df["Significance"] = df["Significance"].fillna("Unknown").str.strip()
+        df["FocusTrait"] = df["Category"].apply(map_focus)
+
+        # Append chunk by chunk; the header goes out with the first one
+        df.to_csv(tmp_path, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+        records += len(df)
+
+    # Save clean dataset
+    os.replace(tmp_path, out_path)
+    convert_csv(out_path)
+    print(f"✅ Saved cleaned knowledge graph to {out_path} ({records} records)")
 
 def extract_budget_baselines():
     """
@@ -63,9 +97,7 @@ def extract_budget_baselines():
     path = os.path.join(DATA_DIR, "Travel details dataset.csv")
     if not os.path.exists(path):
         return
-        
-    df = pd.read_csv(path)
-    
+
     def clean_cost(val):
         if pd.isna(val): return 0
         val = str(val).replace(',', '').replace('$', '').replace(' USD', '').strip()
@@ -73,31 +105,196 @@ def extract_budget_baselines():
             return float(val)
         except:
             return 0
-            
-    df["Accommodation cost"] = df["Accommodation cost"].apply(clean_cost)
-    df["Transportation cost"] = df["Transportation cost"].apply(clean_cost)
-    df["Duration (days)"] = df["Duration (days)"].fillna(1)
-    
-    # Calculate daily cost in USD
-    df["DailyAccommodationUSD"] = df["Accommodation cost"] / df["Duration (days)"]
-    
-    # Convert arbitrary USD costs to INR equivalences for our model baseline
-    # Assume 1 USD = 83 INR
-    df["DailyAccommodationINR"] = df["DailyAccommodationUSD"] * 83
-    
+
+    # Per accommodation type running totals, so the mean needs only one pass
+    totals = []
+    for df in pd.read_csv(path, dtype=TRAVEL_DTYPES, usecols=list(TRAVEL_DTYPES), chunksize=CHUNK_ROWS):
+        df["Accommodation cost"] = df["Accommodation cost"].apply(clean_cost)
+        df["Transportation cost"] = df["Transportation cost"].apply(clean_cost)
+        df["Duration (days)"] = df["Duration (days)"].fillna(1)
+
+        # Calculate daily cost in USD
+        df["DailyAccommodationUSD"] = df["Accommodation cost"] / df["Duration (days)"]
+
+        # Convert arbitrary USD costs to INR equivalences for our model baseline
+        # Assume 1 USD = 83 INR
+        df["DailyAccommodationINR"] = df["DailyAccommodationUSD"] * 83
+
+        totals.append(df.groupby("Accommodation type").agg(
+            StaySum=("DailyAccommodationINR", "sum"),
+            StayCount=("DailyAccommodationINR", "count"),
+            Samples=("Trip ID", "count")
+        ))
+
     # Group by Accommodation Type to get 'Comfort Level' baselines
-    baselines = df.groupby("Accommodation type").agg(
-        AvgDailyStayINR=("DailyAccommodationINR", "mean"),
-        Samples=("Trip ID", "count")
-    ).reset_index()
-    
+    combined = pd.concat(totals).groupby(level=0).sum()
+    baselines = pd.DataFrame({
+        "AvgDailyStayINR": combined["StaySum"] / combined["StayCount"],
+        "Samples": combined["Samples"].astype("int64"),
+    }).rename_axis("Accommodation type").reset_index()
+
     out_path = os.path.join(OUTPUT_DIR, "budget_baselines.csv")
     baselines.to_csv(out_path, index=False)
+    convert_csv(out_path)
     print(f"✅ Saved budget baselines to {out_path} ({len(baselines)} records)")
 
+def summarize_tourism_dataset():
+    """
+    Streams 'tourism_dataset.csv' into per (Country, Category) visitor,
+    rating and revenue aggregates
+    """
+    path = os.path.join(DATA_DIR, "tourism_dataset.csv")
+    if not os.path.exists(path):
+        return
+
+    totals = []
+    rows = 0
+    for df in pd.read_csv(path, dtype=TOURISM_DTYPES, chunksize=CHUNK_ROWS):
+        df["HasAccommodation"] = (df["Accommodation_Available"] == "Yes").astype("int64")
+        totals.append(df.groupby(["Country", "Category"], observed=True).agg(
+            Samples=("Location", "count"),
+            TotalVisitors=("Visitors", "sum"),
+            RatingSum=("Rating", "sum"),
+            RevenueSum=("Revenue", "sum"),
+            WithAccommodation=("HasAccommodation", "sum")
+        ))
+        rows += len(df)
+
+    # Category dtypes differ between chunks, so regroup on plain strings
+    combined = pd.concat(totals).reset_index()
+    combined[["Country", "Category"]] = combined[["Country", "Category"]].astype(str)
+    combined = combined.groupby(["Country", "Category"]).sum()
+    stats = pd.DataFrame({
+        "Samples": combined["Samples"],
+        "TotalVisitors": combined["TotalVisitors"],
+        "AvgRating": (combined["RatingSum"] / combined["Samples"]).round(4),
+        "AvgRevenue": (combined["RevenueSum"] / combined["Samples"]).round(2),
+        "AccommodationShare": (combined["WithAccommodation"] / combined["Samples"]).round(4),
+    }).reset_index()
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    out_path = os.path.join(OUTPUT_DIR, "tourism_category_stats.csv")
+    stats.to_csv(out_path, index=False)
+    convert_csv(out_path)
+    print(f"✅ Saved tourism category stats to {out_path} ({len(stats)} records from {rows} rows)")
+
+# name -> (build function, raw inputs, outputs, dtypes the stage reads with)
+STAGES = {
+    "knowledge_graph": (
+        clean_indian_places,
+        ["Top Indian Places to Visit.csv"],
+        ["destinations_knowledge_graph.csv", "destinations_knowledge_graph.npz"],
+        PLACES_DTYPES,
+    ),
+    "budget_baselines": (
+        extract_budget_baselines,
+        ["Travel details dataset.csv"],
+        ["budget_baselines.csv", "budget_baselines.npz"],
+        TRAVEL_DTYPES,
+    ),
+    "tourism_stats": (
+        summarize_tourism_dataset,
+        ["tourism_dataset.csv"],
+        ["tourism_category_stats.csv", "tourism_category_stats.npz"],
+        TOURISM_DTYPES,
+    ),
+}
+
+def file_hash(path, block_size=1 << 20):
+    """sha256 of a file's contents, read in blocks; None when missing"""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def code_hash(func, dtypes):
+    """
+    Fingerprint of a stage's source, its read dtypes and the columnar_store
+    module every stage writes through, so code edits trigger a rebuild
+    """
+    payload = (inspect.getsource(func) + inspect.getsource(inspect.getmodule(convert_csv))
+               + json.dumps(dtypes, sort_keys=True))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _rel(path):
+    return os.path.relpath(path, BASE_DIR)
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}, "consumers": {}}
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def stage_fingerprint(name):
+    func, inputs, outputs, dtypes = STAGES[name]
+    return {
+        "inputs": {_rel(p): file_hash(p) for p in (os.path.join(DATA_DIR, f) for f in inputs)},
+        "code": code_hash(func, dtypes),
+    }
+
+def stage_is_current(name, manifest):
+    """True when the stage's inputs, code and outputs all match the manifest"""
+    recorded = manifest["stages"].get(name)
+    if recorded is None:
+        return False
+    fingerprint = stage_fingerprint(name)
+    if recorded["inputs"] != fingerprint["inputs"] or recorded["code"] != fingerprint["code"]:
+        return False
+    return all(
+        file_hash(os.path.join(OUTPUT_DIR, f)) == recorded["outputs"].get(_rel(os.path.join(OUTPUT_DIR, f)))
+        for f in STAGES[name][2]
+    )
+
+def run_pipeline(force=False, manifest_path=MANIFEST_PATH):
+    """Run every stage whose inputs or code changed since the last build; returns the stages that ran"""
+    manifest = load_manifest(manifest_path)
+    ran = []
+    for name, (func, inputs, outputs, dtypes) in STAGES.items():
+        if not force and stage_is_current(name, manifest):
+            print(f"⏭️  {name}: inputs unchanged, skipping")
+            continue
+        fingerprint = stage_fingerprint(name)
+        if any(h is None for h in fingerprint["inputs"].values()):
+            continue
+        func()
+        fingerprint["outputs"] = {
+            _rel(p): file_hash(p) for p in (os.path.join(OUTPUT_DIR, f) for f in outputs)
+        }
+        manifest["stages"][name] = fingerprint
+        ran.append(name)
+    save_manifest(manifest, manifest_path)
+    return ran
+
+def inputs_changed(consumer, paths, manifest_path=MANIFEST_PATH):
+    """
+    True when any of `paths` differs from what `consumer` last recorded with
+    record_inputs (or nothing was recorded yet)
+    """
+    recorded = load_manifest(manifest_path)["consumers"].get(consumer)
+    if recorded is None:
+        return True
+    return any(recorded.get(_rel(p)) != file_hash(p) for p in paths) or len(recorded) != len(paths)
+
+def record_inputs(consumer, paths, manifest_path=MANIFEST_PATH):
+    """Remember the current content hashes of `paths` for `consumer`"""
+    manifest = load_manifest(manifest_path)
+    manifest["consumers"][consumer] = {_rel(p): file_hash(p) for p in paths}
+    save_manifest(manifest, manifest_path)
+
 if __name__ == "__main__":
     print("="*60)
     print("DATA PROCESSING PIPELINE")
     print("="*60)
-    clean_indian_places()
-    extract_budget_baselines()
+    # python data_cleaning.py [--force]
+    run_pipeline(force="--force" in sys.argv)
@@ -1,42 +1,241 @@
+"""
+Streaming dataset profiler for the raw CSVs in data/.
+
+Each file is read once in fixed-size chunks, so memory depends on the chunk
+size and the number of columns, never on the file size. Per column it keeps:
+
+- row, null and non-null counts, the dtype and a sample value;
+- min / max / mean for numeric columns;
+- an approximate distinct count from a HyperLogLog sketch (2**12 one-byte
+  registers, ~1.6% standard error);
+- the most frequent values from a bounded heavy-hitters table
+  (TOP_CAPACITY counters; counts are lower bounds once it has pruned).
+
+Several files are profiled in parallel in a process pool. The datasets in
+data/ are summarised into data_summary.json, keeping the original rows /
+cols / columns (col, type, sample) layout with the statistics added
+alongside. Timings are only printed, so the committed summary changes only
+when the data does. Files named on the command line are ad-hoc profiles:
+they go to stdout, or to --out, never to data_summary.json.
+
+    python data_processor.py [--workers N] [--chunk-rows N] [--out PATH] [file.csv ...]
+"""
+
 import os
-import pandas as pd
+import sys
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+SUMMARY_PATH = os.path.join(os.path.dirname(__file__), "data_summary.json")
+
+DATASETS = {
+    "Top Indian Places": "Top Indian Places to Visit.csv",
+    "Tourism Dataset": "tourism_dataset.csv",
+    "Travel Details": "Travel details dataset.csv"
+}
+
+CHUNK_ROWS = 100000
+# HyperLogLog precision: 2**HLL_P registers
+HLL_P = 12
+# Counters kept by the heavy-hitters table, and how many values are reported
+TOP_CAPACITY = 256
+TOP_K = 5
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit hashes"""
+    def __init__(self, p=HLL_P):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if not len(hashes):
+            return
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Rank = position of the leftmost 1 bit in the remaining 64 - p bits
+        bits = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bits[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = (64 - self.p) - bits + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+class TopValues:
+    """Bounded frequent-values table: merge chunk counts, prune to the largest TOP_CAPACITY"""
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.pruned = False
 
-def inspect_datasets():
-    datasets = {
-        "Top Indian Places": "Top Indian Places to Visit.csv",
-        "Tourism Dataset": "tourism_dataset.csv",
-        "Travel Details": "Travel details dataset.csv"
+    def add_counts(self, counts):
+        for value, n in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + int(n)
+        if len(self.counts) > self.capacity:
+            keep = sorted(self.counts.items(), key=lambda kv: -kv[1])[:self.capacity]
+            self.counts = dict(keep)
+            self.pruned = True
+
+    def top(self, k=TOP_K):
+        return [[str(v), n] for v, n in sorted(self.counts.items(), key=lambda kv: -kv[1])[:k]]
+
+class ColumnProfile:
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.dtype = None
+        self.sample = None
+        self.numeric = True
+        self.min = None
+        self.max = None
+        self.total = 0.0
+        self.distinct = HyperLogLog()
+        self.top_values = TopValues()
+
+    def update(self, series):
+        self.rows += len(series)
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        self.dtype = _merge_dtype(self.dtype, str(series.dtype))
+        if self.sample is None and len(values):
+            self.sample = str(values.iloc[0])
+        if not len(values):
+            return
+
+        if self.numeric and pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            lo, hi = values.min(), values.max()
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+            self.total += float(values.sum())
+        else:
+            self.numeric = False
+        self.distinct.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        self.top_values.add_counts(values.value_counts(sort=False).to_dict())
+
+    def summary(self):
+        non_null = self.rows - self.nulls
+        stats = {
+            "nulls": self.nulls,
+            "non_null": non_null,
+            "approx_distinct": min(self.distinct.estimate(), non_null),
+            "top_values": self.top_values.top(),
+            "top_values_exact": not self.top_values.pruned,
+        }
+        if self.numeric and non_null:
+            stats.update(min=_scalar(self.min), max=_scalar(self.max), mean=self.total / non_null)
+        return {"col": self.name, "type": self.dtype, "sample": self.sample if self.sample is not None else "N/A",
+                **stats}
+
+def _merge_dtype(current, new):
+    if current is None or current == new:
+        return new
+    numeric = ("int64", "float64")
+    if current in numeric and new in numeric:
+        return "float64"
+    # Mixed numeric/text chunks: the column is text overall
+    return new if current in numeric else current
+
+def _scalar(value):
+    return value.item() if hasattr(value, "item") else value
+
+def profile_file(filepath, chunk_rows=CHUNK_ROWS):
+    """Single-pass profile of one CSV"""
+    profiles = None
+    for chunk in pd.read_csv(filepath, chunksize=chunk_rows):
+        if profiles is None:
+            profiles = [ColumnProfile(col) for col in chunk.columns]
+        for profile, col in zip(profiles, chunk.columns):
+            profile.update(chunk[col])
+    profiles = profiles or []
+    return {
+        "rows": profiles[0].rows if profiles else 0,
+        "cols": len(profiles),
+        "bytes": os.path.getsize(filepath),
+        "columns": [p.summary() for p in profiles],
     }
 
-    output = {}
-
-    for name, filename in datasets.items():
-        filepath = os.path.join(DATA_DIR, filename)
-        if not os.path.exists(filepath):
-            continue
-            
-        try:
-            df = pd.read_csv(filepath)
-            columns = []
-            for col in df.columns:
-                val = df[col].dropna().iloc[0] if not df[col].dropna().empty else None
-                # Converting everything to string to avoid JSON serialization errors
-                val = str(val) if val is not None else "N/A"
-                columns.append({"col": col, "type": str(df[col].dtype), "sample": val})
-                
-            output[name] = {
-                "rows": df.shape[0],
-                "cols": df.shape[1],
-                "columns": columns
-            }
-        except Exception as e:
-            output[name] = {"error": str(e)}
-
-    with open(os.path.join(os.path.dirname(__file__), "data_summary.json"), "w") as f:
-        json.dump(output, f, indent=2)
+def _safe_profile(filepath, chunk_rows):
+    """(profile or {"error": ...}, seconds taken)"""
+    start = time.perf_counter()
+    try:
+        profile = profile_file(filepath, chunk_rows)
+    except Exception as e:
+        profile = {"error": str(e)}
+    return profile, time.perf_counter() - start
+
+def inspect_datasets(datasets=None, workers=None, chunk_rows=CHUNK_ROWS, out_path=SUMMARY_PATH):
+    """
+    Profile every dataset ({name: path relative to data/ or absolute}) in
+    parallel and write the summary to `out_path` (skipped when None).
+    Returns ({name: profile}, {name: seconds}).
+    """
+    datasets = datasets or DATASETS
+    paths = {
+        name: filename if os.path.isabs(filename) else os.path.join(DATA_DIR, filename)
+        for name, filename in datasets.items()
+    }
+    paths = {name: path for name, path in paths.items() if os.path.exists(path)}
+
+    output, timings = {}, {}
+    if workers == 1 or len(paths) <= 1:
+        for name, path in paths.items():
+            output[name], timings[name] = _safe_profile(path, chunk_rows)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or min(len(paths), os.cpu_count() or 1)) as pool:
+            futures = {name: pool.submit(_safe_profile, path, chunk_rows) for name, path in paths.items()}
+            for name, future in futures.items():
+                output[name], timings[name] = future.result()
+
+    if out_path is not None:
+        with open(out_path, "w") as f:
+            json.dump(output, f, indent=2)
+    return output, timings
 
 if __name__ == "__main__":
-    inspect_datasets()
+    args = sys.argv[1:]
+
+    def option(name, cast, default):
+        if name in args:
+            i = args.index(name)
+            value = cast(args[i + 1])
+            del args[i:i + 2]
+            return value
+        return default
+
+    workers = option("--workers", int, None)
+    chunk_rows = option("--chunk-rows", int, CHUNK_ROWS)
+    datasets = {os.path.basename(p): os.path.abspath(p) for p in args} or None
+    # Only the data/ datasets go to data_summary.json by default
+    out_path = option("--out", str, SUMMARY_PATH if datasets is None else None)
+
+    start = time.perf_counter()
+    output, timings = inspect_datasets(datasets, workers=workers, chunk_rows=chunk_rows, out_path=out_path)
+    if out_path is None:
+        json.dump(output, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    # Progress goes to stderr so stdout stays one JSON document
+    for name, profile in output.items():
+        if "error" in profile:
+            print(f"❌ {name}: {profile['error']}", file=sys.stderr)
+        else:
+            print(f"✅ {name}: {profile['rows']:,} rows x {profile['cols']} cols in {timings[name]:.2f}s",
+                  file=sys.stderr)
+    print(f"📊 Profiled {len(output)} files in {time.perf_counter() - start:.2f}s -> {out_path or 'stdout'}",
+          file=sys.stderr)
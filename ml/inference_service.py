@@ -0,0 +1,408 @@
+"""
+Asyncio inference service with request micro-batching.
+
+Concurrent recommend_destination / predict_budget requests are collected
+per action for up to WINDOW_MS milliseconds or MAX_BATCH items, whichever
+comes first, scored with one predict_batch_* call and fanned back to the
+waiting callers. Model calls run one batch at a time on a single worker
+thread, so the event loop keeps accepting and queueing requests while a
+batch is being scored, and the next batch picks up everything that
+arrived meanwhile.
+
+Each action has a bounded queue. When it is full, the connection that is
+submitting stops reading until there is room, so a slow model pushes back
+on clients through the socket instead of growing memory.
+
+The wire protocol is predict.py serve's NDJSON ({"id", "action",
+"payload"} per line), except that a connection may pipeline requests and
+responses come back in completion order; use "id" to match them.
+"service_stats" returns queue depths and latency / batch-size histograms.
+Retrained models are hot-swapped as in predict.py serve (ModelReloader):
+every response carries the "model_version" that answered it.
+
+    python inference_service.py [--socket PATH | --port N] [--window-ms 2] [--max-batch 64] [--queue-size 1024]
+    python inference_service.py --load-test [--clients 64] [--requests 5000] [--process-requests 100]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import predict
+import tracing
+
+WINDOW_MS = float(os.environ.get("SAFAR_BATCH_WINDOW_MS", 2))
+MAX_BATCH = int(os.environ.get("SAFAR_BATCH_MAX", 64))
+QUEUE_SIZE = int(os.environ.get("SAFAR_BATCH_QUEUE", 1024))
+DEFAULT_SOCKET = os.path.join(predict.BASE_DIR, "cache", "inference.sock")
+
+BATCHED_ACTIONS = {
+    "recommend_destination": predict.predict_batch_destination,
+    "predict_budget": predict.predict_batch_budget,
+}
+
+# Upper bounds of the latency buckets, in milliseconds
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, float("inf"))
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts on output, like Prometheus)"""
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.bounds[-1]
+
+    def snapshot(self):
+        cumulative, seen = [], 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            cumulative.append(["+Inf" if bound == float("inf") else bound, seen])
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+class MicroBatcher:
+    """Queue of (payload, future) for one action, drained into batched model calls"""
+    def __init__(self, action, handler, executor, window_ms=WINDOW_MS, max_batch=MAX_BATCH,
+                 queue_size=QUEUE_SIZE):
+        self.action = action
+        self.handler = handler
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._full = asyncio.Event()
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.model_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.backpressure_waits = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, payload):
+        """
+        Enqueue one payload, waiting while the queue is full; returns a future
+        for its response so the caller can go on reading requests.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if self.queue.full():
+            self.backpressure_waits += 1
+        await self.queue.put((payload, future, time.perf_counter()))
+        if self.queue.qsize() >= self.max_batch:
+            self._full.set()
+        return future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        if self.queue.qsize() + 1 < self.max_batch:
+            self._full.clear()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    def _score(self, payloads):
+        # The whole batch is answered by one model generation
+        with tracing.request(self.action), predict.pinned_generation() as generation:
+            try:
+                results = self.handler(payloads)
+            except Exception:
+                # Re-score one by one so only the payload that raises gets the error
+                results = [self._score_one(payload) for payload in payloads]
+            return [predict.tag_model_version(res, generation) for res in results]
+
+    def _score_one(self, payload):
+        try:
+            return self.handler([payload])[0]
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            for _, _, queued in batch:
+                self.queue_wait_ms.observe((started - queued) * 1000)
+            self.batch_sizes.observe(len(batch))
+            try:
+                results = await loop.run_in_executor(self.executor, self._score, [p for p, _, _ in batch])
+            except Exception as e:
+                generation = predict.active_generation()
+                results = [predict.tag_model_version({"error": str(e)}, generation) for _ in batch]
+            done = time.perf_counter()
+            self.model_ms.observe((done - started) * 1000)
+            for (_, future, queued), res in zip(batch, results):
+                self.latency_ms.observe((done - queued) * 1000)
+                if not future.done():
+                    future.set_result(res)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "backpressure_waits": self.backpressure_waits,
+            "latency_ms": self.latency_ms.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "model_ms": self.model_ms.snapshot(),
+            "batch_size": self.batch_sizes.snapshot(),
+        }
+
+class InferenceService:
+    def __init__(self, window_ms=WINDOW_MS, max_batch=MAX_BATCH, queue_size=QUEUE_SIZE):
+        # One model thread: the loaded models and the prediction cache are
+        # not shared across threads, and batches serialise on the GIL anyway
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+        self.config = {"window_ms": window_ms, "max_batch": max_batch, "queue_size": queue_size}
+        self.batchers = {
+            action: MicroBatcher(action, handler, self.executor, window_ms, max_batch, queue_size)
+            for action, handler in BATCHED_ACTIONS.items()
+        }
+        self.started = time.time()
+
+    def start(self):
+        predict.load_model("destination_recommender")
+        predict.load_model("budget_regressor")
+        predict.load_recommendation_table()
+        predict.load_knowledge_graph()
+        self.reloader = predict.start_model_reloader()
+        for batcher in self.batchers.values():
+            batcher.start()
+
+    def stats(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 3),
+            "config": self.config,
+            "actions": {action: b.stats() for action, b in self.batchers.items()},
+        }
+
+    async def submit(self, action, payload):
+        """Future for the response to one request"""
+        if action in self.batchers:
+            return await self.batchers[action].submit(payload)
+        future = asyncio.get_running_loop().create_future()
+        if action == "service_stats":
+            future.set_result({"service": self.stats()})
+        else:
+            # Everything else (similar_destinations, cache_stats, batch actions)
+            # goes through predict.dispatch unbatched, on the model thread
+            inner = asyncio.get_running_loop().run_in_executor(self.executor, predict.dispatch_versioned, action, payload)
+            inner.add_done_callback(lambda f: future.set_result(
+                f.result() if f.exception() is None else {"error": str(f.exception())}))
+        return future
+
+    async def handle_connection(self, reader, writer):
+        pending = set()
+
+        async def respond(future, request_id, has_id):
+            res = await future
+            if has_id:
+                res = dict(res, id=request_id)
+            writer.write((json.dumps(res) + "\n").encode())
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    action = request.get("action")
+                    payload = request.get("payload", {})
+                except Exception:
+                    writer.write(b'{"error": "Invalid JSON"}\n')
+                    continue
+                # Waits here while the action's queue is full (backpressure)
+                future = await self.submit(action, payload)
+                task = asyncio.ensure_future(respond(future, request.get("id"), "id" in request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+            if pending:
+                await asyncio.gather(*pending)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+
+async def run_server(socket_path=None, port=None, ready=None, **config):
+    service = InferenceService(**config)
+    service.start()
+    if port is not None:
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", port)
+        where = f"127.0.0.1:{port}"
+    else:
+        socket_path = socket_path or DEFAULT_SOCKET
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(service.handle_connection, socket_path)
+        where = socket_path
+    print(json.dumps({"listening": where, **service.config}), file=sys.stderr, flush=True)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+# ---------------------------------------------------------------------------
+# Load test
+
+def load_test_requests(n, seed=0):
+    """n (action, payload) pairs, half predict_budget and half recommend_destination, shuffled"""
+    from benchmarks import budget_payloads, destination_payloads
+    half = n // 2
+    requests = [("predict_budget", p) for p in budget_payloads(half, seed)]
+    requests += [("recommend_destination", p) for p in destination_payloads(n - half, seed)]
+    import random
+    random.Random(seed).shuffle(requests)
+    return requests
+
+async def closed_loop_client(socket_path, requests, latencies):
+    """Send `requests` one at a time over one connection, appending each round trip (ms) to `latencies`"""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    try:
+        for i, (action, payload) in enumerate(requests):
+            start = time.perf_counter()
+            writer.write((json.dumps({"id": i, "action": action, "payload": payload}) + "\n").encode())
+            res = json.loads(await reader.readline())
+            latencies.append((time.perf_counter() - start) * 1000)
+            if "error" in res:
+                raise RuntimeError(res["error"])
+    finally:
+        writer.close()
+
+async def drive_clients(socket_path, requests, clients, stats_action="service_stats"):
+    """Split `requests` over `clients` connections; returns (seconds, latencies, stats reply)"""
+    latencies = []
+    shares = [requests[i::clients] for i in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(closed_loop_client(socket_path, share, latencies) for share in shares))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write((json.dumps({"action": stats_action}) + "\n").encode())
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return elapsed, latencies, stats
+
+def _service_run(requests, clients, window_ms, max_batch):
+    """Start a service subprocess and drive it with `clients` closed-loop connections"""
+    import tempfile
+    import subprocess
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "svc.sock")
+        env = dict(os.environ, SAFAR_PREDICT_CACHE="0")
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--socket", socket_path,
+             "--window-ms", str(window_ms), "--max-batch", str(max_batch)],
+            env=env, stderr=subprocess.PIPE, text=True)
+        try:
+            proc.stderr.readline()  # "listening" line
+            asyncio.run(drive_clients(socket_path, requests[:200], clients))  # warm-up
+            return asyncio.run(drive_clients(socket_path, requests, clients))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+def _process_run(requests, concurrency):
+    """One `python predict.py <action> <payload>` process per request, `concurrency` at a time"""
+    import subprocess
+    from concurrent.futures import ThreadPoolExecutor as Pool
+    env = dict(os.environ, SAFAR_PREDICT_CACHE="0")
+    predict_py = os.path.join(predict.BASE_DIR, "predict.py")
+
+    def one(request):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, predict_py, request[0], json.dumps(request[1])],
+                       env=env, capture_output=True, check=True)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with Pool(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, requests))
+    return time.perf_counter() - start, latencies
+
+def run_load_test(clients=64, n_requests=5000, process_requests=100, window_ms=WINDOW_MS, max_batch=MAX_BATCH):
+    from latency_stats import percentile
+    requests = load_test_requests(n_requests)
+
+    print("\n" + "="*72)
+    print(f"🚦 Load test: {clients} concurrent clients, half predict_budget / half recommend_destination")
+    print("="*72)
+    rows = []
+
+    def report(label, n, elapsed, latencies, extra=""):
+        row = {"mode": label, "requests": n, "req_per_s": n / elapsed,
+               "p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99)}
+        rows.append(row)
+        print(f"{label:<34} {row['req_per_s']:>9,.0f} req/s   p50 {row['p50_ms']:8.2f} ms"
+              f"   p99 {row['p99_ms']:8.2f} ms{extra}")
+
+    elapsed, latencies = _process_run(requests[:process_requests], min(clients, os.cpu_count() or 1) * 2)
+    report("process per request", process_requests, elapsed, latencies)
+    for label, window, batch in (("service, no batching", 0, 1),
+                                 (f"service, {window_ms:g} ms / {max_batch} window", window_ms, max_batch)):
+        elapsed, latencies, stats = _service_run(requests, clients, window, batch)
+        sizes = [stats["service"]["actions"][a]["batch_size"]["mean"] for a in BATCHED_ACTIONS]
+        report(label, len(requests), elapsed, latencies,
+               f"   mean batch {sum(sizes) / len(sizes):5.1f}")
+    return rows
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def option(name, cast, default):
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    window_ms = option("--window-ms", float, WINDOW_MS)
+    max_batch = option("--max-batch", int, MAX_BATCH)
+    if "--load-test" in args:
+        run_load_test(clients=option("--clients", int, 64), n_requests=option("--requests", int, 5000),
+                      process_requests=option("--process-requests", int, 100),
+                      window_ms=window_ms, max_batch=max_batch)
+    else:
+        try:
+            asyncio.run(run_server(socket_path=option("--socket", str, None), port=option("--port", int, None),
+                                   window_ms=window_ms, max_batch=max_batch,
+                                   queue_size=option("--queue-size", int, QUEUE_SIZE)))
+        except KeyboardInterrupt:
+            pass
@@ -1,9 +1,12 @@
 import json
 import os
 import joblib
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Any
 
+from tracing import stage
+
 MODEL_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "models", "budget_regressor.pkl")
 )
@@ -120,15 +123,139 @@ def score_itinerary(candidate: ItineraryCandidate, budget_prediction: float, saf
         }
     }
 
+# Search space for search_itinerary_candidates (rest days are bounded by trip length)
+SEARCH_ACTIVITY_HOURS = np.arange(2.0, 10.5, 0.5)
+SEARCH_SIGHTSEEING_DENSITY = np.round(np.arange(0.5, 1.55, 0.1), 2)
+SEARCH_BUDGET_MULTIPLIERS = np.round(np.arange(0.6, 1.45, 0.05), 2)
+
+CANDIDATE_DTYPE = np.dtype([
+    ("candidate_id", np.int32),
+    ("daily_activity_hours", np.float64),
+    ("rest_days", np.int32),
+    ("sightseeing_density", np.float64),
+    ("estimated_budget", np.float64),
+    ("travel_fatigue_score", np.float64),
+])
+
+def enumerate_itinerary_candidates(num_days: int, user_preferences: Dict,
+                                   activity_hours=SEARCH_ACTIVITY_HOURS,
+                                   densities=SEARCH_SIGHTSEEING_DENSITY,
+                                   budget_multipliers=SEARCH_BUDGET_MULTIPLIERS) -> np.ndarray:
+    """
+    Every daily_activity_hours x rest_days x sightseeing_density x budget
+    multiplier combination as one structured array (one row per candidate)
+    instead of ItineraryCandidate objects.
+    """
+    rest_days = np.arange(0, max(1, num_days))
+    hours, rest, density, mult = (
+        grid.ravel() for grid in np.meshgrid(activity_hours, rest_days, densities, budget_multipliers, indexing="ij")
+    )
+    candidates = np.zeros(hours.size, dtype=CANDIDATE_DTYPE)
+    candidates["candidate_id"] = np.arange(1, hours.size + 1)
+    candidates["daily_activity_hours"] = hours
+    candidates["rest_days"] = rest
+    candidates["sightseeing_density"] = density
+    candidates["estimated_budget"] = user_preferences.get("daily_budget", 5000) * num_days * mult
+    # Same formula as ItineraryCandidate.calculate_fatigue
+    candidates["travel_fatigue_score"] = np.maximum(0, hours * 0.6 - rest * 1.2)
+    return candidates
+
+def score_itinerary_candidates(candidates: np.ndarray, budget_prediction: float,
+                               safety_compliant: bool = True) -> Dict[str, np.ndarray]:
+    """Vectorised score_itinerary: every penalty, bonus and score column in one NumPy pass"""
+    hours = candidates["daily_activity_hours"]
+    rest = candidates["rest_days"]
+    safety_penalty = 0.0 if safety_compliant else 0.4
+    fatigue_penalty = np.minimum(0.25, candidates["travel_fatigue_score"] * 0.03)
+    budget_deviation = np.abs(candidates["estimated_budget"] - budget_prediction) / max(1, budget_prediction)
+    budget_penalty = np.minimum(0.2, budget_deviation * 0.2)
+    activity_bonus = np.where((hours >= 4) & (hours <= 8), 0.05, 0.0)
+    rest_bonus = np.where((rest >= 1) & (rest <= 2), 0.05, 0.0)
+    score = 1.0 - safety_penalty - fatigue_penalty - budget_penalty + activity_bonus + rest_bonus
+    return {
+        "itinerary_score": np.clip(score, 0, 1.0),
+        "unclipped_score": score,
+        "fatigue_penalty": fatigue_penalty,
+        "budget_deviation": budget_deviation,
+        "budget_penalty": budget_penalty,
+        "activity_balance_bonus": activity_bonus,
+        "rest_day_bonus": rest_bonus,
+    }
+
+def search_itinerary_candidates(num_days: int, budget_prediction: float, user_preferences: Dict,
+                                safety_compliant: bool = True, top_k: int = 3) -> List[Dict]:
+    """
+    Score the full candidate grid and return the top_k entries, best first,
+    in the same shape optimize_itineraries uses for scored candidates.
+    sightseeing_density does not enter the score, so candidates that differ
+    only in it are one plan: only the first (lowest id) of each is kept.
+    """
+    with stage("enumerate candidate grid"):
+        candidates = enumerate_itinerary_candidates(num_days, user_preferences)
+    with stage("score candidate grid"):
+        scores = score_itinerary_candidates(candidates, budget_prediction, safety_compliant)
+    total = scores["itinerary_score"]
+    # Best score first. Many plans clip to 1.0, so rank by the unclipped
+    # score (same order, but it still carries the rest-day and activity
+    # bonuses), and exact ties by candidate order for stable output. Only
+    # the best `pool` scores are sorted, widening the pool if it holds too
+    # few distinct plans.
+    raw = scores["unclipped_score"]
+    pool = min(raw.size, max(1, top_k) * len(SEARCH_SIGHTSEEING_DENSITY))
+    while True:
+        threshold = np.partition(raw, raw.size - pool)[raw.size - pool]
+        best = np.flatnonzero(raw >= threshold)
+        best = best[np.lexsort((candidates["candidate_id"][best], -raw[best]))]
+        plans = candidates[["daily_activity_hours", "rest_days", "estimated_budget"]][best].tolist()
+        top, seen = [], set()
+        for i, plan in zip(best, plans):
+            if len(top) >= top_k:
+                break
+            if plan not in seen:
+                seen.add(plan)
+                top.append(i)
+        if len(top) >= top_k or best.size == raw.size:
+            break
+        pool = min(raw.size, pool * 4)
+
+    results = []
+    for i in top:
+        c = candidates[i]
+        results.append({
+            "candidate": {
+                "candidate_id": int(c["candidate_id"]),
+                "daily_activity_hours": float(c["daily_activity_hours"]),
+                "rest_days": int(c["rest_days"]),
+                "sightseeing_density": round(float(c["sightseeing_density"]), 2),
+                "estimated_budget": round(float(c["estimated_budget"]), 2),
+                "travel_fatigue_score": round(float(c["travel_fatigue_score"]), 2)
+            },
+            "itinerary_score": round(float(total[i]), 3),
+            "scoring_breakdown": {
+                "safety_compliance": 1.0 if safety_compliant else 0.0,
+                "fatigue_penalty": round(float(scores["fatigue_penalty"][i]), 3),
+                "budget_deviation": round(float(scores["budget_deviation"][i]), 3),
+                "budget_penalty": round(float(scores["budget_penalty"][i]), 3),
+                "activity_balance_bonus": round(float(scores["activity_balance_bonus"][i]), 3),
+                "rest_day_bonus": round(float(scores["rest_day_bonus"][i]), 3)
+            }
+        })
+    return results
+
 def select_best_itinerary(scored_candidates: List[Dict]) -> Dict:
     """Select the highest-scoring itinerary"""
     return max(scored_candidates, key=lambda x: x["itinerary_score"])
 
 def optimize_itineraries(destination: str, num_days: int, budget_prediction: float, 
-                        user_preferences: Dict, safety_rules: Dict = None) -> Dict[str, Any]:
+                        user_preferences: Dict, safety_rules: Dict = None,
+                        search: bool = False, top_k: int = 3, plan_days: bool = False) -> Dict[str, Any]:
     """
     Main orchestrator function that generates, scores, and selects optimal itinerary.
     Returns structured JSON with all candidates, scores, and explanation.
+    With search=True the three hand-written candidates are replaced by the
+    top_k of a vectorised search over thousands of combinations.
+    With plan_days=True the selected itinerary's hours and rest days are
+    turned into a day-by-day attraction schedule for the destination's city.
     """
     if safety_rules is None:
         safety_rules = {"high_risk_destinations": []}
@@ -136,26 +263,36 @@ def optimize_itineraries(destination: str, num_days: int, budget_prediction: flo
     # Check safety compliance
     is_safe = destination not in safety_rules.get("high_risk_destinations", [])
     
-    # Generate candidates
-    candidates = generate_itinerary_candidates(destination, num_days, user_preferences)
-    
-    # Score each candidate
-    scored_candidates = []
-    for candidate in candidates:
-        score_result = score_itinerary(candidate, budget_prediction, safety_compliant=is_safe)
-        scored_candidates.append({
-            "candidate": candidate.to_dict(),
-            "itinerary_score": score_result["itinerary_score"],
-            "scoring_breakdown": score_result["scoring_breakdown"]
-        })
+    if search:
+        with stage("search candidates"):
+            scored_candidates = search_itinerary_candidates(
+                num_days, budget_prediction, user_preferences, safety_compliant=is_safe, top_k=top_k
+            )
+    else:
+        # Generate candidates
+        with stage("generate candidates"):
+            candidates = generate_itinerary_candidates(destination, num_days, user_preferences)
+        
+        # Score each candidate
+        scored_candidates = []
+        with stage("score candidates"):
+            for candidate in candidates:
+                score_result = score_itinerary(candidate, budget_prediction, safety_compliant=is_safe)
+                scored_candidates.append({
+                    "candidate": candidate.to_dict(),
+                    "itinerary_score": score_result["itinerary_score"],
+                    "scoring_breakdown": score_result["scoring_breakdown"]
+                })
     
     # Select best
-    best = select_best_itinerary(scored_candidates)
+    with stage("select best"):
+        best = select_best_itinerary(scored_candidates)
     
     # Generate explanation
-    explanation = generate_scoring_explanation(best, destination)
+    with stage("explain"):
+        explanation = generate_scoring_explanation(best, destination)
     
-    return {
+    result = {
         "destination": destination,
         "num_days": num_days,
         "budget_prediction": round(budget_prediction, 2),
@@ -163,6 +300,26 @@ def optimize_itineraries(destination: str, num_days: int, budget_prediction: flo
         "selected_itinerary": best,
         "explanation": explanation
     }
+    if plan_days:
+        with stage("plan days"):
+            result["day_plan"] = plan_itinerary_days(destination, num_days, best["candidate"], user_preferences)
+    return result
+
+def plan_itinerary_days(destination: str, num_days: int, candidate: Dict, user_preferences: Dict) -> Dict:
+    """Schedule the destination's city attractions under the candidate's daily hours and rest days"""
+    from knowledge_graph import get_knowledge_graph
+    from attraction_scheduler import schedule_city
+
+    kg = get_knowledge_graph()
+    row = kg.get(destination)
+    city = row["City"] if row else destination
+    return schedule_city(
+        city, num_days,
+        daily_hours=candidate["daily_activity_hours"],
+        rest_days=candidate["rest_days"],
+        fee_budget=user_preferences.get("entrance_fee_budget"),
+        kg=kg,
+    )
 
 def generate_scoring_explanation(best_candidate: Dict, destination: str) -> str:
     """Generate human-readable explanation of why this itinerary scored highest"""
@@ -0,0 +1,88 @@
+"""
+In-memory knowledge graph over clean_data/destinations_knowledge_graph.csv.
+The CSV is parsed once per process into keyed rows plus secondary indexes,
+so destination lookups and State/City/Zone/FocusTrait filters are dict hits
+instead of a pandas read and boolean mask per request.
+"""
+
+import os
+import csv
+
+BASE_DIR = os.path.dirname(__file__)
+KG_PATH = os.path.join(BASE_DIR, "clean_data", "destinations_knowledge_graph.csv")
+
+NUMERIC_COLUMNS = {"HoursNeeded": float, "Rating": float, "EntranceFee": int}
+INDEXED_COLUMNS = ("State", "City", "Zone", "FocusTrait")
+
+class KnowledgeGraph:
+    """Destination rows keyed by name, with secondary indexes on INDEXED_COLUMNS"""
+    def __init__(self, rows):
+        self.rows = rows
+        self._by_destination = {}
+        self._indexes = {col: {} for col in INDEXED_COLUMNS}
+        for i, row in enumerate(rows):
+            # Keep the first row for a name, matching the old `.iloc[0]` lookups
+            self._by_destination.setdefault(row.get("Destination"), i)
+            for col, index in self._indexes.items():
+                index.setdefault(row.get(col), []).append(i)
+
+    @classmethod
+    def from_csv(cls, path=KG_PATH):
+        """Graph for `path`, read from its columnar .npz copy when that is fresh"""
+        from columnar_store import read_records
+        rows = read_records(path, casts=NUMERIC_COLUMNS)
+        if rows is not None:
+            return cls(rows)
+        if not os.path.exists(path):
+            return cls([])
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [_parse_row(row) for row in csv.DictReader(f)]
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, destination):
+        return destination in self._by_destination
+
+    def get(self, destination):
+        """Row for a destination name, or None"""
+        i = self._by_destination.get(destination)
+        return None if i is None else self.rows[i]
+
+    def find(self, column, value):
+        """All rows whose indexed `column` equals `value`"""
+        if column not in self._indexes:
+            raise KeyError(f"{column} is not an indexed column")
+        return [self.rows[i] for i in self._indexes[column].get(value, [])]
+
+    def values(self, column):
+        """Distinct values of an indexed column"""
+        return list(self._indexes[column])
+
+def _parse_row(row):
+    for col, cast in NUMERIC_COLUMNS.items():
+        val = row.get(col)
+        if val is None or val == "":
+            row[col] = None
+            continue
+        try:
+            row[col] = cast(float(val))
+        except (TypeError, ValueError):
+            row[col] = None
+    return row
+
+_GRAPHS = {}
+
+def has_knowledge_graph(path=KG_PATH):
+    return path in _GRAPHS
+
+def set_knowledge_graph(graph, path=KG_PATH):
+    """Install an already-built graph for `path`, e.g. from the serving snapshot"""
+    _GRAPHS[path] = graph
+
+def get_knowledge_graph(path=KG_PATH):
+    """Process-wide KnowledgeGraph for `path`, parsed on first use"""
+    if path not in _GRAPHS:
+        _GRAPHS[path] = KnowledgeGraph.from_csv(path)
+    return _GRAPHS[path]
@@ -0,0 +1,11 @@
+"""
+Summary statistics shared by the benchmarks and load tests.
+
+Stdlib only, so any script can import it without pulling in a CLI.
+"""
+
+def percentile(values, pct):
+    """Nearest-rank `pct` percentile of `values` (0-100)"""
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
@@ -0,0 +1,111 @@
+"""
+Version manifest for the model artifacts in models/.
+
+Every writer of models/ (train_models.py, including incremental updates,
+and `predict.py build_snapshot`) finishes by writing
+models/manifest.json: a version id derived from the content of every
+artifact, plus a [mtime_ns, size, sha1] stamp per artifact. Readers trust a
+matching mtime and size, and fall back to comparing content when only the
+mtime differs, so a copy of models/ (cp -r, rsync without -t, a backup
+restore) still matches its manifest and keeps its version. It is written to a temporary file and renamed
+into place, so a reader sees either the previous manifest or the complete
+new one, never a half-trained set of files. Long-running predict.py
+processes poll it to decide when to load, warm and swap in new models.
+
+Stdlib only; predict.py reads it on every cold start.
+"""
+
+import os
+import json
+import time
+
+BASE_DIR = os.path.dirname(__file__)
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+MANIFEST_PATH = os.path.join(MODELS_DIR, "manifest.json")
+
+def artifact_digest(path):
+    """sha1 of an artifact's bytes; for a .forest directory's meta.json, of every file in the directory"""
+    import hashlib
+    h = hashlib.sha1()
+    if os.path.basename(path) == "meta.json" and os.path.dirname(path).endswith(".forest"):
+        forest_dir = os.path.dirname(path)
+        files = [os.path.join(forest_dir, name) for name in sorted(os.listdir(forest_dir))]
+    else:
+        files = [path]
+    for file_path in files:
+        h.update(os.path.basename(file_path).encode() + b"\0")
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+def artifact_stamps(models_dir=MODELS_DIR):
+    """{relative path: [mtime_ns, size, sha1]} of the files predict.py loads models from"""
+    stamps = {}
+    for entry in sorted(os.listdir(models_dir)):
+        path = os.path.join(models_dir, entry)
+        if entry.endswith(".forest"):
+            path = os.path.join(path, "meta.json")
+            entry = os.path.join(entry, "meta.json")
+        elif not entry.endswith((".pkl", ".npz")):
+            continue
+        try:
+            st = os.stat(path)
+            stamps[entry] = [st.st_mtime_ns, st.st_size, artifact_digest(path)]
+        except OSError:
+            continue
+    return stamps
+
+def artifact_matches(path, stamp, st=None):
+    """
+    True when `path` is the artifact `stamp` describes: same mtime and size,
+    or the same size and content (a copy that did not keep mtimes)
+    """
+    try:
+        st = st or os.stat(path)
+    except OSError:
+        return False
+    if stamp is None or [st.st_mtime_ns, st.st_size] == stamp[:2]:
+        return stamp is not None
+    if len(stamp) < 3 or st.st_size != stamp[1]:
+        return False
+    try:
+        return artifact_digest(path) == stamp[2]
+    except OSError:
+        return False
+
+def write_manifest(models_dir=MODELS_DIR, path=None):
+    """Stamp the current artifacts with a new version; returns the manifest"""
+    import hashlib
+    path = path or os.path.join(models_dir, "manifest.json")
+    stamps = artifact_stamps(models_dir)
+    # Content only, so a copy of models/ keeps the same version
+    contents = {entry: stamp[2] for entry, stamp in stamps.items()}
+    digest = hashlib.sha1(json.dumps(contents, sort_keys=True).encode()).hexdigest()[:12]
+    manifest = {
+        "version": digest,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "artifacts": stamps,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+def read_manifest(path=MANIFEST_PATH):
+    """The manifest dict, or None when there is none (or it is unreadable)"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) and "version" in manifest else None
+
+def manifest_stamp(path=MANIFEST_PATH):
+    """(mtime_ns, size, inode) of the manifest, a cheap change check for pollers"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
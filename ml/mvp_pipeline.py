@@ -1,12 +1,26 @@
 """
 MVP Pipeline: Train budget model + Demonstrate Itinerary Optimizer
 This creates a fully working 60% MVP in one script.
+
+Bulk planning re-plans a whole file of trips (e.g. an export of the
+trip_intents table) offline:
+
+    python mvp_pipeline.py --bulk trips.csv|trips.ndjson|- [--out plans.ndjson]
+        [--chunk-size 2000] [--workers N] [--search] [--plan-days]
+
+Trips are read as a stream, budgets are predicted a chunk at a time with
+the serving model (loaded once), itineraries are optimised in a process
+pool and one NDJSON line per trip is written as soon as it is ready, so
+memory stays flat however long the input is.
 """
 
 import os
 import sys
+import csv
 import json
+import time
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import pandas as pd
 import numpy as np
 import joblib
@@ -15,10 +29,15 @@ import joblib
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from itinerary_optimizer import optimize_itineraries
+from compiled_forest import export_compiled
 
 DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/synthetic_travel_costs.csv"))
 MODEL_OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../models"))
 MODEL_PATH = os.path.join(MODEL_OUTPUT_DIR, "budget_regressor.pkl")
+# The compiled copy stays next to the pickle. The MVP model (50 trees, depth
+# 8, synthetic costs) is not the one train_models.py publishes to ml/models/
+# for predict.py, so it must not replace that one.
+COMPILED_MODEL_PATH = os.path.join(MODEL_OUTPUT_DIR, "budget_regressor.forest")
 
 def train_budget_model_mvp():
     """Train budget prediction model (MVP version - fast, simple)"""
@@ -83,11 +102,23 @@ def train_budget_model_mvp():
     joblib.dump(pipeline, MODEL_PATH)
     print(f"   💾 Model saved to {MODEL_PATH}")
     
+    # Memory-mappable copy that inference workers share through the page cache
+    max_diff = export_compiled(pipeline, X_test, COMPILED_MODEL_PATH)
+    print(f"   ⚡ Compiled model saved to {COMPILED_MODEL_PATH} (parity max diff {max_diff:.2e})")
+    
     return True
 
+_MVP_MODEL = {}
+
+def load_mvp_model():
+    """The MVP budget pipeline, loaded once per process"""
+    if "model" not in _MVP_MODEL:
+        _MVP_MODEL["model"] = joblib.load(MODEL_PATH)
+    return _MVP_MODEL["model"]
+
 def predict_budget(destination, num_days, num_people, season, comfort_level, trip_type, airport_dist_km):
     """Use trained model to predict trip cost"""
-    model = joblib.load(MODEL_PATH)
+    model = load_mvp_model()
     
     input_data = pd.DataFrame([{
         "destination": destination,
@@ -196,6 +227,218 @@ def save_mvp_output(results):
     print(f"\n✅ MVP output saved to {output_path}")
     return output_path
 
+# Trips per budget-prediction batch, and per pool task for the optimiser
+BULK_CHUNK_SIZE = 2000
+OPTIMIZE_TASK_SIZE = 64
+
+# Stands in for an NDJSON line that does not parse, so it gets its own error line
+_INVALID_TRIP = object()
+
+def _decode_trip(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return _INVALID_TRIP
+
+def read_trips(path):
+    """
+    Stream trip dicts from a CSV file, an NDJSON file or "-" (NDJSON on
+    stdin). CSV cells holding JSON (e.g. a user_preferences column) are
+    decoded.
+    """
+    if path == "-":
+        for line in sys.stdin:
+            if line.strip():
+                yield _decode_trip(line)
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl", ".json")):
+            for line in f:
+                if line.strip():
+                    yield _decode_trip(line)
+            return
+        for row in csv.DictReader(f):
+            trip = {}
+            for key, value in row.items():
+                if value is None or value == "":
+                    continue
+                if value[:1] in "[{":
+                    try:
+                        value = json.loads(value)
+                    except ValueError:
+                        pass
+                trip[key] = value
+            yield trip
+
+def trip_budget_payload(trip):
+    """
+    predict.py budget payload for a trip row (trip_intents / MVP demo field
+    names); raises ValueError for a trip that cannot be planned
+    """
+    if trip is _INVALID_TRIP:
+        raise ValueError("Invalid JSON")
+    if not isinstance(trip, dict):
+        raise ValueError("Trip must be a JSON object")
+
+    def first(*keys, default=None):
+        for key in keys:
+            if trip.get(key) not in (None, ""):
+                return trip[key]
+        return default
+
+    def number(*keys, default, cast=float, minimum=None):
+        value = first(*keys, default=default)
+        try:
+            parsed = cast(float(value))
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"{keys[0]} must be a number, got {value!r}") from None
+        if minimum is not None and parsed < minimum:
+            raise ValueError(f"{keys[0]} must be at least {minimum}, got {value!r}")
+        return parsed
+
+    return {
+        "destination": first("destination", default="Hampta Pass"),
+        "numDays": number("num_days", "number_of_days", "numDays", default=4, cast=int, minimum=1),
+        "numPeople": number("num_people", "number_of_people", "numPeople", default=1, cast=int, minimum=1),
+        "season": first("season", default="Winter"),
+        "comfortLevel": first("comfort_level", "comfortLevel", default="Standard"),
+        "tripType": first("trip_type", "tripType", default="Adventure"),
+        "airportDist": number("airport_dist_km", "airportDist", default=50.0),
+    }
+
+def _optimize_batch(jobs, search, plan_days):
+    """Pool task: optimise a list of (row, trip_id, payload, budget, preferences) jobs"""
+    results = []
+    for row, trip_id, payload, budget, preferences in jobs:
+        record = {"row": row, "trip_id": trip_id}
+        try:
+            result = optimize_itineraries(
+                destination=payload["destination"],
+                num_days=payload["numDays"],
+                budget_prediction=budget,
+                user_preferences=preferences,
+                search=search,
+                plan_days=plan_days,
+            )
+            record.update(result)
+        except Exception as e:
+            record["error"] = str(e)
+        results.append(record)
+    return results
+
+def plan_trips_bulk(path, out=sys.stdout, chunk_size=BULK_CHUNK_SIZE, workers=None,
+                    search=False, plan_days=False, task_size=OPTIMIZE_TASK_SIZE):
+    """
+    Re-plan every trip in `path`, writing one NDJSON result per trip to `out`
+    in completion order (each carries its input "row" and "trip_id").
+    At most two chunks of trips are in flight at once. Returns a summary.
+    """
+    import predict
+
+    started = time.perf_counter()
+    workers = workers if workers is not None else os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = set()
+    summary = {"trips": 0, "planned": 0, "errors": 0}
+
+    def write(records):
+        for record in records:
+            summary["planned" if "error" not in record else "errors"] += 1
+            out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    def drain(limit):
+        nonlocal pending
+        while len(pending) > limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(future.result())
+
+    def predict_budgets(payloads):
+        try:
+            return predict.predict_batch_budget(payloads)
+        except Exception:
+            # Fall back to one call per trip so only the failing trip errors
+            budgets = []
+            for payload in payloads:
+                try:
+                    budgets.append(predict.predict_batch_budget([payload])[0])
+                except Exception as e:
+                    budgets.append({"error": str(e)})
+            return budgets
+
+    def flush(chunk):
+        # A trip that cannot be planned gets an error line; the rest go on
+        planned, payloads = [], []
+        for row, trip in chunk:
+            trip_id = trip.get("trip_id") if isinstance(trip, dict) else None
+            try:
+                payloads.append(trip_budget_payload(trip))
+            except ValueError as e:
+                write([{"row": row, "trip_id": trip_id, "error": str(e)}])
+                continue
+            planned.append((row, trip))
+        budgets = predict_budgets(payloads) if payloads else []
+        jobs = []
+        for (row, trip), payload, budget in zip(planned, payloads, budgets):
+            if "error" in budget:
+                write([{"row": row, "trip_id": trip.get("trip_id"), "error": budget["error"]}])
+                continue
+            preferences = trip.get("user_preferences") or {}
+            if not isinstance(preferences, dict):
+                preferences = {}
+            if "daily_budget" not in preferences:
+                preferences = dict(preferences, daily_budget=budget["predicted_budget"] / payload["numDays"])
+            jobs.append((row, trip.get("trip_id"), payload, budget["predicted_budget"], preferences))
+        for i in range(0, len(jobs), task_size):
+            batch = jobs[i:i + task_size]
+            if pool is None:
+                write(_optimize_batch(batch, search, plan_days))
+            else:
+                pending.add(pool.submit(_optimize_batch, batch, search, plan_days))
+        # Keep about two chunks' worth of tasks queued: enough to keep every
+        # worker busy while the next chunk's budgets are predicted
+        drain(2 * max(1, -(-chunk_size // task_size)))
+
+    try:
+        chunk = []
+        for row, trip in enumerate(read_trips(path)):
+            summary["trips"] += 1
+            chunk.append((row, trip))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+        drain(0)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    summary["elapsed_s"] = round(time.perf_counter() - started, 3)
+    summary["trips_per_s"] = round(summary["trips"] / max(summary["elapsed_s"], 1e-9), 1)
+    return summary
+
+def bulk_main(args):
+    def option(name, cast, default):
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    path = args[args.index("--bulk") + 1]
+    out_path = option("--out", str, None)
+    out = open(out_path, "w") if out_path else sys.stdout
+    try:
+        summary = plan_trips_bulk(
+            path, out,
+            chunk_size=option("--chunk-size", int, BULK_CHUNK_SIZE),
+            workers=option("--workers", int, None),
+            search="--search" in args,
+            plan_days="--plan-days" in args,
+        )
+    finally:
+        if out_path:
+            out.close()
+    print(f"🧳 Planned {summary['planned']:,}/{summary['trips']:,} trips ({summary['errors']} errors) "
+          f"in {summary['elapsed_s']:.1f}s ({summary['trips_per_s']:,.0f} trips/s)", file=sys.stderr)
+
 def main():
     print("\n" + "="*60)
     print("SAFAR.AI - ITINERARY OPTIMIZATION MVP PIPELINE")
@@ -233,4 +476,7 @@ def main():
     print("   → Advanced constraint satisfaction")
 
 if __name__ == "__main__":
-    main()
+    if "--bulk" in sys.argv:
+        bulk_main(sys.argv[1:])
+    else:
+        main()
@@ -1,49 +1,388 @@
 import sys
 import json
 import os
-import joblib
-import pandas as pd
+import math
+import time
+
+import contextlib
+import contextvars
+
+import tracing
+from tracing import stage as profile_stage
+
+# Everything heavier than the stdlib (numpy, pandas, sklearn, joblib) is
+# imported inside the action that needs it, so argument errors and
+# snapshot-backed single predictions never pay for it.
 
 BASE_DIR = os.path.dirname(__file__)
 MODELS_DIR = os.path.join(BASE_DIR, "models")
+# Version tag of models trained before train_models.py wrote a manifest
+UNVERSIONED = "unversioned"
 
-def predict_destination(payload):
-    model_path = os.path.join(MODELS_DIR, "destination_recommender.pkl")
-    if not os.path.exists(model_path):
-        return {"error": "Model not found"}
-        
-    model = joblib.load(model_path)
-    
+# Imports, loads and request stages are timed with profile_stage (see
+# tracing.py); it records nothing unless --profile-startup or request
+# tracing (SAFAR_TRACE / "trace": true) is collecting.
+
+def report_startup_profile(started, records):
+    """Write the recorded stages to stderr so stdout stays one JSON document"""
+    stages = [
+        {"stage": stage, "ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3)}
+        for stage, wall, cpu in records
+    ]
+    total_ms = round((time.perf_counter() - started) * 1000, 3)
+    sys.stderr.write(json.dumps({"startup_profile": stages, "main_total_ms": total_ms}) + "\n")
+
+class ModelGeneration:
+    """
+    Everything loaded from one version of models/: the models, the serving
+    snapshot and the recommendation table. A one-shot CLI call fills one
+    generation; `serve` keeps it warm across requests and swaps in a fresh,
+    pre-warmed generation when train_models.py publishes a new manifest.
+    Files are only loaded while they still match the manifest's stamps, so
+    a lazy load cannot pick up a half-finished retrain.
+    """
+    def __init__(self, version, artifacts=None):
+        self.version = version
+        self.artifacts = artifacts
+        self.models = {}
+        self.snapshot = {}
+        self._checked = {}
+
+    def has(self, relpath):
+        """True when models/`relpath` exists and is the file this generation's manifest stamped"""
+        path = os.path.join(MODELS_DIR, relpath)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if self.artifacts is None:
+            return True
+        # A content comparison (after a copy reset mtimes) runs once per file
+        key = (relpath, st.st_mtime_ns, st.st_size)
+        if key not in self._checked:
+            import model_manifest
+            self._checked[key] = model_manifest.artifact_matches(path, self.artifacts.get(relpath), st)
+        return self._checked[key]
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        if manifest is None:
+            return cls(UNVERSIONED)
+        return cls(manifest["version"], manifest.get("artifacts", {}))
+
+# The generation new requests start on, and the one the current request is
+# pinned to (so a swap mid-request cannot mix versions)
+_ACTIVE = []
+_PINNED = contextvars.ContextVar("model_generation", default=None)
+
+def active_generation():
+    if not _ACTIVE:
+        with profile_stage("read manifest"):
+            import model_manifest
+            manifest = model_manifest.read_manifest()
+        _ACTIVE.append(ModelGeneration.from_manifest(manifest))
+    return _ACTIVE[0]
+
+def current_generation():
+    return _PINNED.get() or active_generation()
+
+@contextlib.contextmanager
+def pinned_generation(generation=None):
+    """Run the block against one generation (default: the active one) and yield it"""
+    generation = generation or current_generation()
+    token = _PINNED.set(generation)
+    try:
+        yield generation
+    finally:
+        _PINNED.reset(token)
+
+class PipelineEngine:
+    """Adapts a pickled sklearn pipeline to the row-dict interface of CompiledPipeline"""
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.classes_ = getattr(pipeline, "classes_", None)
+
+    def predict(self, rows):
+        with profile_stage("import pandas"):
+            import pandas as pd
+        with profile_stage("build DataFrame"):
+            frame = pd.DataFrame(rows)
+        with profile_stage("sklearn predict"):
+            return self.pipeline.predict(frame)
+
+    def predict_proba(self, rows):
+        with profile_stage("import pandas"):
+            import pandas as pd
+        with profile_stage("build DataFrame"):
+            frame = pd.DataFrame(rows)
+        with profile_stage("sklearn predict_proba"):
+            return self.pipeline.predict_proba(frame)
+
+    def predict_quantiles(self, rows, quantiles):
+        """(mean, quantiles) over the forest's trees, from one apply() pass for all of them"""
+        import numpy as np
+        with profile_stage("import pandas"):
+            import pandas as pd
+        preprocessor, forest = self.pipeline.steps[0][1], self.pipeline.steps[-1][1]
+        with profile_stage("build DataFrame"):
+            X = preprocessor.transform(pd.DataFrame(rows))
+        with profile_stage("sklearn apply"):
+            leaves = forest.apply(X)
+        per_tree = np.column_stack([
+            est.tree_.value[leaves[:, i], 0, 0] for i, est in enumerate(forest.estimators_)
+        ])
+        return per_tree.mean(axis=1), np.quantile(per_tree, quantiles, axis=1).T
+
+def load_serving_snapshot():
+    """The pre-built serving snapshot if present and fresh, else None (loaded once per generation)"""
+    generation = current_generation()
+    loaded = generation.snapshot
+    if "state" not in loaded:
+        loaded["state"] = None
+        if generation.has("serving_snapshot.pkl"):
+            with profile_stage("import serving_snapshot"):
+                import serving_snapshot
+            with profile_stage("load serving_snapshot.pkl"):
+                loaded["state"] = serving_snapshot.load_snapshot()
+    return loaded["state"]
+
+def load_model(name):
+    """
+    Load model `name` from MODELS_DIR, reusing it if already loaded.
+    Prefers the serving snapshot (one read, no numpy), then the compiled
+    `<name>.forest` export, memory-mapped and free of pandas and sklearn,
+    and falls back to the pickled `<name>.pkl` pipeline. Returns None when
+    the model was never trained; raises RuntimeError when its files changed
+    without a new manifest (a retrain still in progress).
+    """
+    generation = current_generation()
+    models = generation.models
+    if name not in models:
+        snapshot = load_serving_snapshot()
+        compiled_path = os.path.join(MODELS_DIR, f"{name}.forest")
+        model_path = os.path.join(MODELS_DIR, f"{name}.pkl")
+        if snapshot is not None and name in snapshot["models"]:
+            models[name] = snapshot["models"][name]
+        elif generation.has(os.path.join(f"{name}.forest", "meta.json")):
+            with profile_stage("import compiled_forest"):
+                from compiled_forest import CompiledPipeline
+            with profile_stage(f"load {name}.forest"):
+                models[name] = CompiledPipeline.load(compiled_path)
+        elif generation.has(f"{name}.pkl"):
+            with profile_stage("import joblib"):
+                import joblib
+            with profile_stage(f"load {name}.pkl"):
+                models[name] = PipelineEngine(joblib.load(model_path))
+        elif model_version(name) != "missing":
+            raise RuntimeError(f"{name} changed after model version {generation.version} was published; "
+                               "publish it with `python predict.py build_snapshot`")
+        else:
+            return None
+    return models[name]
+
+def load_recommendation_table():
+    """
+    Dense destination table from the snapshot or models/destination_table.npz,
+    or None when absent or disabled with SAFAR_RECOMMENDER_TABLE=0
+    """
+    generation = current_generation()
+    loaded = generation.snapshot
+    if "table" not in loaded:
+        table = None
+        if os.environ.get("SAFAR_RECOMMENDER_TABLE", "1") != "0":
+            with profile_stage("import recommendation_table"):
+                import recommendation_table
+            snapshot = load_serving_snapshot()
+            if snapshot is not None and snapshot.get("recommendation_table") is not None:
+                table = recommendation_table.RecommendationTable(*snapshot["recommendation_table"])
+            elif generation.has(os.path.basename(recommendation_table.TABLE_PATH)):
+                with profile_stage("load destination_table.npz"):
+                    table = recommendation_table.RecommendationTable.load()
+        loaded["table"] = table
+    return loaded["table"]
+
+def load_knowledge_graph():
+    """Process-wide KnowledgeGraph, seeded from the serving snapshot when available"""
+    with profile_stage("import knowledge_graph"):
+        import knowledge_graph
+    snapshot = load_serving_snapshot()
+    if snapshot is not None and snapshot.get("knowledge_graph") is not None:
+        if not knowledge_graph.has_knowledge_graph():
+            knowledge_graph.set_knowledge_graph(knowledge_graph.KnowledgeGraph(snapshot["knowledge_graph"]))
+    with profile_stage("load knowledge graph"):
+        return knowledge_graph.get_knowledge_graph()
+
+# Width (INR) of the budget buckets the recommender is queried with when the
+# result cache is on, so nearby budgets share one cache entry
+BUDGET_BUCKET_INR = float(os.environ.get("SAFAR_BUDGET_BUCKET", 500))
+
+_PREDICTION_CACHE = {}
+
+def get_prediction_cache():
+    """Process-wide PredictionCache, or None when SAFAR_PREDICT_CACHE=0"""
+    if "cache" not in _PREDICTION_CACHE:
+        with profile_stage("import prediction_cache"):
+            import prediction_cache
+        _PREDICTION_CACHE["cache"] = prediction_cache.cache_from_env()
+    return _PREDICTION_CACHE["cache"]
+
+def model_version(name):
+    """Stamp of the model files behind `name`; changes whenever they are rewritten"""
+    for path in (os.path.join(MODELS_DIR, f"{name}.forest", "meta.json"),
+                 os.path.join(MODELS_DIR, f"{name}.pkl")):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        return f"{st.st_mtime_ns}-{st.st_size}"
+    return "missing"
+
+def refresh_model_version(name):
+    """
+    Name to cache `name`'s results under for the current generation. A
+    manifest-versioned generation never changes (it only loads the files its
+    manifest stamped, and every writer of models/ publishes a new manifest),
+    so its results are keyed by its version and old entries simply age out.
+    Models without a manifest fall back to watching their files: when those
+    change, the cached results and the loaded model are dropped.
+    """
+    generation = current_generation()
+    if generation.version != UNVERSIONED:
+        return f"{name}@{generation.version}"
+    cache = get_prediction_cache()
+    if cache is not None and cache.check_version(name, model_version(name)):
+        generation.models.pop(name, None)
+        generation.snapshot.clear()
+    return name
+
+# Model tiers a request can pick with payload["tier"]. "lite" models are the
+# small distilled `<name>_lite` ones train_models.py writes alongside the
+# full forests; see models/lite_parity.json for what they give up.
+MODEL_TIERS = ("full", "lite")
+DEFAULT_TIER = os.environ.get("SAFAR_MODEL_TIER", "full")
+
+def tier_model_name(name, tier):
+    """
+    Model behind `name` at `tier`; lite falls back to full when the current
+    generation has no lite model (never trained, or not published yet)
+    """
+    if tier == "lite":
+        generation = current_generation()
+        lite = f"{name}_lite"
+        if lite in generation.models or any(
+                generation.has(path) for path in (os.path.join(f"{lite}.forest", "meta.json"), f"{lite}.pkl")):
+            return lite
+    return name
+
+def predict_by_tier(name, payloads, predict_group):
+    """
+    Split payloads by requested tier, call predict_group(model_name, group)
+    once per tier and reassemble the responses in input order. Responses to
+    payloads that named a tier say which one answered them; a payload that
+    is not a JSON object gets an error of its own.
+    """
+    groups = {}
+    responses = [None] * len(payloads)
+    for i, payload in enumerate(payloads):
+        if not isinstance(payload, dict):
+            responses[i] = {"error": "Payload must be a JSON object"}
+            continue
+        tier = payload.get("tier", DEFAULT_TIER)
+        if not isinstance(tier, str) or tier not in MODEL_TIERS:
+            responses[i] = {"error": f"Unknown model tier: {tier}"}
+            continue
+        groups.setdefault(tier_model_name(name, tier), []).append(i)
+    for model_name, idx in groups.items():
+        tier = "lite" if model_name.endswith("_lite") else "full"
+        for i, res in zip(idx, predict_group(model_name, [payloads[i] for i in idx])):
+            if "tier" in payloads[i] and "error" not in res:
+                res = dict(res, model_tier=tier)
+            responses[i] = res
+    return responses
+
+def cached_outputs(name, rows, compute):
+    """
+    Model outputs for `rows`, answering repeats from the prediction cache and
+    calling `compute` once with only the rows it has not seen.
+    """
+    cache = get_prediction_cache()
+    if cache is None:
+        return compute(rows)
+    outputs = [cache.get(name, row) for row in rows]
+    missing = [i for i, out in enumerate(outputs) if out is None]
+    if missing:
+        fresh = compute([rows[i] for i in missing])
+        for i, out in zip(missing, fresh):
+            outputs[i] = out
+            cache.put(name, rows[i], out)
+    return outputs
+
+def quantize_destination_features(row):
+    """Snap the budget to its bucket midpoint so nearby budgets hit the same cache entry"""
+    if BUDGET_BUCKET_INR <= 0:
+        return row
+    bucket = int(row["budget"] // BUDGET_BUCKET_INR)
+    return dict(row, budget=(bucket + 0.5) * BUDGET_BUCKET_INR)
+
+def payload_number(payload, key, default, cast=float):
+    """payload[key] (or `default`) as `cast`; raises ValueError naming the field when it is not a finite number"""
+    value = payload.get(key, default)
+    try:
+        number = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{key} must be a number, got {value!r}")
+    if isinstance(value, bool) or not math.isfinite(number):
+        raise ValueError(f"{key} must be a number, got {value!r}")
+    return number
+
+def payload_text(payload, key, default):
+    """payload[key] (or `default`); raises ValueError naming the field when it is not a string"""
+    value = payload.get(key, default)
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string, got {value!r}")
+    return value
+
+def destination_features(payload):
+    """Map a request payload onto the recommender's input columns; raises ValueError on a malformed field"""
     # Needs: budget, days, season, pace, focus
-    input_data = pd.DataFrame([{
-        "budget": float(payload.get("budget", 20000)),
-        "days": int(payload.get("numDays", 4)),
-        "season": payload.get("season", "Winter"),
-        "pace": payload.get("pace", "Slow"),
-        "focus": payload.get("focus", "Nature")
-    }])
-    
-    # Get top 3 probabilities
-    probs = model.predict_proba(input_data)[0]
-    classes = model.classes_
-    
-    top_indices = probs.argsort()[-3:][::-1]
+    return {
+        "budget": payload_number(payload, "budget", 20000),
+        "days": payload_number(payload, "numDays", 4, int),
+        "season": payload_text(payload, "season", "Winter"),
+        "pace": payload_text(payload, "pace", "Slow"),
+        "focus": payload_text(payload, "focus", "Nature")
+    }
+
+def budget_features(payload):
+    """Map a request payload onto the budget regressor's input columns; raises ValueError on a malformed field"""
+    return {
+        "destination": payload_text(payload, "destination", "Hampta Pass"),
+        "number_of_days": payload_number(payload, "numDays", 4, int),
+        "number_of_people": payload_number(payload, "numPeople", 1, int),
+        "season": payload_text(payload, "season", "Winter"),
+        "comfort_level": payload_text(payload, "comfortLevel", "Standard"),
+        "trip_type": payload_text(payload, "tripType", "Adventure"),
+        "airport_dist_km": payload_number(payload, "airportDist", 50.0)
+    }
+
+def top_destinations(probs, classes, k=3):
+    """[destination, probability] pairs for the k most likely classes, best first"""
+    # Stable ascending sort, same tie order as numpy's argsort on small rows
+    top_indices = sorted(range(len(probs)), key=probs.__getitem__)[-k:][::-1]
+    return [[str(classes[idx]), float(probs[idx])] for idx in top_indices]
+
+def build_recommendations(payload, features, top, kg):
+    """Turn the top-3 (destination, probability) pairs into the recommendation list"""
     results = []
     
-    kg_path = os.path.join(BASE_DIR, "clean_data", "destinations_knowledge_graph.csv")
-    df_dest = pd.read_csv(kg_path) if os.path.exists(kg_path) else None
-    
-    for idx in top_indices:
-        dest = classes[idx]
-        prob = probs[idx]
-        reason = f"Matches your {payload.get('pace', 'Slow').lower()} pace and preference for {payload.get('focus', 'Nature').lower()}."
+    for dest, prob in top:
+        reason = f"Matches your {features['pace'].lower()} pace and preference for {features['focus'].lower()}."
         
-        if df_dest is not None:
-            dest_info = df_dest[df_dest["Destination"] == dest]
-            if not dest_info.empty:
-                cat = dest_info.iloc[0]["Category"]
-                rating = dest_info.iloc[0]["Rating"]
-                reason = f"Ranked {rating} stars for {cat}. Perfect for your ₹{payload.get('budget', 20000):,.0f} budget and {input_data['days'][0]}-day timeline."
+        dest_info = kg.get(dest)
+        if dest_info is not None:
+            cat = dest_info["Category"]
+            rating = dest_info["Rating"]
+            reason = f"Ranked {rating} stars for {cat}. Perfect for your ₹{features['budget']:,.0f} budget and {features['days']}-day timeline."
                 
         results.append({
             "destination": dest,
@@ -53,46 +392,531 @@ def predict_destination(payload):
         
     return {"recommendations": results}
 
-def predict_budget(payload):
-    model_path = os.path.join(MODELS_DIR, "budget_regressor.pkl")
-    if not os.path.exists(model_path):
-        return {"error": "Model not found"}
-        
-    model = joblib.load(model_path)
+def predict_batch_destination(payloads):
+    """
+    Score many traveler profiles with a single frame and one predict_proba
+    call over the payloads the prediction cache cannot answer. Returns one
+    response per payload, in input order, each shaped like
+    predict_destination's. payload["tier"] = "lite" scores every row with
+    the distilled model (the dense table is built from the full forest).
+    """
+    if model_version("destination_recommender") == "missing":
+        return [{"error": "Model not found"} for _ in payloads]
+    return predict_by_tier("destination_recommender", payloads, _predict_destination_group)
+
+def _predict_destination_group(model_name, payloads):
+    cache_name = refresh_model_version(model_name)
+    
+    def score(missing):
+        # In-range rows come straight from the dense table (built from the
+        # full forest, and cheaper than either tier); only off-grid rows
+        # (unknown categories, budgets outside the grid) hit the model. The
+        # lite tier skips the table so its answers really are the lite model's.
+        table = None if model_name.endswith("_lite") else load_recommendation_table()
+        tops = [None] * len(missing)
+        off_grid = []
+        with profile_stage("table lookup"):
+            for i, row in enumerate(missing):
+                probs = table.lookup(row) if table is not None else None
+                if probs is None:
+                    off_grid.append(i)
+                else:
+                    tops[i] = top_destinations(probs, table.classes_)
+        if off_grid:
+            model = load_model(model_name)
+            with profile_stage("model predict_proba"):
+                all_probs = model.predict_proba([missing[i] for i in off_grid])
+            for i, row_probs in zip(off_grid, all_probs):
+                tops[i] = top_destinations(row_probs, model.classes_)
+        return tops
+    
+    # A malformed payload gets its own error; the rest are scored together
+    responses = [None] * len(payloads)
+    rows, valid = [], []
+    with profile_stage("build features"):
+        for i, payload in enumerate(payloads):
+            try:
+                rows.append(destination_features(payload))
+            except ValueError as e:
+                responses[i] = {"error": str(e)}
+                continue
+            valid.append(i)
+        model_rows = rows
+        if get_prediction_cache() is not None:
+            model_rows = [quantize_destination_features(row) for row in rows]
+    tops = cached_outputs(cache_name, model_rows, score)
+    
+    kg = load_knowledge_graph()
+    
+    with profile_stage("build recommendations"):
+        for i, row, top in zip(valid, rows, tops):
+            responses[i] = build_recommendations(payloads[i], row, top, kg)
+    return responses
+
+def predict_batch_budget(payloads):
+    """
+    Predict many trip budgets with a single frame and one predict call over
+    the payloads the prediction cache cannot answer. Returns one response
+    per payload, in input order. payload["tier"] = "lite" uses the
+    distilled model. payload["quantiles"] (true for p10/p90, or a list such
+    as [0.05, 0.5, 0.95]) adds "budget_quantiles": the spread of the
+    forest's per-tree predictions, from the same single pass over the trees.
+    """
+    if model_version("budget_regressor") == "missing":
+        return [{"error": "Model not found"} for _ in payloads]
+    return predict_by_tier("budget_regressor", payloads, _predict_budget_group)
+
+# Quantiles returned for payload["quantiles"] = true
+DEFAULT_QUANTILES = (0.1, 0.9)
+
+def budget_quantiles(payload):
+    """Sorted quantiles a budget request asks for, () for none; raises ValueError when malformed"""
+    wanted = payload.get("quantiles")
+    if not wanted:
+        return ()
+    if wanted is True:
+        return DEFAULT_QUANTILES
+    if not isinstance(wanted, list) or not all(isinstance(q, (int, float)) and 0 <= q <= 1 for q in wanted):
+        raise ValueError("quantiles must be true or a list of numbers between 0 and 1")
+    return tuple(sorted(set(float(q) for q in wanted)))
+
+def quantile_label(q):
+    return f"p{q * 100:g}"
+
+def _predict_budget_group(model_name, payloads):
+    cache_name = refresh_model_version(model_name)
     
-    input_data = pd.DataFrame([{
-        "destination": payload.get("destination", "Hampta Pass"),
-        "number_of_days": int(payload.get("numDays", 4)),
-        "number_of_people": int(payload.get("numPeople", 1)),
-        "season": payload.get("season", "Winter"),
-        "comfort_level": payload.get("comfortLevel", "Standard"),
-        "trip_type": payload.get("tripType", "Adventure"),
-        "airport_dist_km": float(payload.get("airportDist", 50.0))
-    }])
+    def score(missing):
+        model = load_model(model_name)
+        # Rows asking for the same quantiles share one pass over the trees
+        groups = {}
+        for i, row in enumerate(missing):
+            groups.setdefault(tuple(row.get("quantiles", ())), []).append(i)
+        outputs = [None] * len(missing)
+        for quantiles, idx in groups.items():
+            rows = [{k: v for k, v in missing[i].items() if k != "quantiles"} for i in idx]
+            if not quantiles:
+                with profile_stage("model predict"):
+                    preds = [float(pred) for pred in model.predict(rows)]
+            else:
+                with profile_stage("model predict_quantiles"):
+                    means, spreads = model.predict_quantiles(rows, list(quantiles))
+                preds = [[float(m)] + [float(v) for v in qs] for m, qs in zip(means, spreads)]
+            for i, pred in zip(idx, preds):
+                outputs[i] = pred
+        return outputs
     
-    pred = model.predict(input_data)[0]
-    return {"predicted_budget": float(pred)}
+    responses = [None] * len(payloads)
+    rows, wanted = [], []
+    with profile_stage("build features"):
+        for i, payload in enumerate(payloads):
+            try:
+                quantiles = budget_quantiles(payload)
+                row = budget_features(payload)
+            except ValueError as e:
+                responses[i] = {"error": str(e)}
+                continue
+            if quantiles and model_name.endswith("_lite"):
+                # Boosted trees are terms of a sum, not samples of the prediction
+                responses[i] = {"error": "Prediction intervals need the full model tier"}
+                continue
+            if quantiles:
+                row["quantiles"] = list(quantiles)
+            rows.append(row)
+            wanted.append((i, quantiles))
+    preds = cached_outputs(cache_name, rows, score)
+    for (i, quantiles), pred in zip(wanted, preds):
+        if quantiles:
+            responses[i] = {
+                "predicted_budget": pred[0],
+                "budget_quantiles": {quantile_label(q): v for q, v in zip(quantiles, pred[1:])},
+            }
+        else:
+            responses[i] = {"predicted_budget": float(pred)}
+    return responses
+
+def predict_destination(payload):
+    return predict_batch_destination([payload])[0]
+
+def predict_budget(payload):
+    return predict_batch_budget([payload])[0]
+
+def load_similarity_index():
+    """
+    SimilarityIndex from models/similarity_index.npz. Without a manifest it
+    is rebuilt and saved when stale; a manifest generation loads the index
+    it stamped, or builds one in memory when that file has since changed.
+    """
+    generation = current_generation()
+    models = generation.models
+    if "similarity_index" not in models:
+        with profile_stage("import similarity_index"):
+            import similarity_index
+        with profile_stage("load similarity_index.npz"):
+            if generation.artifacts is None:
+                index = similarity_index.load_index()
+            elif generation.has("similarity_index.npz"):
+                index = similarity_index.SimilarityIndex.load()
+            else:
+                index = similarity_index.build_index(path=None)
+        models["similarity_index"] = index
+    return models["similarity_index"]
+
+def similar_destinations(payload):
+    """
+    Destinations most like payload["destination"], or like a knowledge-graph
+    style row given as payload["features"] (Category, FocusTrait, Zone, ...)
+    """
+    index = load_similarity_index()
+    k = int(payload.get("k", 5))
+    if payload.get("destination") is not None:
+        if payload["destination"] not in index:
+            return {"error": f"Unknown destination: {payload['destination']}"}
+        matches = index.similar(payload["destination"], k)
+    elif payload.get("features"):
+        matches = index.similar_to_row(payload["features"], k)
+    else:
+        return {"error": "similar_destinations needs a destination or features"}
+    return {"similar_destinations": [{"destination": name, "similarity": score} for name, score in matches]}
+
+BATCH_ACTIONS = {
+    "predict_batch_destination": predict_batch_destination,
+    "predict_batch_budget": predict_batch_budget,
+}
+
+# Payloads scored per model call when streaming NDJSON, which keeps memory
+# bounded for arbitrarily long inputs while amortising the frame overhead.
+BATCH_CHUNK_SIZE = 10000
+
+# Stands in for an NDJSON line that does not parse, so it keeps its place
+# in the output
+_INVALID_LINE = object()
+
+def stream_batch(action, lines, stdout=sys.stdout, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Score an NDJSON stream of payloads chunk by chunk, writing one result per
+    line in input order. A line that is not valid JSON, or a payload that
+    cannot be scored, gets an {"error": ...} result of its own.
+    """
+    handler = BATCH_ACTIONS[action]
+    chunk = []
+
+    def flush():
+        with tracing.request(action), pinned_generation() as generation:
+            scored = iter(handler([p for p in chunk if p is not _INVALID_LINE]))
+            results = [{"error": "Invalid JSON"} if p is _INVALID_LINE else next(scored) for p in chunk]
+            with profile_stage("serialize response"):
+                stdout.write("".join(json.dumps(tag_model_version(res, generation)) + "\n" for res in results))
+        stdout.flush()
+        chunk.clear()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            chunk.append(json.loads(line))
+        except json.JSONDecodeError:
+            chunk.append(_INVALID_LINE)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+def dispatch(action, payload):
+    """Route a single request to its handler and return the response dict"""
+    if action == "recommend_destination":
+        return predict_destination(payload)
+    elif action == "predict_budget":
+        return predict_budget(payload)
+    elif action == "similar_destinations":
+        return similar_destinations(payload)
+    elif action == "cache_stats":
+        cache = get_prediction_cache()
+        return {"cache": cache.snapshot_stats() if cache is not None else None}
+    elif action in BATCH_ACTIONS:
+        if not isinstance(payload, list):
+            return {"error": "Batch actions expect a list of payloads"}
+        return {"results": BATCH_ACTIONS[action](payload)}
+    return {"error": "Unknown action"}
+
+def dispatch_versioned(action, payload):
+    """
+    dispatch() pinned to one model generation, with its version on the
+    response; a request that raises is answered with {"error": ...}
+    """
+    with pinned_generation() as generation:
+        try:
+            res = dispatch(action, payload)
+        except Exception as e:
+            res = {"error": str(e)}
+    return tag_model_version(res, generation)
+
+def tag_model_version(res, generation):
+    return dict(res, model_version=generation.version) if isinstance(res, dict) else res
+
+# Long-running modes poll models/manifest.json, which train_models.py
+# replaces atomically once every artifact is written, and swap in the new
+# models without a restart. SAFAR_MODEL_RELOAD=0 turns this off.
+RELOAD_ENABLED = os.environ.get("SAFAR_MODEL_RELOAD", "1") != "0"
+RELOAD_INTERVAL_S = float(os.environ.get("SAFAR_MODEL_RELOAD_INTERVAL", 2))
+
+# Representative traffic a new generation answers before it goes live: every
+# comfort level and a spread of trip shapes, plus off-grid recommender rows
+# (20 days, a ₹4L budget) so the forest runs as well as the dense table.
+WARMUP_DESTINATION_PAYLOADS = [
+    {"budget": budget, "numDays": days, "season": season, "pace": pace, "focus": focus}
+    for budget, days in ((8000, 2), (25000, 5), (60000, 9), (400000, 20))
+    for season in ("Summer", "Winter", "Monsoon")
+    for pace, focus in (("Fast", "Thrills"), ("Slow", "Culture"))
+]
+WARMUP_BUDGET_PAYLOADS = [
+    {"destination": destination, "numDays": days, "numPeople": people, "comfortLevel": comfort}
+    for destination in ("Varanasi", "Goa", "Sikkim", "Hampta Pass")
+    for days, people in ((3, 2), (7, 4))
+    for comfort in ("Budget", "Standard", "Luxury")
+]
+
+def warm_generation(generation):
+    """
+    Load every model of `generation` and score the warm-up payloads with
+    each, one row and then all of them, so both the scalar and the
+    vectorised paths have run before real traffic does. Goes straight to the
+    models: the result cache is shared with the live generation.
+    """
+    with pinned_generation(generation):
+        destination_rows = [destination_features(p) for p in WARMUP_DESTINATION_PAYLOADS]
+        budget_rows = [budget_features(p) for p in WARMUP_BUDGET_PAYLOADS]
+        table = load_recommendation_table()
+        if table is not None:
+            for row in destination_rows:
+                table.lookup(row)
+        for name, rows in (("destination_recommender", destination_rows),
+                           ("destination_recommender_lite", destination_rows),
+                           ("budget_regressor", budget_rows),
+                           ("budget_regressor_lite", budget_rows)):
+            model = load_model(name)
+            if model is None:
+                continue
+            score = model.predict_proba if name.startswith("destination") else model.predict
+            score(rows[:1])
+            score(rows)
+        if generation.has("similarity_index.npz"):
+            load_similarity_index()
+
+def reload_models():
+    """
+    Load and warm the models of the current manifest when its version differs
+    from the live one, then make them the generation new requests start on.
+    Requests already running finish on the generation they started with.
+    Returns the new generation, or None when nothing changed.
+    """
+    import model_manifest
+    manifest = model_manifest.read_manifest()
+    if manifest is None or manifest["version"] == active_generation().version:
+        return None
+    generation = ModelGeneration.from_manifest(manifest)
+    warm_generation(generation)
+    _ACTIVE[0] = generation
+    return generation
+
+class ModelReloader:
+    """Background thread calling reload_models() whenever models/manifest.json changes"""
+    def __init__(self, interval=RELOAD_INTERVAL_S):
+        import threading
+        import model_manifest
+        self.interval = interval
+        self.stamp = model_manifest.manifest_stamp()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+
+    def start(self):
+        active_generation()
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        import model_manifest
+        while not self.stopped.wait(self.interval):
+            stamp = model_manifest.manifest_stamp()
+            if stamp == self.stamp:
+                continue
+            self.stamp = stamp
+            reload_and_log()
+
+def reload_and_log():
+    """reload_models() with one JSON line on stderr per swap or failure; a failed load keeps the old models"""
+    started = time.perf_counter()
+    previous = active_generation().version
+    try:
+        generation = reload_models()
+    except Exception as e:
+        sys.stderr.write(json.dumps({"event": "model_reload_failed", "version": previous,
+                                     "error": str(e)}) + "\n")
+        return None
+    if generation is not None:
+        sys.stderr.write(json.dumps({
+            "event": "model_reload", "from": previous, "to": generation.version,
+            "load_ms": round((time.perf_counter() - started) * 1000, 3),
+        }) + "\n")
+    return generation
+
+def start_model_reloader():
+    """Start a ModelReloader unless SAFAR_MODEL_RELOAD=0; returns it or None"""
+    return ModelReloader().start() if RELOAD_ENABLED else None
+
+def handle_line(line):
+    """
+    Answer one newline-delimited JSON request of the form
+    {"id": ..., "action": ..., "payload": {...}}. The response has the same
+    shape main() prints, with the request id echoed back when given, the
+    version of the models that answered it, and per-stage `_timings` when
+    tracing is on or the request sets "trace": true.
+    """
+    with tracing.request() as trace:
+        try:
+            request = json.loads(line)
+            action = request.get("action")
+            payload = request.get("payload", {})
+        except Exception:
+            return {"error": "Invalid JSON"}
+        trace.annotate(action, request.get("trace") is True)
+
+        res = dispatch_versioned(action, payload)
+        if "id" in request:
+            res = dict(res, id=request["id"])
+        return trace.attach(res)
+
+def serve_stdio(stdin=sys.stdin, stdout=sys.stdout):
+    """Answer NDJSON requests from stdin until EOF, one response line each"""
+    for line in stdin:
+        if not line.strip():
+            continue
+        with tracing.request():
+            res = handle_line(line)
+            with profile_stage("serialize response"):
+                out = json.dumps(res)
+        stdout.write(out + "\n")
+        stdout.flush()
+
+def serve_socket(socket_path):
+    """Answer NDJSON requests over a local Unix socket, one client at a time"""
+    import socket
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn, conn.makefile("r") as reader, conn.makefile("w") as writer:
+                serve_stdio(reader, writer)
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def serve(args):
+    """
+    Long-lived mode: load both pipelines once, then answer requests without
+    paying the interpreter + import + model load cost per call. Models
+    retrained meanwhile are picked up from models/manifest.json, warmed in
+    the background and swapped in between requests (see ModelReloader).
+        python predict.py serve                  # NDJSON on stdin/stdout
+        python predict.py serve --socket PATH    # NDJSON on a Unix socket
+        python predict.py serve --workers N [--socket PATH]
+                                                 # pre-forked pool (worker_pool.py)
+    """
+    socket_path = None
+    if "--socket" in args:
+        idx = args.index("--socket")
+        if idx + 1 >= len(args):
+            print(json.dumps({"error": "Missing socket path"}))
+            return
+        socket_path = args[idx + 1]
+
+    if "--workers" in args:
+        import worker_pool
+        worker_pool.serve_pool(int(args[args.index("--workers") + 1]), socket_path)
+        return
+
+    load_model("destination_recommender")
+    load_model("budget_regressor")
+    start_model_reloader()
+
+    if socket_path is not None:
+        serve_socket(socket_path)
+    else:
+        serve_stdio()
+
+def build_snapshot():
+    """Write models/serving_snapshot.pkl from the compiled models and knowledge graph, then a new manifest"""
+    import serving_snapshot
+    import model_manifest
+    snapshot = serving_snapshot.build_snapshot(MODELS_DIR)
+    manifest = model_manifest.write_manifest(MODELS_DIR)
+    return {"snapshot": serving_snapshot.SNAPSHOT_PATH, "models": sorted(snapshot["models"]),
+            "model_version": manifest["version"]}
 
 def main():
-    if len(sys.argv) < 3:
+    started = time.perf_counter()
+    argv = sys.argv[1:]
+    profiling = "--profile-startup" in argv
+    if profiling:
+        argv.remove("--profile-startup")
+        token = tracing.begin()
+    try:
+        run(argv)
+    finally:
+        if profiling:
+            report_startup_profile(started, tracing.end(token))
+
+def run(argv):
+    if argv and argv[0] == "serve":
+        serve(argv[1:])
+        return
+    if argv and argv[0] == "build_snapshot":
+        print(json.dumps(build_snapshot()))
+        return
+
+    # Batch actions stream NDJSON results; the payloads come either as a JSON
+    # list argument or, when the argument is omitted or "-", as NDJSON on stdin.
+    if argv and argv[0] in BATCH_ACTIONS:
+        action = argv[0]
+        if len(argv) < 2 or argv[1] == "-":
+            stream_batch(action, sys.stdin)
+            return
+        try:
+            payloads = json.loads(argv[1])
+        except json.JSONDecodeError:
+            print(json.dumps({"error": "Invalid JSON"}))
+            return
+        if not isinstance(payloads, list):
+            print(json.dumps({"error": "Batch actions expect a list of payloads"}))
+            return
+        stream_batch(action, (json.dumps(p) for p in payloads))
+        return
+
+    if len(argv) < 2:
         print(json.dumps({"error": "Missing arguments"}))
         return
         
-    action = sys.argv[1]
+    action = argv[0]
     try:
-        payload = json.loads(sys.argv[2])
+        payload = json.loads(argv[1])
     except:
         print(json.dumps({"error": "Invalid JSON"}))
         return
         
-    if action == "recommend_destination":
-        res = predict_destination(payload)
-    elif action == "predict_budget":
-        res = predict_budget(payload)
-    else:
-        res = {"error": "Unknown action"}
-        
-    print(json.dumps(res))
+    with tracing.request(action) as trace:
+        res = trace.attach(dispatch_versioned(action, payload))
+        with profile_stage("serialize response"):
+            out = json.dumps(res)
+    print(out)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,177 @@
+"""
+Result cache for predict.py.
+
+Entries are keyed on the normalized model input (the feature dict that
+actually reaches the model) plus the version stamp of the model files, so
+retraining invalidates everything automatically. Two layers:
+
+- an in-process LRU with a size bound, useful in `serve` mode;
+- an optional SQLite store that concurrent workers and one-shot CLI
+  processes share (enabled by SAFAR_PREDICT_CACHE_DB=<path>).
+
+Hits, misses, evictions and invalidations are counted, with the SQLite
+layer's hits and misses also tracked separately.
+
+The SQLite store remembers which version of each model it holds rows for.
+The first process to use a new version (a new manifest, or new model files)
+deletes that model's rows from other versions, so the file does not grow
+with every publish.
+"""
+
+import os
+import json
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+
+class PredictionCache:
+    """Bounded LRU of model outputs with an optional shared SQLite layer"""
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, db_path=None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._synced = set()
+        self._db = None
+        self.stats = {
+            "hits": 0, "misses": 0, "evictions": 0, "invalidations": 0,
+            "disk_hits": 0, "disk_misses": 0,
+        }
+
+    @staticmethod
+    def make_key(model, features):
+        return model + ":" + json.dumps(features, sort_keys=True, separators=(",", ":"))
+
+    def check_version(self, model, version):
+        """Drop in-process entries for `model` if its files changed; returns True when they did"""
+        previous = self._versions.get(model)
+        self._versions[model] = version
+        if previous is None or previous == version:
+            return False
+        prefix = model + ":"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+        self.stats["invalidations"] += 1
+        return True
+
+    def get(self, model, features):
+        key = self.make_key(model, features)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._entries[key]
+        value = self._disk_get(model, key)
+        if value is not None:
+            self.stats["hits"] += 1
+            self._remember(key, value)
+            return value
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, model, features, value):
+        key = self.make_key(model, features)
+        self._remember(key, value)
+        self._disk_put(model, key, value)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _connection(self):
+        if self._db is None:
+            import sqlite3
+            self._db = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, version TEXT NOT NULL, value TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS model_versions (family TEXT PRIMARY KEY, current TEXT NOT NULL)"
+            )
+        return self._db
+
+    def _sync_version(self, model):
+        """
+        Once per process and model version: if the store last held another
+        version of `model` ("name" or "name@manifest_version"), delete the
+        rows of every other version before using it.
+        """
+        version = self._versions.get(model, "")
+        current = f"{model}|{version}"
+        if current in self._synced:
+            return
+        family = model.partition("@")[0]
+        db = self._connection()
+        row = db.execute("SELECT current FROM model_versions WHERE family = ?", (family,)).fetchone()
+        if row is not None and row[0] == current:
+            self._synced.add(current)
+            return
+        prefixes = (family + ":", family + "@")
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "DELETE FROM predictions WHERE (substr(key, 1, ?) IN (?, ?)) "
+                "AND NOT (substr(key, 1, ?) = ? AND version = ?)",
+                (len(prefixes[0]), *prefixes, len(model) + 1, model + ":", version),
+            )
+            db.execute("INSERT OR REPLACE INTO model_versions (family, current) VALUES (?, ?)",
+                       (family, current))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._synced.add(current)
+
+    def _disk_get(self, model, key):
+        if not self.db_path:
+            return None
+        import sqlite3
+        try:
+            self._sync_version(model)
+            row = self._connection().execute(
+                "SELECT value FROM predictions WHERE key = ? AND version = ?",
+                (key, self._versions.get(model, "")),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            self.stats["disk_misses"] += 1
+            return None
+        self.stats["disk_hits"] += 1
+        return json.loads(row[0])
+
+    def _disk_put(self, model, key, value):
+        if not self.db_path:
+            return
+        import sqlite3
+        try:
+            self._sync_version(model)
+            self._connection().execute(
+                "INSERT OR REPLACE INTO predictions (key, version, value) VALUES (?, ?, ?)",
+                (key, self._versions.get(model, ""), json.dumps(value)),
+            )
+        except sqlite3.Error:
+            pass
+
+    def snapshot_stats(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return dict(
+            self.stats,
+            entries=len(self._entries),
+            max_entries=self.max_entries,
+            hit_rate=round(self.stats["hits"] / total, 4) if total else 0.0,
+            disk=bool(self.db_path),
+        )
+
+def cache_from_env():
+    """PredictionCache configured from SAFAR_PREDICT_CACHE* variables, or None if disabled"""
+    if os.environ.get("SAFAR_PREDICT_CACHE", "1") == "0":
+        return None
+    return PredictionCache(
+        max_entries=int(os.environ.get("SAFAR_PREDICT_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        db_path=os.environ.get("SAFAR_PREDICT_CACHE_DB") or None,
+    )
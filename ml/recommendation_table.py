@@ -0,0 +1,126 @@
+"""
+Precomputed dense recommendation table for the destination recommender.
+
+The recommender's input space is small: 4 seasons x 2 paces x 4 focuses x
+12 day counts x a budget axis. train_models.py evaluates the pipeline once
+over a fine budget grid and stores every class probability in one float32
+array. predict.py then answers in-range requests by index arithmetic on
+the nearest grid point and only runs the forest off-grid (unknown
+categories, day counts outside 2-13, or budgets outside the grid). The build
+reports the max probability error the grid introduces against the exact
+model.
+"""
+
+import os
+import json
+
+BASE_DIR = os.path.dirname(__file__)
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+TABLE_PATH = os.path.join(MODELS_DIR, "destination_table.npz")
+
+# Day counts the recommender is trained on (traveler_profiles draws 2..13)
+DAYS = list(range(2, 14))
+BUDGET_MIN = 5000.0
+BUDGET_MAX = 100000.0
+BUDGET_STEP = 250.0
+
+class RecommendationTable:
+    """Nearest-grid-point lookup over a flat probability buffer (numpy array or array('f'))"""
+    def __init__(self, meta, probs):
+        self.meta = meta
+        self.probs = probs
+        self.classes_ = meta["classes"]
+        self.n_classes = len(self.classes_)
+        self.budget_min = meta["budget_min"]
+        self.budget_step = meta["budget_step"]
+        self.n_budgets = meta["n_budgets"]
+        self.budget_max = self.budget_min + (self.n_budgets - 1) * self.budget_step
+        self._seasons = {s: i for i, s in enumerate(meta["seasons"])}
+        self._paces = {p: i for i, p in enumerate(meta["paces"])}
+        self._focuses = {f: i for i, f in enumerate(meta["focuses"])}
+        self._days = {d: i for i, d in enumerate(meta["days"])}
+
+    def index(self, row):
+        """Flat offset of the row's grid cell, or None when the row is off-grid"""
+        s = self._seasons.get(row["season"])
+        p = self._paces.get(row["pace"])
+        f = self._focuses.get(row["focus"])
+        d = self._days.get(row["days"])
+        budget = row["budget"]
+        if s is None or p is None or f is None or d is None:
+            return None
+        if not (self.budget_min <= budget <= self.budget_max):
+            return None
+        b = int(round((budget - self.budget_min) / self.budget_step))
+        cell = (((s * len(self._paces) + p) * len(self._focuses) + f) * len(self._days) + d) * self.n_budgets + b
+        return cell * self.n_classes
+
+    def lookup(self, row):
+        """Class probabilities for `row` from the table, or None when off-grid"""
+        base = self.index(row)
+        if base is None:
+            return None
+        return [float(self.probs[base + k]) for k in range(self.n_classes)]
+
+    def save(self, path=TABLE_PATH):
+        import numpy as np
+        np.savez(path, meta=np.array(json.dumps(self.meta)), probs=np.asarray(self.probs, dtype=np.float32))
+
+    @classmethod
+    def load(cls, path=TABLE_PATH):
+        import numpy as np
+        with np.load(path, allow_pickle=False) as data:
+            return cls(json.loads(str(data["meta"])), data["probs"])
+
+def grid_rows(budget_step=BUDGET_STEP):
+    """All grid points in table order as recommender feature dicts"""
+    from traveler_profiles import SEASONS, PACES, FOCUSES
+    n_budgets = int(round((BUDGET_MAX - BUDGET_MIN) / budget_step)) + 1
+    budgets = [BUDGET_MIN + i * budget_step for i in range(n_budgets)]
+    rows = [
+        {"budget": b, "days": d, "season": s, "pace": p, "focus": f}
+        for s in SEASONS for p in PACES for f in FOCUSES for d in DAYS for b in budgets
+    ]
+    return rows, n_budgets
+
+def build_table(pipeline, budget_step=BUDGET_STEP, n_check=20000, seed=42):
+    """
+    Evaluate `pipeline` over the full grid and measure the grid error on
+    `n_check` random in-range profiles. Returns (table, report).
+    """
+    import numpy as np
+    import pandas as pd
+    from traveler_profiles import SEASONS, PACES, FOCUSES
+
+    rows, n_budgets = grid_rows(budget_step)
+    probs = pipeline.predict_proba(pd.DataFrame(rows)).astype(np.float32)
+    meta = {
+        "classes": [str(c) for c in pipeline.classes_],
+        "seasons": SEASONS, "paces": PACES, "focuses": FOCUSES, "days": DAYS,
+        "budget_min": BUDGET_MIN, "budget_step": budget_step, "n_budgets": n_budgets,
+    }
+    table = RecommendationTable(meta, probs.ravel())
+
+    # Grid error: nearest-grid probabilities vs the exact model on continuous budgets
+    rng = np.random.default_rng(seed)
+    check = pd.DataFrame({
+        "budget": rng.uniform(BUDGET_MIN, BUDGET_MAX, n_check),
+        "days": rng.integers(DAYS[0], DAYS[-1] + 1, n_check),
+        "season": rng.choice(SEASONS, n_check),
+        "pace": rng.choice(PACES, n_check),
+        "focus": rng.choice(FOCUSES, n_check),
+    })
+    exact = pipeline.predict_proba(check)
+    approx = np.array([table.lookup(row) for row in check.to_dict("records")])
+    errors = np.abs(exact - approx).max(axis=1)
+    top1_agreement = float((exact.argmax(axis=1) == approx.argmax(axis=1)).mean())
+
+    report = {
+        "cells": len(rows),
+        "bytes": int(probs.nbytes),
+        "max_prob_error": float(errors.max()),
+        "mean_prob_error": float(errors.mean()),
+        "top1_agreement": top1_agreement,
+    }
+    table.meta["report"] = report
+    return table, report
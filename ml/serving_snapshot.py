@@ -0,0 +1,214 @@
+"""
+Pre-built serving state for fast predict.py cold starts.
+
+The snapshot is one pickle holding the compiled models (both tiers) and the
+recommendation table as stdlib `array.array` buffers plus the
+knowledge-graph rows, so a cold process
+loads everything in a single read without importing numpy, pandas or
+sklearn. Single rows are scored by walking the trees in pure Python;
+batches hand the same buffers to CompiledPipeline without copying.
+
+    python predict.py build_snapshot
+"""
+
+import os
+import pickle
+from array import array
+
+BASE_DIR = os.path.dirname(__file__)
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+SNAPSHOT_PATH = os.path.join(MODELS_DIR, "serving_snapshot.pkl")
+SNAPSHOT_VERSION = 3
+
+# Above this many rows the vectorised NumPy evaluator wins over the scalar walk
+SCALAR_MAX_ROWS = 16
+
+class SnapshotModel:
+    """Pure-Python evaluator over a compiled forest's flat node tables"""
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.classes_ = meta.get("classes")
+        self.n_classes = len(self.classes_) if self.classes_ is not None else 1
+        self.arrays = arrays
+        self.split_feature = arrays["split_feature"]
+        self.split_threshold = arrays["split_threshold"]
+        self.children = arrays["children"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self._vectorized = None
+        self._encoders = []
+        for enc in meta["encoders"]:
+            if enc["type"] == "onehot":
+                lookup = {cat: enc["offset"] + i for i, cat in enumerate(enc["categories"])}
+                self._encoders.append(("onehot", enc["column"], lookup))
+            else:
+                self._encoders.append(("numeric", enc["column"], (enc["offset"], enc["mean"], enc["scale"])))
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_vectorized"] = None
+        return state
+
+    def vectorized(self):
+        """CompiledPipeline sharing this snapshot's buffers (imports numpy on first use)"""
+        if self._vectorized is None:
+            import numpy as np
+            from compiled_forest import CompiledPipeline
+            arrays = {
+                name: np.frombuffer(buf, dtype=np.float64 if buf.typecode == "d" else np.int32)
+                for name, buf in self.arrays.items()
+            }
+            if self.kind == "classifier":
+                arrays["value"] = arrays["value"].reshape(-1, self.n_classes)
+            self._vectorized = CompiledPipeline(self.meta, arrays)
+        return self._vectorized
+
+    def _encode(self, row):
+        x = [0.0] * self.meta["n_outputs"]
+        for kind, column, spec in self._encoders:
+            if kind == "onehot":
+                out = spec.get(row.get(column))
+                if out is not None:
+                    x[out] = 1.0
+            else:
+                offset, mean, scale = spec
+                # Round through float32 to match the forest's input dtype
+                x[offset] = array("f", [(float(row.get(column)) - mean) / scale])[0]
+        return x
+
+    def _leaves(self, row):
+        x = self._encode(row)
+        feature, threshold, children = self.split_feature, self.split_threshold, self.children
+        leaves = []
+        for node in self.roots:
+            # Leaves are the nodes whose children point back at themselves
+            while children[2 * node] != node:
+                node = children[2 * node + (x[feature[node]] > threshold[node])]
+            leaves.append(node)
+        return leaves
+
+    def _row_proba(self, row):
+        k = self.n_classes
+        totals = [0.0] * k
+        leaves = self._leaves(row)
+        for leaf in leaves:
+            base = leaf * k
+            for c in range(k):
+                totals[c] += self.value[base + c]
+        return [t / len(leaves) for t in totals]
+
+    def predict_proba(self, rows):
+        if len(rows) > SCALAR_MAX_ROWS:
+            return self.vectorized().predict_proba(rows)
+        return [self._row_proba(row) for row in rows]
+
+    def predict(self, rows):
+        if len(rows) > SCALAR_MAX_ROWS:
+            return self.vectorized().predict(rows)
+        if self.kind == "classifier":
+            out = []
+            for proba in self.predict_proba(rows):
+                out.append(self.classes_[max(range(len(proba)), key=proba.__getitem__)])
+            return out
+        value = self.value
+        out = []
+        for row in rows:
+            leaves = self._leaves(row)
+            out.append(sum(value[leaf] for leaf in leaves) / len(leaves))
+        return out
+
+    def predict_quantiles(self, rows, quantiles):
+        """Same as CompiledPipeline.predict_quantiles, by scalar walks for small batches"""
+        if len(rows) > SCALAR_MAX_ROWS or self.kind != "regressor" or self.meta.get("ensemble", "forest") != "forest":
+            return self.vectorized().predict_quantiles(rows, quantiles)
+        value = self.value
+        means, spreads = [], []
+        for row in rows:
+            leaf_values = [value[leaf] for leaf in self._leaves(row)]
+            means.append(sum(leaf_values) / len(leaf_values))
+            vals = sorted(leaf_values)
+            last = len(vals) - 1
+            row_q = []
+            for q in quantiles:
+                # numpy's default (linear) interpolation between order statistics
+                pos = q * last
+                lo = int(pos)
+                hi = min(lo + 1, last)
+                row_q.append(vals[lo] + (vals[hi] - vals[lo]) * (pos - lo))
+            spreads.append(row_q)
+        return means, spreads
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def is_fresh(snapshot):
+    """True when every source file recorded in the snapshot is unchanged"""
+    for path, stamp in snapshot["sources"].items():
+        try:
+            if _source_stamp(path) != tuple(stamp):
+                return False
+        except OSError:
+            return False
+    return True
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Snapshot dict, or None when missing, from another format or stale"""
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION or not is_fresh(snapshot):
+        return None
+    return snapshot
+
+def snapshot_model(compiled):
+    """SnapshotModel holding copies of a CompiledPipeline's arrays as stdlib buffers"""
+    return SnapshotModel(compiled.meta, {
+        key: array("d" if arr.dtype.kind == "f" else "i",
+                   arr.astype("float64" if arr.dtype.kind == "f" else "int32").ravel().tobytes())
+        for key, arr in compiled.arrays.items()
+    })
+
+def build_snapshot(models_dir=MODELS_DIR, path=SNAPSHOT_PATH):
+    """Bundle the compiled .forest models, recommendation table and knowledge graph into one pickle"""
+    from compiled_forest import CompiledPipeline
+    from knowledge_graph import KG_PATH, KnowledgeGraph
+    from recommendation_table import TABLE_PATH, RecommendationTable
+
+    models = {}
+    sources = {}
+    for name in ("destination_recommender", "budget_regressor",
+                 "destination_recommender_lite", "budget_regressor_lite"):
+        forest_path = os.path.join(models_dir, f"{name}.forest")
+        meta_path = os.path.join(forest_path, "meta.json")
+        if not os.path.exists(meta_path):
+            continue
+        models[name] = snapshot_model(CompiledPipeline.load(forest_path, mmap_mode=None))
+        sources[meta_path] = _source_stamp(meta_path)
+
+    table = None
+    if os.path.exists(TABLE_PATH):
+        loaded = RecommendationTable.load(TABLE_PATH)
+        table = (loaded.meta, array("f", loaded.probs.astype("float32").tobytes()))
+        sources[TABLE_PATH] = _source_stamp(TABLE_PATH)
+
+    kg_rows = None
+    if os.path.exists(KG_PATH):
+        kg_rows = KnowledgeGraph.from_csv(KG_PATH).rows
+        sources[KG_PATH] = _source_stamp(KG_PATH)
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "models": models,
+        "recommendation_table": table,
+        "knowledge_graph": kg_rows,
+        "sources": sources,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return snapshot
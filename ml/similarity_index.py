@@ -0,0 +1,309 @@
+"""
+"Destinations like this one" over the knowledge graph.
+
+Every graph row is encoded once into a fixed-width feature vector
+(one-hot Category / FocusTrait / Zone, standardised Rating, HoursNeeded and
+log entrance fee), L2-normalised and stored as one float32 matrix. A query
+is then one matrix-vector product plus `argpartition`, i.e. cosine
+similarity against every row at once.
+
+The index persists to models/similarity_index.npz and supports incremental
+add / remove: new categories grow the matrix by zero columns (existing
+similarities are unchanged), removed rows are masked out and compacted away
+once they make up a quarter of the matrix. Numeric scaling is fitted at
+build time; rebuild to refit it.
+
+    python similarity_index.py "Red Fort" [--k 5]
+    python similarity_index.py --bench [--rows 100000]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import numpy as np
+
+BASE_DIR = os.path.dirname(__file__)
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+INDEX_PATH = os.path.join(MODELS_DIR, "similarity_index.npz")
+
+CATEGORICAL_FEATURES = ("Category", "FocusTrait", "Zone")
+NUMERIC_FEATURES = ("Rating", "HoursNeeded", "EntranceFee")
+# Relative weight of each feature block before normalisation
+FEATURE_WEIGHTS = {
+    "Category": 1.0, "FocusTrait": 1.0, "Zone": 0.5,
+    "Rating": 0.5, "HoursNeeded": 0.5, "EntranceFee": 0.3,
+}
+# Compact once this share of rows has been removed
+COMPACT_RATIO = 0.25
+
+def _numeric(row, column):
+    value = row.get(column)
+    if value is None or value == "":
+        return None
+    value = float(value)
+    return math.log1p(max(value, 0.0)) if column == "EntranceFee" else value
+
+class SimilarityIndex:
+    """Row-normalised feature matrix over destinations with cosine top-k queries"""
+    def __init__(self, meta, matrix, active=None):
+        self.meta = meta
+        self.vocab = {col: {v: i for i, v in enumerate(meta["vocab"][col])} for col in CATEGORICAL_FEATURES}
+        self.stats = meta["stats"]
+        self.names = list(meta["names"])
+        self.matrix = matrix
+        self.active = np.ones(len(self.names), dtype=bool) if active is None else active
+        self._rows = {}
+        for i, name in enumerate(self.names):
+            if self.active[i]:
+                self._rows[name] = i
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Fit the vocabulary and numeric scaling on `rows` and encode them"""
+        vocab = {col: sorted({str(r.get(col)) for r in rows if r.get(col) not in (None, "")})
+                 for col in CATEGORICAL_FEATURES}
+        stats = {}
+        for col in NUMERIC_FEATURES:
+            values = np.array([v for v in (_numeric(r, col) for r in rows) if v is not None])
+            mean = float(values.mean()) if values.size else 0.0
+            std = float(values.std()) if values.size else 1.0
+            stats[col] = [mean, std or 1.0]
+        index = cls({"vocab": vocab, "stats": stats, "names": []},
+                    np.zeros((0, cls._width_for(vocab)), dtype=np.float32))
+        index.add(rows)
+        return index
+
+    @staticmethod
+    def _width_for(vocab):
+        return sum(len(vocab[col]) for col in CATEGORICAL_FEATURES) + len(NUMERIC_FEATURES)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def _offsets(self):
+        """{feature: (first column, width)} and the total width"""
+        offsets, start = {}, 0
+        for col in CATEGORICAL_FEATURES + NUMERIC_FEATURES:
+            size = len(self.vocab[col]) if col in self.vocab else 1
+            offsets[col] = (start, size)
+            start += size
+        return offsets, start
+
+    def _grow_vocab(self, rows):
+        """Register unseen categories; existing rows get zero columns for them"""
+        old_offsets, _ = self._offsets()
+        grown = False
+        for col in CATEGORICAL_FEATURES:
+            known = self.vocab[col]
+            for r in rows:
+                value = r.get(col)
+                if value not in (None, "") and str(value) not in known:
+                    known[str(value)] = len(known)
+                    self.meta["vocab"][col].append(str(value))
+                    grown = True
+        if not grown:
+            return
+        # Re-lay out the columns block by block so each feature stays contiguous
+        new_offsets, width = self._offsets()
+        matrix = np.zeros((self.matrix.shape[0], width), dtype=np.float32)
+        for col, (start, size) in old_offsets.items():
+            new_start = new_offsets[col][0]
+            matrix[:, new_start:new_start + size] = self.matrix[:, start:start + size]
+        self.matrix = matrix
+
+    def encode(self, rows):
+        """Normalised float32 feature matrix for `rows` against the current vocabulary"""
+        offsets, width = self._offsets()
+        out = np.zeros((len(rows), width), dtype=np.float32)
+        for i, r in enumerate(rows):
+            for col in CATEGORICAL_FEATURES:
+                j = self.vocab[col].get(str(r.get(col)))
+                if j is not None:
+                    out[i, offsets[col][0] + j] = FEATURE_WEIGHTS[col]
+            for col in NUMERIC_FEATURES:
+                value = _numeric(r, col)
+                if value is not None:
+                    mean, std = self.stats[col]
+                    out[i, offsets[col][0]] = FEATURE_WEIGHTS[col] * (value - mean) / std
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1.0, norms)
+
+    def add(self, rows):
+        """Add (or replace) destinations; rows are knowledge-graph dicts"""
+        # Keep the first row for a repeated name, like KnowledgeGraph.get
+        seen = set()
+        rows = [r for r in rows if not (r.get("Destination") in seen or seen.add(r.get("Destination")))]
+        self._grow_vocab(rows)
+        self.remove([r.get("Destination") for r in rows if r.get("Destination") in self._rows], compact=False)
+        start = len(self.names)
+        self.matrix = np.vstack([self.matrix, self.encode(rows)])
+        self.active = np.concatenate([self.active, np.ones(len(rows), dtype=bool)])
+        for i, r in enumerate(rows):
+            self.names.append(r.get("Destination"))
+            self._rows[r.get("Destination")] = start + i
+        self.meta["names"] = self.names
+
+    def remove(self, names, compact=True):
+        """Drop destinations by name; unknown names are ignored"""
+        for name in names:
+            i = self._rows.pop(name, None)
+            if i is not None:
+                self.active[i] = False
+        if compact and (~self.active).sum() > COMPACT_RATIO * len(self.active):
+            self.compact()
+
+    def compact(self):
+        """Physically delete removed rows"""
+        keep = np.flatnonzero(self.active)
+        self.matrix = self.matrix[keep]
+        self.names = [self.names[i] for i in keep]
+        self.meta["names"] = self.names
+        self.active = np.ones(len(self.names), dtype=bool)
+        self._rows = {name: i for i, name in enumerate(self.names)}
+
+    def query_vector(self, vector, k=5, exclude=None):
+        """[(name, cosine similarity)] for the k rows closest to a normalised vector"""
+        scores = self.matrix @ vector
+        if not self.active.all():
+            scores[~self.active] = -np.inf
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        k = min(k, len(self._rows) - (exclude is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.names[i], round(float(scores[i]), 4)) for i in top]
+
+    def similar(self, destination, k=5):
+        """Destinations most like `destination` (a name in the index), excluding itself"""
+        i = self._rows.get(destination)
+        if i is None:
+            raise KeyError(f"{destination} is not in the similarity index")
+        return self.query_vector(self.matrix[i], k, exclude=i)
+
+    def similar_to_row(self, row, k=5):
+        """Destinations most like an arbitrary knowledge-graph style row"""
+        return self.query_vector(self.encode([row])[0], k)
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(self.meta)), matrix=self.matrix, active=self.active)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(json.loads(str(data["meta"])), data["matrix"], data["active"])
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def build_index(kg_path=None, path=INDEX_PATH):
+    """Build the index from the knowledge graph CSV and save it (kept in memory when `path` is None)"""
+    from knowledge_graph import KG_PATH, KnowledgeGraph
+    kg_path = kg_path or KG_PATH
+    index = SimilarityIndex.from_rows(KnowledgeGraph.from_csv(kg_path).rows)
+    index.meta["source"] = {"path": kg_path, "stamp": _source_stamp(kg_path)}
+    if path is not None:
+        index.save(path)
+    return index
+
+def load_index(path=INDEX_PATH, kg_path=None):
+    """Saved index, rebuilt first when missing or older than the knowledge graph CSV"""
+    from knowledge_graph import KG_PATH
+    kg_path = kg_path or KG_PATH
+    if os.path.exists(path):
+        index = SimilarityIndex.load(path)
+        source = index.meta.get("source", {})
+        if not os.path.exists(kg_path) or source.get("stamp") == _source_stamp(kg_path):
+            return index
+    return build_index(kg_path, path)
+
+def synthetic_rows(n, seed=42):
+    """Knowledge-graph shaped rows for benchmarking"""
+    rng = np.random.default_rng(seed)
+    categories = [f"Category {i}" for i in range(120)]
+    focuses = ["Nature", "Culture", "Food", "Thrills"]
+    zones = ["Northern", "Southern", "Eastern", "Western", "Central", "North Eastern"]
+    cat, foc, zone = rng.integers(0, len(categories), n), rng.integers(0, 4, n), rng.integers(0, len(zones), n)
+    rating, hours = rng.uniform(3.0, 5.0, n).round(1), rng.choice([0.5, 1.0, 1.5, 2.0, 3.0, 5.0], n)
+    fee = rng.choice([0, 20, 40, 100, 500, 1500], n)
+    return [
+        {"Destination": f"Attraction {i}", "Category": categories[cat[i]], "FocusTrait": focuses[foc[i]],
+         "Zone": zones[zone[i]], "Rating": float(rating[i]), "HoursNeeded": float(hours[i]),
+         "EntranceFee": int(fee[i])}
+        for i in range(n)
+    ]
+
+def run_benchmark(n_rows=100000, queries=500, k=10):
+    print("\n" + "="*60)
+    print(f"🔎 Similarity index benchmark ({n_rows:,} synthetic attractions)")
+    print("="*60)
+    rows = synthetic_rows(n_rows)
+    start = time.perf_counter()
+    index = SimilarityIndex.from_rows(rows)
+    build_s = time.perf_counter() - start
+    print(f"Build: {build_s:.2f}s, matrix {index.matrix.shape[0]:,} x {index.matrix.shape[1]} "
+          f"({index.matrix.nbytes / 1e6:.1f} MB)")
+
+    rng = np.random.default_rng(0)
+    names = [rows[i]["Destination"] for i in rng.integers(0, n_rows, queries)]
+    for name in names[:10]:
+        index.similar(name, k)
+    samples = []
+    for name in names:
+        t = time.perf_counter()
+        index.similar(name, k)
+        samples.append((time.perf_counter() - t) * 1000)
+    from latency_stats import percentile
+    p50, p99 = percentile(samples, 50), percentile(samples, 99)
+    print(f"Top-{k} query: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+    extra = synthetic_rows(1000, seed=7)
+    for r in extra:
+        r["Destination"] = "New " + r["Destination"]
+    t = time.perf_counter()
+    index.add(extra)
+    add_ms = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    index.remove([r["Destination"] for r in extra])
+    remove_ms = (time.perf_counter() - t) * 1000
+    print(f"Add 1,000 rows: {add_ms:.1f} ms, remove 1,000 rows: {remove_ms:.2f} ms")
+
+    # In a temporary directory: anything left in models/ would be stamped
+    # into the next manifest
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        path = index.save(os.path.join(tmp, "similarity_bench.npz"))
+        save_ms = (time.perf_counter() - t) * 1000
+        t = time.perf_counter()
+        SimilarityIndex.load(path)
+        load_ms = (time.perf_counter() - t) * 1000
+    print(f"Save: {save_ms:.0f} ms, load: {load_ms:.0f} ms")
+    return {"rows": n_rows, "build_s": build_s, "query_p50_ms": p50, "query_p99_ms": p99,
+            "add_1000_ms": add_ms, "remove_1000_ms": remove_ms, "save_ms": save_ms, "load_ms": load_ms}
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        n_rows = int(sys.argv[sys.argv.index("--rows") + 1]) if "--rows" in sys.argv else 100000
+        run_benchmark(n_rows)
+        sys.exit(0)
+    if len(sys.argv) < 2 or sys.argv[1].startswith("--"):
+        print("Usage: python similarity_index.py <destination> [--k N]")
+        print("       python similarity_index.py --bench [--rows N]")
+        sys.exit(1)
+
+    k = int(sys.argv[sys.argv.index("--k") + 1]) if "--k" in sys.argv else 5
+    index = load_index()
+    for name, score in index.similar(sys.argv[1], k):
+        print(f"{score:.3f}  {name}")
@@ -0,0 +1,262 @@
+"""
+Optional per-stage timing for the prediction path.
+
+Code marks stages with `with stage("name"):`. Each finished stage records
+its wall-clock and CPU time, but only while a request trace (or
+predict.py --profile-startup) is collecting. Otherwise stage() hands back
+one shared no-op context manager, so disabled tracing costs a function
+call per stage and nothing else.
+
+Configured from the environment:
+
+    SAFAR_TRACE=response,log     `_timings` on every JSON response and/or
+                                 one structured JSON log line per request
+    SAFAR_TRACE_LOG=path         log destination (default: stderr)
+    SAFAR_TRACE_PROM=path        Prometheus text file of cumulative
+                                 per-stage wall / CPU seconds and call counts
+
+A single request can also ask for its own timings with "trace": true.
+Stdlib only, so importing it never slows a cold start.
+"""
+
+import os
+import sys
+import json
+import time
+from _thread import get_ident
+
+# Records of the innermost active collector: [(stage, wall seconds, cpu seconds)],
+# and the thread collecting them (stages on other threads, such as a
+# background model reload, are not part of that request)
+_RECORDS = None
+_OWNER = None
+_CURRENT = None
+_CONFIG = None
+
+class _Stage:
+    __slots__ = ("name", "wall", "cpu")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        if _RECORDS is not None:
+            _RECORDS.append((self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu))
+        return False
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopStage()
+
+def stage(name):
+    """Context manager timing one stage; a shared no-op when nothing is collecting"""
+    if _RECORDS is None or get_ident() != _OWNER:
+        return _NOOP
+    return _Stage(name)
+
+def begin():
+    """Start collecting stages; returns a token for end()"""
+    global _RECORDS, _OWNER
+    previous = (_RECORDS, _OWNER)
+    _RECORDS = []
+    _OWNER = get_ident()
+    return previous
+
+def end(token):
+    """Stop collecting; returns the stages recorded since begin(), also passing them to any outer collector"""
+    global _RECORDS, _OWNER
+    records = _RECORDS
+    _RECORDS, _OWNER = token
+    if _RECORDS is not None:
+        _RECORDS.extend(records)
+    return records
+
+def format_timings(records):
+    return [
+        {"stage": name, "wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3)}
+        for name, wall, cpu in records
+    ]
+
+class TraceConfig:
+    def __init__(self, environ=os.environ):
+        modes = {m.strip() for m in environ.get("SAFAR_TRACE", "").split(",") if m.strip()}
+        if modes & {"1", "true", "on"}:
+            modes |= {"response"}
+        self.response = "response" in modes
+        self.log = "log" in modes or bool(environ.get("SAFAR_TRACE_LOG"))
+        self.log_path = environ.get("SAFAR_TRACE_LOG") or None
+        self.prom_path = environ.get("SAFAR_TRACE_PROM") or None
+        self.enabled = self.response or self.log or bool(self.prom_path)
+
+def config():
+    global _CONFIG
+    if _CONFIG is None:
+        _CONFIG = TraceConfig()
+    return _CONFIG
+
+class request:
+    """
+    Scope of one request. Collects stages when tracing is configured or the
+    request asks for it (see annotate), and on exit writes the log line and
+    Prometheus samples. A scope opened inside another one joins it, so
+    serve_stdio can time serialisation around handle_line's own scope.
+    """
+    def __init__(self, action=None):
+        self.action = action
+        self.wanted = False
+        self.token = None
+        self.collecting = False
+
+    def __enter__(self):
+        global _CURRENT
+        self.outer = _CURRENT
+        if self.outer is not None:
+            self.outer.annotate(self.action)
+            return self.outer
+        _CURRENT = self
+        if config().enabled:
+            self._start()
+        return self
+
+    def _start(self):
+        self.token = begin()
+        self.collecting = True
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def annotate(self, action=None, wanted=False):
+        if action is not None:
+            self.action = action
+        if wanted and not self.collecting:
+            self._start()
+        self.wanted = self.wanted or bool(wanted)
+
+    def attach(self, response):
+        """`response` with a `_timings` field when this request should carry one"""
+        if not self.collecting or not (self.wanted or config().response) or not isinstance(response, dict):
+            return response
+        return dict(response, _timings={
+            "stages": format_timings(_RECORDS),
+            "wall_ms": round((time.perf_counter() - self.wall) * 1000, 3),
+            "cpu_ms": round((time.process_time() - self.cpu) * 1000, 3),
+        })
+
+    def __exit__(self, *exc):
+        global _CURRENT
+        if self.outer is not None:
+            return False
+        _CURRENT = None
+        if not self.collecting:
+            return False
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        records = end(self.token)
+        cfg = config()
+        action = self.action or "unknown"
+        if cfg.log:
+            write_log(cfg.log_path, action, records, wall, cpu)
+        if cfg.prom_path:
+            write_prometheus(cfg.prom_path, action, records, wall, cpu)
+        return False
+
+def annotate(action=None, wanted=False):
+    """Name the current request and/or opt it into `_timings` (no-op outside a request)"""
+    if _CURRENT is not None:
+        _CURRENT.annotate(action, wanted)
+
+def write_log(path, action, records, wall, cpu):
+    line = json.dumps({
+        "ts": round(time.time(), 3),
+        "event": "trace",
+        "pid": os.getpid(),
+        "action": action,
+        "wall_ms": round(wall * 1000, 3),
+        "cpu_ms": round(cpu * 1000, 3),
+        "stages": format_timings(records),
+    })
+    if path is None:
+        sys.stderr.write(line + "\n")
+        return
+    with open(path, "a") as f:
+        f.write(line + "\n")
+
+PROM_METRICS = (
+    ("safar_requests_total", "counter", "Traced requests"),
+    ("safar_request_wall_seconds_total", "counter", "Wall-clock seconds per traced request"),
+    ("safar_request_cpu_seconds_total", "counter", "CPU seconds per traced request"),
+    ("safar_stage_calls_total", "counter", "Times each stage ran"),
+    ("safar_stage_wall_seconds_total", "counter", "Wall-clock seconds spent in each stage"),
+    ("safar_stage_cpu_seconds_total", "counter", "CPU seconds spent in each stage"),
+)
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _read_samples(path):
+    samples = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                key, _, value = line.rstrip("\n").rpartition(" ")
+                samples[key] = float(value)
+    except (OSError, ValueError):
+        return {}
+    return samples
+
+def write_prometheus(path, action, records, wall, cpu):
+    """
+    Add this request to the cumulative counters in a Prometheus text file.
+    Concurrent processes serialise on a lock file, so one-shot CLI calls
+    and serve workers can share one file.
+    """
+    lock = None
+    try:
+        import fcntl
+        lock = open(path + ".lock", "w")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    except (ImportError, OSError):
+        pass
+    try:
+        samples = _read_samples(path)
+
+        def add(metric, labels, value):
+            key = metric + "{" + ",".join(f'{k}="{_label(v)}"' for k, v in labels) + "}"
+            samples[key] = samples.get(key, 0.0) + value
+
+        a = ("action", action)
+        add("safar_requests_total", [a], 1)
+        add("safar_request_wall_seconds_total", [a], wall)
+        add("safar_request_cpu_seconds_total", [a], cpu)
+        for name, stage_wall, stage_cpu in records:
+            labels = [a, ("stage", name)]
+            add("safar_stage_calls_total", labels, 1)
+            add("safar_stage_wall_seconds_total", labels, stage_wall)
+            add("safar_stage_cpu_seconds_total", labels, stage_cpu)
+
+        lines = []
+        for metric, kind, help_text in PROM_METRICS:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for key in sorted(k for k in samples if k.split("{", 1)[0] == metric):
+                lines.append(f"{key} {samples[key]:.9g}")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+    finally:
+        if lock is not None:
+            lock.close()
@@ -1,39 +1,190 @@
 import os
+import copy
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor, GradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
+from sklearn.base import clone
 from sklearn.metrics import accuracy_score, mean_absolute_error
+from knowledge_graph import get_knowledge_graph
+from compiled_forest import export_compiled
+from traveler_profiles import generate_traveler_profiles, write_training_file
+from recommendation_table import build_table, TABLE_PATH
+from data_cleaning import inputs_changed, record_inputs
+from columnar_store import read_table
 
 BASE_DIR = os.path.dirname(__file__)
 CLEAN_DATA_DIR = os.path.join(BASE_DIR, "clean_data")
 MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+# Cleaned files a full training run reads, tracked in the data_cleaning manifest
+TRAINING_INPUTS = [
+    os.path.join(CLEAN_DATA_DIR, "destinations_knowledge_graph.csv"),
+    os.path.join(CLEAN_DATA_DIR, "budget_baselines.csv"),
+]
+
 os.makedirs(MODELS_DIR, exist_ok=True)
 
-def train_destination_recommender():
-    print("\n" + "="*60)
-    print("🤖 TRAINING DESTINATION RECOMMENDATION MODEL (MODEL A)")
-    print("="*60)
+def export_compiled_model(pipeline, X_check, name):
+    """
+    Compile a fitted pipeline into memory-mappable flat arrays for
+    pandas-free serving, verified against pipeline.predict first.
+    """
+    compiled_path = os.path.join(MODELS_DIR, f"{name}.forest")
+    max_diff = export_compiled(pipeline, X_check, compiled_path)
+    print(f"⚡ Compiled {name} (parity max diff {max_diff:.2e}) to {compiled_path}")
+
+def training_inputs_changed():
+    """True when the cleaned training inputs changed since the last full training run"""
+    return inputs_changed("train_models", TRAINING_INPUTS)
+
+# Lite tier: small models distilled from the full forests' own outputs
+LITE_SUFFIX = "_lite"
+# Fresh synthetic rows labelled by the full model for the lite one to learn from
+LITE_TEACHER_SAMPLES = 40000
+LITE_REPORT_PATH = os.path.join(MODELS_DIR, "lite_parity.json")
+
+def build_lite_recommender(preprocessor):
+    """10 trees instead of 100, in the full model's (fitted) feature space"""
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(n_estimators=10, max_depth=10, random_state=42))
+    ])
+
+def build_lite_budget(preprocessor):
+    """Shallow boosted trees; compiled into the same flat format as the forests"""
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('regressor', GradientBoostingRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42))
+    ])
+
+def _artifact_bytes(name):
+    total = 0
+    pkl_path = os.path.join(MODELS_DIR, f"{name}.pkl")
+    if os.path.exists(pkl_path):
+        total += os.path.getsize(pkl_path)
+    forest_path = os.path.join(MODELS_DIR, f"{name}.forest")
+    for root, _, files in os.walk(forest_path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+def _single_row_p99_ms(name, rows):
+    """p99 of one-row predictions on the path predict.py serves single requests with"""
+    import time
+    from compiled_forest import CompiledPipeline
+    from serving_snapshot import snapshot_model
+    model = snapshot_model(CompiledPipeline.load(os.path.join(MODELS_DIR, f"{name}.forest"), mmap_mode=None))
+    call = model.predict_proba if model.kind == "classifier" else model.predict
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        call([row])
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(samples, 99))
+
+def distill_lite_model(pipeline, X_teacher, X_test, y_test, name):
+    """
+    Fit `<name>_lite` on the full pipeline's predictions for X_teacher (its
+    fitted preprocessor is reused), save and compile it, and record a parity
+    report against the full model on the held-out rows.
+    """
+    lite_name = name + LITE_SUFFIX
+    teacher = pipeline.predict(X_teacher)
+    is_classifier = hasattr(pipeline, "predict_proba")
+    builder = build_lite_recommender if is_classifier else build_lite_budget
+    lite = builder(pipeline.named_steps["preprocessor"])
+    # The preprocessor is already fitted; only the estimator learns
+    lite.steps[-1][1].fit(pipeline.named_steps["preprocessor"].transform(X_teacher), teacher)
+
+    joblib.dump(lite, os.path.join(MODELS_DIR, f"{lite_name}.pkl"))
+    export_compiled_model(lite, X_test, lite_name)
+
+    full_preds, lite_preds = pipeline.predict(X_test), lite.predict(X_test)
+    rows = X_test.head(500).to_dict("records")
+    report = {
+        "full": {"bytes": _artifact_bytes(name), "p99_ms": _single_row_p99_ms(name, rows)},
+        "lite": {"bytes": _artifact_bytes(lite_name), "p99_ms": _single_row_p99_ms(lite_name, rows)},
+    }
+    if is_classifier:
+        report["full"]["accuracy"] = float(accuracy_score(y_test, full_preds))
+        report["lite"]["accuracy"] = float(accuracy_score(y_test, lite_preds))
+        report["accuracy_delta"] = report["lite"]["accuracy"] - report["full"]["accuracy"]
+        report["agreement_with_full"] = float(np.mean(full_preds == lite_preds))
+        print(f"🪶 {lite_name}: accuracy {report['lite']['accuracy']:.2%} "
+              f"({report['accuracy_delta']:+.2%} vs full), agrees with full on {report['agreement_with_full']:.2%}")
+    else:
+        report["full"]["mae"] = float(mean_absolute_error(y_test, full_preds))
+        report["lite"]["mae"] = float(mean_absolute_error(y_test, lite_preds))
+        report["mae_delta"] = report["lite"]["mae"] - report["full"]["mae"]
+        report["mae_vs_full"] = float(mean_absolute_error(full_preds, lite_preds))
+        print(f"🪶 {lite_name}: MAE ₹{report['lite']['mae']:,.0f} "
+              f"(₹{report['mae_delta']:+,.0f} vs full)")
+    print(f"   {report['full']['bytes'] / 1e6:.2f} MB -> {report['lite']['bytes'] / 1e6:.3f} MB, "
+          f"single-row p99 {report['full']['p99_ms']:.3f} -> {report['lite']['p99_ms']:.3f} ms")
+    write_lite_report(name, report)
+    return report
+
+def write_lite_report(name, report):
+    """Merge one model's parity report into models/lite_parity.json"""
+    import json
+    reports = {}
+    if os.path.exists(LITE_REPORT_PATH):
+        with open(LITE_REPORT_PATH) as f:
+            reports = json.load(f)
+    reports[name] = report
+    with open(LITE_REPORT_PATH, "w") as f:
+        json.dump(reports, f, indent=2)
+
+def build_recommender_pipeline(n_estimators=100, max_depth=10, n_jobs=-1):
+    """Unfitted preprocessing + RandomForestClassifier pipeline for Model A"""
+    categorical_features = ["season", "pace", "focus"]
+    numerical_features = ["budget", "days"]
+    
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features),
+            ('num', StandardScaler(), numerical_features)
+        ]
+    )
+    
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(n_estimators=n_estimators, random_state=42, max_depth=max_depth, n_jobs=n_jobs))
+    ])
+
+def build_budget_pipeline(n_estimators=100, max_depth=10, n_jobs=-1):
+    """Unfitted preprocessing + RandomForestRegressor pipeline for Model C"""
+    categorical_features = ["destination", "season", "comfort_level", "trip_type"]
     
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+        ],
+        remainder='passthrough'
+    )
+    
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('regressor', RandomForestRegressor(n_estimators=n_estimators, random_state=42, max_depth=max_depth, n_jobs=n_jobs))
+    ])
+
+def load_recommender_destinations():
+    """Destinations the recommender may predict, with the attributes the labelling heuristic uses"""
     kg_path = os.path.join(CLEAN_DATA_DIR, "destinations_knowledge_graph.csv")
     if not os.path.exists(kg_path):
-        print("❌ Knowledge graph missing. Run data_cleaning.py")
-        return
+        return None
         
-    df_dest = pd.read_csv(kg_path)
-    # Use all data available for a diverse set of destinations
-    # We no longer limit to just 50, but we can drop NA Ratings if necessary.
-    df_dest = df_dest.sort_values(by="Rating", ascending=False)
+    kg = get_knowledge_graph(kg_path)
     
     # ---------------------------------------------------------
     # CONSTRAINT FOR INTERVIEW: Lock strictly to 3 destinations
     # ---------------------------------------------------------
     allowed_dests = ["Hampta Pass", "Varanasi", "Sikkim"]
-    filtered_df = df_dest[df_dest["Destination"].isin(allowed_dests)]
+    filtered_df = pd.DataFrame([kg.get(d) for d in allowed_dests if d in kg])
     
     # If they are not found in the KG due to naming, create them synthetically to ensure the app works.
     if filtered_df.empty or len(filtered_df) < 3:
@@ -42,101 +193,32 @@ def train_destination_recommender():
             {"Destination": "Varanasi", "Category": "Culture|Spiritual|History", "FocusTrait": "Culture", "Rating": 4.9, "HoursNeeded": 48, "State": "Uttar Pradesh"},
             {"Destination": "Sikkim", "Category": "Nature|Monasteries|Peace", "FocusTrait": "Nature", "Rating": 4.7, "HoursNeeded": 120, "State": "Sikkim"}
         ]
-        df_dest = pd.DataFrame(custom_destinations)
-    else:
-        df_dest = filtered_df
+        return pd.DataFrame(custom_destinations)
     # ---------------------------------------------------------
+    return filtered_df
+
+def train_destination_recommender(num_samples=10000, seed=42):
+    print("\n" + "="*60)
+    print("🤖 TRAINING DESTINATION RECOMMENDATION MODEL (MODEL A)")
+    print("="*60)
+    
+    df_dest = load_recommender_destinations()
+    if df_dest is None:
+        print("❌ Knowledge graph missing. Run data_cleaning.py")
+        return
     
     # 1. Generate Synthetic Training Data representing "User Profiles -> Best Destination"
-    # To train a model, we simulate 10,000 travelers, map them to ideal destinations based 
+    # To train a model, we simulate travelers, map them to ideal destinations based 
     # on their constraints to create ground truth, then train the RF Classifier.
-    
-    np.random.seed(42)
-    num_samples = 10000
-    
-    seasons = ["Summer", "Winter", "Monsoon", "Spring"]
-    paces = ["Fast", "Slow"]
-    focuses = ["Nature", "Culture", "Food", "Thrills"]
-    budgets = np.random.uniform(5000, 100000, num_samples)
-    days_list = np.random.randint(2, 14, num_samples)
-    
-    samples = []
-    
-    for i in range(num_samples):
-        b = budgets[i]
-        d = days_list[i]
-        s = np.random.choice(seasons)
-        p = np.random.choice(paces)
-        f = np.random.choice(focuses)
-        
-        # Expert heuristic to assign label
-        # Filter by focus
-        valid_dests = df_dest[df_dest["Category"].str.contains(f, case=False, na=False) | (df_dest["FocusTrait"] == f)]
-        if valid_dests.empty:
-            valid_dests = df_dest
-            
-        # Define a consistent mapping from user features to destination
-        daily_budget = b / d
-        
-        valid_dests = valid_dests.sort_values(by="Rating", ascending=False)
-        n = len(valid_dests)
-        
-        # Budget tier determines which third of the destinations by rating we pick
-        if daily_budget > 8000:
-            pool = valid_dests.iloc[:max(1, n//3)]
-        elif daily_budget > 3000:
-            pool = valid_dests.iloc[max(1, n//3):max(2, 2*n//3)]
-        else:
-            pool = valid_dests.iloc[max(2, 2*n//3):]
-            
-        if pool.empty:
-            pool = valid_dests
-            
-        # Pace determines the sorting direction by hours needed
-        if p == "Fast":
-            pool = pool.sort_values(by="HoursNeeded", ascending=False)
-        else:
-            pool = pool.sort_values(by="HoursNeeded", ascending=True)
-            
-        # Extract top 15 from the pool to give variety, then sample one probabilistically.
-        # This allows the Random Forest to learn overlapping probabilities (predict_proba)
-        # instead of deterministically returning only 1 location.
-        sub_pool = pool.head(15)
-        
-        # We can weight the random choice by Rating so better rated places appear slightly more often
-        weights = sub_pool["Rating"].fillna(1.0).astype(float)
-        label = sub_pool.sample(n=1, weights=weights, random_state=np.random.RandomState()).iloc[0]["Destination"]
-        
-        samples.append({
-            "budget": b,
-            "days": d,
-            "season": s,
-            "pace": p,
-            "focus": f,
-            "target_destination": label
-        })
-        
-    train_df = pd.DataFrame(samples)
-    print(f"Generated {len(train_df)} traveler preference profiles.")
+    # Labels are drawn from a seeded generator so retraining is reproducible.
+    train_df = generate_traveler_profiles(df_dest, num_samples, seed)
+    profiles_path = write_training_file(train_df)
+    print(f"Generated {len(train_df)} traveler preference profiles ({profiles_path}).")
     
     X = train_df.drop(columns=["target_destination"])
     y = train_df["target_destination"]
     
-    # Preprocessor
-    categorical_features = ["season", "pace", "focus"]
-    numerical_features = ["budget", "days"]
-    
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features),
-            ('num', StandardScaler(), numerical_features)
-        ]
-    )
-    
-    pipeline = Pipeline(steps=[
-        ('preprocessor', preprocessor),
-        ('classifier', RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10, n_jobs=-1))
-    ])
+    pipeline = build_recommender_pipeline()
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     pipeline.fit(X_train, y_train)
@@ -148,24 +230,20 @@ def train_destination_recommender():
     model_path = os.path.join(MODELS_DIR, "destination_recommender.pkl")
     joblib.dump(pipeline, model_path)
     print(f"💾 Saved Destination Model to {model_path}")
-
-def train_budget_model():
-    print("\n" + "="*60)
-    print("💰 TRAINING BUDGET PREDICTION MODEL (MODEL C) WITH KAGGLE DATA")
-    print("="*60)
-    
-    baselines_path = os.path.join(CLEAN_DATA_DIR, "budget_baselines.csv")
-    if not os.path.exists(baselines_path):
-         print("❌ Baselines missing. Run data_cleaning.py")
-         return
-         
-    df_base = pd.read_csv(baselines_path)
+    export_compiled_model(pipeline, X_test, "destination_recommender")
+    teacher_df = generate_traveler_profiles(df_dest, LITE_TEACHER_SAMPLES, seed + 1)
+    distill_lite_model(pipeline, teacher_df.drop(columns=["target_destination"]), X_test, y_test,
+                       "destination_recommender")
     
-    # We will expand the 'Travel Details' Kaggle baselines into a larger synthetic dataset
-    # Because only 139 rows won't generalize across all our features cleanly
-    
-    num_samples = 15000
-    np.random.seed(42)
+    table, report = build_table(pipeline)
+    table.save(TABLE_PATH)
+    print(f"🧮 Saved recommendation table ({report['cells']:,} cells, {report['bytes'] / 1e6:.1f} MB) to {TABLE_PATH}")
+    print(f"   Grid error: max {report['max_prob_error']:.4f}, mean {report['mean_prob_error']:.5f}, "
+          f"top-1 agreement {report['top1_agreement']:.2%}")
+
+def generate_budget_samples(num_samples, seed=42):
+    """Synthetic trip costs with the budget regressor's feature columns plus total_cost_inr"""
+    np.random.seed(seed)
     
     # CONSTRAINT FOR INTERVIEW: Lock strictly to 3 destinations
     destinations = ["Hampta Pass", "Varanasi", "Sikkim"]
@@ -210,26 +288,29 @@ def train_budget_model():
             "total_cost_inr": total
         })
         
-    df_train = pd.DataFrame(samples)
+    return pd.DataFrame(samples)
+
+def train_budget_model():
+    print("\n" + "="*60)
+    print("💰 TRAINING BUDGET PREDICTION MODEL (MODEL C) WITH KAGGLE DATA")
+    print("="*60)
+    
+    baselines_path = os.path.join(CLEAN_DATA_DIR, "budget_baselines.csv")
+    if not os.path.exists(baselines_path):
+         print("❌ Baselines missing. Run data_cleaning.py")
+         return
+         
+    df_base = read_table(baselines_path)
+    
+    # We will expand the 'Travel Details' Kaggle baselines into a larger synthetic dataset
+    # Because only 139 rows won't generalize across all our features cleanly
+    df_train = generate_budget_samples(15000, seed=42)
     print(f"Generated {len(df_train)} real-world bounded trip costs.")
     
     X = df_train.drop(columns=["total_cost_inr"])
     y = df_train["total_cost_inr"]
     
-    categorical_features = ["destination", "season", "comfort_level", "trip_type"]
-    numerical_features = ["number_of_days", "number_of_people", "airport_dist_km"]
-    
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
-        ],
-        remainder='passthrough'
-    )
-    
-    pipeline = Pipeline(steps=[
-        ('preprocessor', preprocessor),
-        ('regressor', RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10, n_jobs=-1))
-    ])
+    pipeline = build_budget_pipeline()
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
     pipeline.fit(X_train, y_train)
@@ -241,7 +322,127 @@ def train_budget_model():
     model_path = os.path.join(MODELS_DIR, "budget_regressor.pkl")
     joblib.dump(pipeline, model_path)
     print(f"💾 Saved Budget Regressor to {model_path}")
+    export_compiled_model(pipeline, X_test, "budget_regressor")
+    teacher_df = generate_budget_samples(LITE_TEACHER_SAMPLES, seed=43)
+    distill_lite_model(pipeline, teacher_df.drop(columns=["total_cost_inr"]), X_test, y_test, "budget_regressor")
+
+def publish_models():
+    """
+    Rebuild the serving snapshot and similarity index from models/, then
+    write a new manifest. Every writer of models/ ends with this, so serving
+    processes never see model files their manifest does not describe.
+    """
+    from serving_snapshot import build_snapshot, SNAPSHOT_PATH
+    build_snapshot(MODELS_DIR)
+    print(f"📦 Wrote serving snapshot to {SNAPSHOT_PATH}")
+
+    from similarity_index import build_index, INDEX_PATH
+    build_index()
+    print(f"🔎 Wrote similarity index to {INDEX_PATH}")
+
+    # Last, so serving processes polling the manifest only reload once
+    # every artifact above is in place
+    from model_manifest import write_manifest, MANIFEST_PATH
+    manifest = write_manifest(MODELS_DIR)
+    print(f"🏷️  Published model version {manifest['version']} in {MANIFEST_PATH}")
+    return manifest
+
+# Fixed reference rows incremental updates are judged on: the same every
+# run, and never drawn from the batch being learned (seeds 42 / 43 are the
+# training and distillation sets)
+BUDGET_HOLDOUT_SAMPLES = 3000
+BUDGET_HOLDOUT_SEED = 44
+
+def update_budget_model(new_df, holdout_df=None, new_trees=20, max_trees=200,
+                        tolerance=0.0, model_path=None):
+    """
+    Incrementally retrain the budget regressor on `new_df` only.
+    
+    The fitted preprocessor is reused as-is, `new_trees` trees are fit on the
+    new rows and appended to the current forest, and the oldest trees are
+    dropped once the forest exceeds `max_trees` (a rolling window over past
+    batches). The update is kept only if MAE on the held-out rows does not
+    get worse at all; pass a relative `tolerance` to accept some slack.
+    The held-out rows default to the fixed reference set
+    (BUDGET_HOLDOUT_SEED), so a batch is never graded on itself.
+    Cost scales with the size of `new_df`, not with the training history.
+    An accepted update of the model in models/ is published right away.
+    
+    Returns a dict with the before/after MAE and whether it was accepted.
+    """
+    print("\n" + "="*60)
+    print("🔁 INCREMENTAL BUDGET MODEL UPDATE")
+    print("="*60)
+    
+    model_path = model_path or os.path.join(MODELS_DIR, "budget_regressor.pkl")
+    if not os.path.exists(model_path):
+        print("❌ No budget model to update. Run train_models.py first")
+        return None
+    
+    pipeline = joblib.load(model_path)
+    preprocessor = pipeline.named_steps["preprocessor"]
+    forest = pipeline.named_steps["regressor"]
+    
+    if holdout_df is None:
+        holdout_df = generate_budget_samples(BUDGET_HOLDOUT_SAMPLES, seed=BUDGET_HOLDOUT_SEED)
+    X_new, y_new = new_df.drop(columns=["total_cost_inr"]), new_df["total_cost_inr"]
+    X_hold, y_hold = holdout_df.drop(columns=["total_cost_inr"]), holdout_df["total_cost_inr"]
+    
+    mae_before = mean_absolute_error(y_hold, pipeline.predict(X_hold))
+    
+    # Fit only the new trees, on the new rows, in the existing feature space.
+    # Each batch is seeded by the number of trees grown so far, so successive
+    # batches draw different bootstrap samples (the rolling window keeps the
+    # forest's own tree count at max_trees).
+    trees_grown = getattr(forest, "trees_grown_", len(forest.estimators_))
+    increment = clone(forest).set_params(n_estimators=new_trees, warm_start=False, random_state=trees_grown)
+    increment.fit(preprocessor.transform(X_new), y_new)
+    
+    updated = copy.copy(forest)
+    updated.estimators_ = (list(forest.estimators_) + list(increment.estimators_))[-max_trees:]
+    updated.n_estimators = len(updated.estimators_)
+    updated.trees_grown_ = trees_grown + new_trees
+    candidate = Pipeline(steps=[('preprocessor', preprocessor), ('regressor', updated)])
+    
+    mae_after = mean_absolute_error(y_hold, candidate.predict(X_hold))
+    accepted = mae_after <= mae_before * (1 + tolerance)
+    print(f"   Trained {new_trees} trees on {len(X_new)} new rows "
+          f"({len(forest.estimators_)} -> {updated.n_estimators} trees)")
+    print(f"   Held-out MAE: ₹{mae_before:,.0f} -> ₹{mae_after:,.0f}")
+    
+    if accepted:
+        joblib.dump(candidate, model_path)
+        print(f"✅ Update accepted, saved to {model_path}")
+        if os.path.dirname(os.path.abspath(model_path)) == os.path.abspath(MODELS_DIR):
+            export_compiled_model(candidate, X_hold, "budget_regressor")
+            publish_models()
+    else:
+        print("❌ Update rejected: held-out MAE regressed, keeping current model")
+    
+    return {
+        "accepted": bool(accepted),
+        "mae_before": float(mae_before),
+        "mae_after": float(mae_after),
+        "n_trees": updated.n_estimators if accepted else len(forest.estimators_),
+    }
 
 if __name__ == "__main__":
-    train_destination_recommender()
-    train_budget_model()
+    import sys
+    
+    # python train_models.py --incremental new_trips.csv
+    # appends trees trained on new_trips.csv to the current budget model
+    if "--incremental" in sys.argv:
+        new_data_path = sys.argv[sys.argv.index("--incremental") + 1]
+        # An accepted update publishes itself
+        result = update_budget_model(pd.read_csv(new_data_path))
+        sys.exit(0 if result else 1)
+    else:
+        # python train_models.py --if-changed
+        # retrains only when data_cleaning.py produced different clean data
+        if "--if-changed" in sys.argv and not training_inputs_changed():
+            print("⏭️  Clean data unchanged since the last training run, nothing to do")
+            sys.exit(0)
+        train_destination_recommender()
+        train_budget_model()
+        record_inputs("train_models", TRAINING_INPUTS)
+        publish_models()
@@ -0,0 +1,230 @@
+"""
+Training orchestrator: cached datasets + parallel hyperparameter sweeps.
+
+Generated datasets and their encoded feature matrices are cached under
+cache/training/, keyed by a hash of the data config and of the data files
+the dataset is generated from (the knowledge graph for the recommender),
+so editing them invalidates the entry. Changing only forest
+hyperparameters never regenerates data or refits the ColumnTransformer.
+Every (model, n_estimators, max_depth) combination is fit in a process
+pool, and the results go into a leaderboard of quality (accuracy / MAE)
+against fit time, compiled single-row predict latency and artifact size.
+
+    python train_orchestrator.py [--workers N] [--quick]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import joblib
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, mean_absolute_error
+from sklearn.pipeline import Pipeline
+
+from train_models import (
+    MODELS_DIR, build_recommender_pipeline, build_budget_pipeline,
+    load_recommender_destinations, generate_budget_samples,
+)
+from traveler_profiles import generate_traveler_profiles
+from compiled_forest import compile_pipeline
+from knowledge_graph import KG_PATH
+from latency_stats import percentile
+
+BASE_DIR = os.path.dirname(__file__)
+CACHE_DIR = os.path.join(BASE_DIR, "cache", "training")
+LEADERBOARD_PATH = os.path.join(MODELS_DIR, "leaderboard.json")
+
+# Bump when dataset generation or encoding changes so old cache entries are ignored
+CACHE_VERSION = 1
+
+DATA_CONFIGS = {
+    "destination_recommender": {"num_samples": 10000, "seed": 42, "test_size": 0.2},
+    "budget_regressor": {"num_samples": 15000, "seed": 42, "test_size": 0.2},
+}
+
+DEFAULT_GRID = {
+    "n_estimators": [25, 50, 100, 200],
+    "max_depth": [6, 8, 10, 14],
+}
+QUICK_GRID = {
+    "n_estimators": [25, 100],
+    "max_depth": [6, 10],
+}
+
+PIPELINE_BUILDERS = {
+    "destination_recommender": build_recommender_pipeline,
+    "budget_regressor": build_budget_pipeline,
+}
+
+# Files generate_dataset reads for each model; their contents are part of the cache key
+DATA_FILES = {
+    "destination_recommender": [KG_PATH],
+    "budget_regressor": [],
+}
+
+def file_digest(path):
+    """sha256 of a file's contents, or None when it does not exist"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def config_hash(model, data_config):
+    data_files = {os.path.basename(path): file_digest(path) for path in DATA_FILES[model]}
+    payload = json.dumps({"model": model, "cache_version": CACHE_VERSION, "data_files": data_files, **data_config},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def generate_dataset(model, data_config):
+    """Raw (X, y) frames for a model's data config"""
+    if model == "destination_recommender":
+        df = generate_traveler_profiles(load_recommender_destinations(),
+                                        data_config["num_samples"], data_config["seed"])
+        return df.drop(columns=["target_destination"]), df["target_destination"]
+    df = generate_budget_samples(data_config["num_samples"], data_config["seed"])
+    return df.drop(columns=["total_cost_inr"]), df["total_cost_inr"]
+
+def prepare_dataset(model, data_config=None):
+    """
+    Generate, split and encode the dataset for `model`, or reuse the cached
+    copy. Returns the cache entry directory holding matrices.npz (encoded
+    train/test matrices and targets) and preprocessor.pkl.
+    """
+    data_config = data_config or DATA_CONFIGS[model]
+    entry = os.path.join(CACHE_DIR, f"{model}-{config_hash(model, data_config)}")
+    if os.path.exists(os.path.join(entry, "matrices.npz")):
+        return entry
+
+    X, y = generate_dataset(model, data_config)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=data_config["test_size"], random_state=data_config["seed"])
+    preprocessor = PIPELINE_BUILDERS[model]().named_steps["preprocessor"]
+    Xt_train = preprocessor.fit_transform(X_train)
+    Xt_test = preprocessor.transform(X_test)
+    if hasattr(Xt_train, "toarray"):
+        Xt_train, Xt_test = Xt_train.toarray(), Xt_test.toarray()
+
+    # Write into a temp dir and rename, so concurrent sweeps never read half an entry
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=CACHE_DIR)
+    np.savez(os.path.join(tmp, "matrices.npz"),
+             X_train=Xt_train, X_test=Xt_test,
+             y_train=np.asarray(y_train.tolist()), y_test=np.asarray(y_test.tolist()),
+             raw_test_rows=np.array(json.dumps(X_test.head(200).to_dict("records"))))
+    joblib.dump(preprocessor, os.path.join(tmp, "preprocessor.pkl"))
+    with open(os.path.join(tmp, "config.json"), "w") as f:
+        json.dump({"model": model, **data_config}, f)
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        # Another process published the same entry first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return entry
+
+def _single_row_latency_ms(compiled, rows, repeats=200):
+    for row in rows[:5]:
+        compiled.predict([row])
+    samples = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        compiled.predict([rows[i % len(rows)]])
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 50), percentile(samples, 99)
+
+def run_trial(model, entry, n_estimators, max_depth):
+    """Fit one forest on cached matrices and measure quality, cost and size"""
+    with np.load(os.path.join(entry, "matrices.npz"), allow_pickle=False) as data:
+        X_train, X_test = data["X_train"], data["X_test"]
+        y_train, y_test = data["y_train"], data["y_test"]
+        raw_rows = json.loads(str(data["raw_test_rows"]))
+    preprocessor = joblib.load(os.path.join(entry, "preprocessor.pkl"))
+
+    # One core per trial; the process pool supplies the parallelism
+    pipeline = PIPELINE_BUILDERS[model](n_estimators=n_estimators, max_depth=max_depth, n_jobs=1)
+    forest = pipeline.steps[-1][1]
+    start = time.perf_counter()
+    forest.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    preds = forest.predict(X_test)
+    if model == "destination_recommender":
+        metric = {"accuracy": float(accuracy_score(y_test, preds))}
+    else:
+        metric = {"mae": float(mean_absolute_error(y_test, preds))}
+
+    fitted = Pipeline(steps=[("preprocessor", preprocessor), pipeline.steps[-1]])
+    compiled = compile_pipeline(fitted)
+    p50_ms, p99_ms = _single_row_latency_ms(compiled, raw_rows)
+    artifact_bytes = sum(arr.nbytes for arr in compiled.arrays.values())
+
+    return {
+        "model": model,
+        "n_estimators": n_estimators,
+        "max_depth": max_depth,
+        **metric,
+        "fit_s": round(fit_s, 3),
+        "predict_p50_ms": round(p50_ms, 4),
+        "predict_p99_ms": round(p99_ms, 4),
+        "artifact_bytes": int(artifact_bytes),
+    }
+
+def run_sweep(grid=DEFAULT_GRID, models=tuple(PIPELINE_BUILDERS), workers=None):
+    """Run every model x grid point across a process pool; returns the leaderboard rows"""
+    entries = {model: prepare_dataset(model) for model in models}
+    trials = [
+        (model, entries[model], n, d)
+        for model in models
+        for n, d in itertools.product(grid["n_estimators"], grid["max_depth"])
+    ]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_trial, *trial) for trial in trials]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    # Best quality first within each model
+    results.sort(key=lambda r: (r["model"], -r.get("accuracy", 0.0), r.get("mae", 0.0)))
+    return results
+
+def write_leaderboard(results, path=LEADERBOARD_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    return path
+
+def print_leaderboard(results):
+    current = None
+    for r in results:
+        if r["model"] != current:
+            current = r["model"]
+            print("\n" + "="*78)
+            print(f"🏁 {current}")
+            print("="*78)
+            print(f"{'trees':>6} {'depth':>6} {'quality':>12} {'fit s':>8} {'p50 ms':>8} {'p99 ms':>8} {'artifact':>12}")
+        quality = f"{r['accuracy']:.2%}" if "accuracy" in r else f"₹{r['mae']:,.0f}"
+        print(f"{r['n_estimators']:>6} {r['max_depth']:>6} {quality:>12} {r['fit_s']:>8.2f} "
+              f"{r['predict_p50_ms']:>8.3f} {r['predict_p99_ms']:>8.3f} {r['artifact_bytes'] / 1e6:>10.2f}MB")
+
+if __name__ == "__main__":
+    workers = None
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    grid = QUICK_GRID if "--quick" in sys.argv else DEFAULT_GRID
+
+    start = time.perf_counter()
+    results = run_sweep(grid, workers=workers)
+    print_leaderboard(results)
+    path = write_leaderboard(results)
+    print(f"\n📊 {len(results)} trials in {time.perf_counter() - start:.1f}s, leaderboard saved to {path}")
@@ -0,0 +1,121 @@
+"""
+Vectorised synthetic traveler-profile generator for the destination recommender.
+
+The labelling heuristic only depends on (focus, budget tier, pace), so the
+candidate pool and rating weights for each of those 4 x 3 x 2 combinations
+are computed once. Every profile and its weighted label are then drawn in
+bulk from one seeded generator, which makes the labels reproducible and
+scales to millions of profiles in seconds.
+
+    python traveler_profiles.py --samples 1000000
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+# Generated, so it lives in the (git-ignored) training cache, not clean_data/
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+PROFILES_PATH = os.path.join(CACHE_DIR, "traveler_profiles.csv")
+
+SEASONS = ["Summer", "Winter", "Monsoon", "Spring"]
+PACES = ["Fast", "Slow"]
+FOCUSES = ["Nature", "Culture", "Food", "Thrills"]
+
+# Daily budget thresholds splitting travelers into rating tiers (high, mid, low)
+TIER_THRESHOLDS = (8000, 3000)
+# Destinations kept per pool before the weighted draw
+POOL_SIZE = 15
+
+def budget_tier(daily_budget):
+    """0 = top third by rating, 1 = middle third, 2 = bottom third"""
+    high, mid = TIER_THRESHOLDS
+    return np.where(daily_budget > high, 0, np.where(daily_budget > mid, 1, 2))
+
+def build_label_pools(df_dest):
+    """
+    Candidate destinations and cumulative rating weights for every
+    (focus, tier, pace) combination, indexed as pools[focus][tier][pace].
+    """
+    pools = []
+    for f in FOCUSES:
+        valid_dests = df_dest[df_dest["Category"].str.contains(f, case=False, na=False) | (df_dest["FocusTrait"] == f)]
+        if valid_dests.empty:
+            valid_dests = df_dest
+        valid_dests = valid_dests.sort_values(by="Rating", ascending=False, kind="mergesort")
+        n = len(valid_dests)
+
+        tiers = []
+        for tier_pool in (
+            valid_dests.iloc[:max(1, n // 3)],
+            valid_dests.iloc[max(1, n // 3):max(2, 2 * n // 3)],
+            valid_dests.iloc[max(2, 2 * n // 3):],
+        ):
+            if tier_pool.empty:
+                tier_pool = valid_dests
+
+            paces = []
+            for p in PACES:
+                # Fast travelers get the longest visits first, slow ones the shortest
+                pool = tier_pool.sort_values(by="HoursNeeded", ascending=(p != "Fast"), kind="mergesort")
+                sub_pool = pool.head(POOL_SIZE)
+                weights = sub_pool["Rating"].fillna(1.0).astype(float).to_numpy()
+                cum_weights = np.cumsum(weights)
+                paces.append((sub_pool["Destination"].to_numpy(), cum_weights / cum_weights[-1]))
+            tiers.append(paces)
+        pools.append(tiers)
+    return pools
+
+def generate_traveler_profiles(df_dest, num_samples=10000, seed=42):
+    """Draw `num_samples` traveler profiles with heuristic destination labels"""
+    rng = np.random.default_rng(seed)
+    budgets = rng.uniform(5000, 100000, num_samples)
+    days = rng.integers(2, 14, num_samples)
+    season_idx = rng.integers(0, len(SEASONS), num_samples)
+    pace_idx = rng.integers(0, len(PACES), num_samples)
+    focus_idx = rng.integers(0, len(FOCUSES), num_samples)
+    tier_idx = budget_tier(budgets / days)
+    draws = rng.random(num_samples)
+
+    pools = build_label_pools(df_dest)
+    labels = np.empty(num_samples, dtype=object)
+    pool_id = (focus_idx * 3 + tier_idx) * len(PACES) + pace_idx
+    for f in range(len(FOCUSES)):
+        for t in range(3):
+            for p in range(len(PACES)):
+                mask = pool_id == (f * 3 + t) * len(PACES) + p
+                if not mask.any():
+                    continue
+                names, cum_weights = pools[f][t][p]
+                picks = np.searchsorted(cum_weights, draws[mask], side="right")
+                labels[mask] = names[np.minimum(picks, len(names) - 1)]
+
+    return pd.DataFrame({
+        "budget": budgets,
+        "days": days,
+        "season": np.array(SEASONS)[season_idx],
+        "pace": np.array(PACES)[pace_idx],
+        "focus": np.array(FOCUSES)[focus_idx],
+        "target_destination": labels,
+    })
+
+def write_training_file(train_df, path=PROFILES_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    train_df.to_csv(path, index=False)
+    return path
+
+if __name__ == "__main__":
+    import time
+    from train_models import load_recommender_destinations
+
+    num_samples = 10000
+    if "--samples" in sys.argv:
+        num_samples = int(sys.argv[sys.argv.index("--samples") + 1])
+
+    start = time.perf_counter()
+    profiles = generate_traveler_profiles(load_recommender_destinations(), num_samples)
+    elapsed = time.perf_counter() - start
+    out_path = write_training_file(profiles)
+    print(f"✅ Generated {len(profiles):,} traveler profiles in {elapsed:.2f}s -> {out_path}")
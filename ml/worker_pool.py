@@ -0,0 +1,457 @@
+"""
+Pre-forked worker pool for predict.py.
+
+The parent loads both pipelines, the recommendation table and the
+knowledge graph once, freezes them out of the garbage collector (so the
+collector never writes to their pages) and forks N workers. The workers
+share those pages copy-on-write instead of each holding its own copy.
+
+Requests arriving on the pool's Unix socket go into one bounded dispatch
+queue. Each worker pulls from it, keeping up to DEPTH requests in flight
+so it never idles between them. When the queue is full, new requests are
+answered at once with {"error": "Server busy", "retryable": true}
+(admission control) instead of waiting behind work the pool cannot finish.
+
+A worker that dies is reaped and re-forked from the parent, which still
+holds the loaded models, so a restart costs a fork, not a model load.
+Requests it had in flight are retried once on the replacement.
+
+When train_models.py publishes a new models/manifest.json, the parent
+loads and warms the new models on a helper thread, then replaces the
+workers one slot at a time: the new worker is forked (sharing the new
+models) before the old one stops taking requests, and the old one exits
+once its in-flight requests are answered. Every response names its
+"model_version".
+
+The wire protocol is predict.py serve's NDJSON; responses on a connection
+come back in completion order, matched by "id". "pool_stats" returns
+per-worker queue depth, latency histogram, memory (RSS vs PSS) and
+restart counts.
+
+    python predict.py serve --workers N [--socket PATH]
+    python worker_pool.py --bench [--workers 1,2,4,8,16] [--clients 64] [--requests 4000]
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import predict
+from inference_service import Histogram, LATENCY_BUCKETS_MS, DEFAULT_SOCKET
+
+# Requests each worker may have in flight
+DEPTH = int(os.environ.get("SAFAR_POOL_DEPTH", 2))
+# Requests waiting for a worker before new ones are turned away
+QUEUE_SIZE = int(os.environ.get("SAFAR_POOL_QUEUE", 256))
+# Times a request is retried when its worker dies under it
+MAX_RETRIES = 1
+
+class WorkerCrashed(Exception):
+    pass
+
+def worker_main(sock):
+    """Child process: answer NDJSON requests from the parent, in order, until EOF"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    with sock, sock.makefile("r") as reader, sock.makefile("w") as writer:
+        for line in reader:
+            writer.write(json.dumps(predict.handle_line(line)) + "\n")
+            writer.flush()
+
+def memory_kb(pid):
+    """(RSS, PSS) of a process in kB; PSS charges shared pages 1/n to each of n sharers"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:"):
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None, None
+    return fields.get("Rss"), fields.get("Pss")
+
+class Worker:
+    """Parent-side handle of one forked worker"""
+    def __init__(self, slot, pid, reader, writer):
+        self.slot = slot
+        self.pid = pid
+        self.reader = reader
+        self.writer = writer
+        self.pending = deque()
+        self.alive = True
+        # Replaced after a model reload: finishing its requests, then exiting
+        self.retired = False
+        self.read_task = asyncio.ensure_future(self._read_responses())
+
+    async def request(self, line):
+        if not self.alive:
+            raise WorkerCrashed(self.pid)
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(future)
+        self.writer.write(line if line.endswith(b"\n") else line + b"\n")
+        return await future
+
+    async def _read_responses(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                self.pending.popleft().set_result(json.loads(line))
+        except (ConnectionError, ValueError):
+            pass
+        self.alive = False
+        while self.pending:
+            self.pending.popleft().set_exception(WorkerCrashed(self.pid))
+
+class WorkerPool:
+    def __init__(self, workers, depth=DEPTH, queue_size=QUEUE_SIZE):
+        self.size = workers
+        self.depth = depth
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.workers = [None] * workers
+        self.ready = [asyncio.Event() for _ in range(workers)]
+        self.slot_stats = [
+            {"completed": 0, "errors": 0, "restarts": 0, "in_flight": 0, "latency_ms": Histogram(LATENCY_BUCKETS_MS)}
+            for _ in range(workers)
+        ]
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.rejected = 0
+        self.retried = 0
+        self.reloads = 0
+        # Parent-only descriptors (worker pipes, listener, client connections)
+        # that a freshly forked worker closes straight away
+        self.parent_fds = set()
+        self.tasks = []
+        self.closing = False
+        self.started = time.time()
+
+    @staticmethod
+    def preload():
+        """Load everything the workers share, then keep the GC off those pages"""
+        predict.load_model("destination_recommender")
+        predict.load_model("budget_regressor")
+        predict.load_recommendation_table()
+        predict.load_knowledge_graph()
+        predict.get_prediction_cache()
+        gc.collect()
+        gc.freeze()
+
+    async def spawn(self, slot):
+        parent_end, child_end = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                parent_end.close()
+                for fd in self.parent_fds:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+                worker_main(child_end)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        child_end.close()
+        self.parent_fds.add(parent_end.fileno())
+        reader, writer = await asyncio.open_unix_connection(sock=parent_end)
+        self.workers[slot] = Worker(slot, pid, reader, writer)
+        self.ready[slot].set()
+        asyncio.ensure_future(self._watch(slot, self.workers[slot]))
+
+    async def _watch(self, slot, worker):
+        """Reap a dead worker and fork its replacement"""
+        await worker.read_task
+        self.parent_fds.discard(worker.writer.get_extra_info("socket").fileno())
+        worker.writer.close()
+        status = None
+        try:
+            # The pipe closes as the worker exits; poll rather than block the loop
+            for _ in range(100):
+                pid, status = os.waitpid(worker.pid, os.WNOHANG)
+                if pid:
+                    break
+                await asyncio.sleep(0.01)
+            else:
+                os.kill(worker.pid, signal.SIGKILL)
+                _, status = os.waitpid(worker.pid, 0)
+        except (ChildProcessError, ProcessLookupError):
+            pass
+        if self.closing or worker.retired:
+            return
+        self.slot_stats[slot]["restarts"] += 1
+        print(json.dumps({"event": "worker_restart", "slot": slot, "pid": worker.pid, "status": status}),
+              file=sys.stderr, flush=True)
+        await self.spawn(slot)
+
+    async def start(self):
+        for slot in range(self.size):
+            await self.spawn(slot)
+        self.tasks = [asyncio.ensure_future(self._pull(slot)) for slot in range(self.size) for _ in range(self.depth)]
+        if predict.RELOAD_ENABLED:
+            self.tasks.append(asyncio.ensure_future(self._watch_models()))
+
+    async def _watch_models(self, interval=predict.RELOAD_INTERVAL_S):
+        """Poll the model manifest; on a new version, load it in the parent and roll the workers"""
+        import model_manifest
+        stamp = model_manifest.manifest_stamp()
+        while True:
+            await asyncio.sleep(interval)
+            if model_manifest.manifest_stamp() == stamp:
+                continue
+            stamp = model_manifest.manifest_stamp()
+            # A short-lived thread, gone again before the next fork
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-reload")
+            try:
+                generation = await asyncio.get_running_loop().run_in_executor(executor, predict.reload_and_log)
+            finally:
+                executor.shutdown(wait=True)
+            if generation is None:
+                continue
+            gc.collect()
+            gc.freeze()
+            self.reloads += 1
+            for slot in range(self.size):
+                await self.replace_worker(slot)
+
+    async def replace_worker(self, slot):
+        """Fork a worker on the current models into `slot` and retire the old one once it is idle"""
+        old = self.workers[slot]
+        old.retired = True
+        await self.spawn(slot)
+        while old.pending:
+            await asyncio.sleep(0.005)
+        if old.alive:
+            # EOF on its pipe ends worker_main; _watch reaps it without a restart
+            old.writer.write_eof()
+
+    async def stop(self):
+        self.closing = True
+        for task in self.tasks:
+            task.cancel()
+        for worker in self.workers:
+            if worker is not None and worker.alive:
+                worker.writer.close()
+                try:
+                    os.kill(worker.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    async def _live_worker(self, slot):
+        """The slot's worker, waiting for its replacement while it is being re-forked"""
+        while self.workers[slot] is None or not self.workers[slot].alive:
+            self.ready[slot].clear()
+            await self.ready[slot].wait()
+        return self.workers[slot]
+
+    async def _pull(self, slot):
+        stats = self.slot_stats[slot]
+        while True:
+            line, future, queued = await self.queue.get()
+            started = time.perf_counter()
+            self.queue_wait_ms.observe((started - queued) * 1000)
+            stats["in_flight"] += 1
+            try:
+                for attempt in range(MAX_RETRIES + 1):
+                    worker = await self._live_worker(slot)
+                    try:
+                        res = await worker.request(line)
+                        break
+                    except WorkerCrashed:
+                        stats["errors"] += 1
+                        res = {"error": "Worker crashed"}
+                        if attempt < MAX_RETRIES:
+                            self.retried += 1
+            finally:
+                stats["in_flight"] -= 1
+            stats["completed"] += 1
+            stats["latency_ms"].observe((time.perf_counter() - started) * 1000)
+            if not future.done():
+                future.set_result(res)
+
+    def submit(self, line):
+        """Future for the worker's response, or None when the dispatch queue is full"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((line, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return None
+        return future
+
+    def stats(self):
+        workers = []
+        for slot, worker in enumerate(self.workers):
+            s = self.slot_stats[slot]
+            rss, pss = memory_kb(worker.pid) if worker is not None else (None, None)
+            workers.append({
+                "slot": slot,
+                "pid": worker.pid if worker is not None else None,
+                "alive": worker is not None and worker.alive,
+                "queue_depth": s["in_flight"],
+                "completed": s["completed"],
+                "errors": s["errors"],
+                "restarts": s["restarts"],
+                "rss_kb": rss,
+                "pss_kb": pss,
+                "latency_ms": s["latency_ms"].snapshot(),
+            })
+        rss, pss = memory_kb(os.getpid())
+        return {
+            "uptime_s": round(time.time() - self.started, 3),
+            "workers": workers,
+            "depth": self.depth,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "model_version": predict.active_generation().version,
+            "reloads": self.reloads,
+            "parent": {"pid": os.getpid(), "rss_kb": rss, "pss_kb": pss},
+        }
+
+    async def handle_connection(self, reader, writer):
+        pending = set()
+        fd = writer.get_extra_info("socket").fileno()
+        self.parent_fds.add(fd)
+
+        async def respond(future, request_id, has_id):
+            res = await future
+            if has_id and "id" not in res:
+                res = dict(res, id=request_id)
+            writer.write((json.dumps(res) + "\n").encode())
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    action = request.get("action")
+                except Exception:
+                    writer.write(b'{"error": "Invalid JSON"}\n')
+                    continue
+                if action == "pool_stats":
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result({"pool": self.stats()})
+                else:
+                    future = self.submit(line)
+                    if future is None:
+                        future = asyncio.get_running_loop().create_future()
+                        future.set_result({"error": "Server busy", "retryable": True})
+                task = asyncio.ensure_future(respond(future, request.get("id"), "id" in request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+            if pending:
+                await asyncio.gather(*pending)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.parent_fds.discard(fd)
+            writer.close()
+
+async def run_pool(workers, socket_path=None, depth=DEPTH, queue_size=QUEUE_SIZE):
+    socket_path = socket_path or DEFAULT_SOCKET
+    WorkerPool.preload()
+    pool = WorkerPool(workers, depth, queue_size)
+    await pool.start()
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(pool.handle_connection, socket_path)
+    pool.parent_fds.add(server.sockets[0].fileno())
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: stopped.done() or stopped.set_result(None))
+    print(json.dumps({"listening": socket_path, "workers": workers, "depth": depth, "queue_size": queue_size}),
+          file=sys.stderr, flush=True)
+    try:
+        async with server:
+            await stopped
+    finally:
+        await pool.stop()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def serve_pool(workers, socket_path=None, depth=DEPTH, queue_size=QUEUE_SIZE):
+    asyncio.run(run_pool(workers, socket_path, depth, queue_size))
+
+def _bench_one(workers, requests, clients):
+    """Throughput / latency / memory of a pool of `workers` under `clients` closed-loop connections"""
+    import tempfile
+    import subprocess
+    from inference_service import drive_clients
+    from latency_stats import percentile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "pool.sock")
+        env = dict(os.environ, SAFAR_PREDICT_CACHE="0")
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(predict.BASE_DIR, "predict.py"), "serve",
+             "--workers", str(workers), "--socket", socket_path],
+            env=env, stderr=subprocess.PIPE, text=True)
+        try:
+            proc.stderr.readline()  # "listening" line
+            asyncio.run(drive_clients(socket_path, requests[:200], clients, "pool_stats"))  # warm-up
+            elapsed, latencies, stats = asyncio.run(drive_clients(socket_path, requests, clients, "pool_stats"))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+    pool = stats["pool"]
+    return {
+        "workers": workers,
+        "req_per_s": len(requests) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "rejected": pool["rejected"],
+        "worker_rss_mb": sum(w["rss_kb"] or 0 for w in pool["workers"]) / 1024,
+        "total_pss_mb": (sum(w["pss_kb"] or 0 for w in pool["workers"]) + (pool["parent"]["pss_kb"] or 0)) / 1024,
+    }
+
+def run_benchmark(worker_counts=(1, 2, 4, 8, 16), clients=64, n_requests=4000):
+    from inference_service import load_test_requests
+    requests = load_test_requests(n_requests)
+    print("\n" + "="*88)
+    print(f"🍴 Worker pool scaling: {clients} clients, {n_requests} mixed requests, {os.cpu_count()} CPU(s)")
+    print("="*88)
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'rejected':>9} "
+          f"{'sum RSS MB':>11} {'total PSS MB':>13}")
+    rows = []
+    for workers in worker_counts:
+        row = _bench_one(workers, requests, clients)
+        rows.append(row)
+        print(f"{workers:>7} {row['req_per_s']:>9,.0f} {row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} "
+              f"{row['rejected']:>9} {row['worker_rss_mb']:>11.1f} {row['total_pss_mb']:>13.1f}")
+    return rows
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def option(name, cast, default):
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    if "--bench" in args:
+        counts = tuple(int(n) for n in option("--workers", str, "1,2,4,8,16").split(","))
+        run_benchmark(counts, clients=option("--clients", int, 64), n_requests=option("--requests", int, 4000))
+    else:
+        print("Usage: python predict.py serve --workers N [--socket PATH]\n"
+              "       python worker_pool.py --bench [--workers 1,2,4,8,16] [--clients 64] [--requests 4000]")
+        sys.exit(1)